@@ -1,19 +1,34 @@
+from scripts.startup_profile import startup_profile  # first, so the imports below are timed
 import os
+import sys
+import argparse
 import scripts.Database
 import scripts.Startup
+import scripts.Updater
+import scripts.metrics
+import scripts.sqltrace
+import scripts.ratelimit
+import scripts.permissions
+from scripts.config import config
 from colorama import init, Fore, Style
-import getpass
 import time
 import threading
 from scripts.logging import logger
-from scripts.session import current_session
+from scripts.session import current_session, session_store, active_session, enable_persistence, read_resume_token, write_resume_token
 from scripts.command_handler import command_handler
-import msvcrt
+from scripts.paths import DATA_DIR
+from scripts.registry import registry
+from scripts.render import print_panel
+from scripts.commands import register_user_commands, register_job_commands, register_system_commands
+from scripts.jobs import job_queue, in_job
+from scripts.terminal import FakeBackend
+from scripts import batch, output
 init(autoreset=True)
 
 # Global variables for session management
 current_user = None
-SESSION_TIMEOUT = 300  # 5 minutes in seconds
+SESSION_DIR = DATA_DIR
+RESUME_TOKEN_FILE = os.path.join(SESSION_DIR, 'resume_token')
 
 def update_activity():
     current_session.update_activity()
@@ -27,105 +42,62 @@ def check_session_timeout():
             logger.info(f"Session timeout for user: {prev_user}")
             print(f"\n{Fore.YELLOW}Session timed out due to inactivity{Style.RESET_ALL}")
             handle_logout()
+        session_store.purge_expired()
         time.sleep(1)
 
+def start_session(username, role):
+    """Create a session for a freshly authenticated user"""
+    token = current_session.create(username, role)
+    if session_store.persistence is not None:
+        write_resume_token(RESUME_TOKEN_FILE, token)
+
+def resume_session():
+    """Resume the previous session if it is still within the timeout window"""
+    global current_user
+    if session_store.persistence is None:
+        return False
+    username = current_session.resume(read_resume_token(RESUME_TOKEN_FILE))
+    if not username:
+        write_resume_token(RESUME_TOKEN_FILE, None)
+        return False
+    role = scripts.Database.get_user_role(username)
+    if not role:
+        # Deleted or renamed since the token was issued
+        logger.info(f"Not resuming session of {username}: the user no longer exists")
+        current_session.clear()
+        write_resume_token(RESUME_TOKEN_FILE, None)
+        return False
+    current_user = username
+    current_session.set_role(role)
+    print(f"\n{Fore.GREEN}Session resumed. Welcome back, {username}!{Style.RESET_ALL}")
+    return True
+
 def handle_logout():
     global current_user
     if current_user:
         prev_user = current_user
         current_user = None
         current_session.clear()
-        os.system('cls')
+        write_resume_token(RESUME_TOKEN_FILE, None)
+        clear_screen()
         logger.info(f"User logged out: {prev_user}")
         print(f"\n{Fore.GREEN}Logged out successfully{Style.RESET_ALL}")
         return True
     return True
 
-def get_password(prompt):
-    """Get password input with asterisk masking"""
-    password = ""
-    cursor_pos = 0
-    print(prompt, end='', flush=True)
-    
-    while True:
-        char = msvcrt.getch()
-        if char in [b'\r', b'\n']:  # Enter
-            print()
-            return password
-        elif char == b'\x08':  # Backspace
-            if cursor_pos > 0:
-                password = password[:cursor_pos-1] + password[cursor_pos:]
-                cursor_pos -= 1
-                print('\b \b', end='', flush=True)
-        elif char == b'\x03':  # Ctrl+C
-            raise KeyboardInterrupt
-        else:
-            try:
-                char_str = char.decode('utf-8')
-                if char_str.isprintable():
-                    password = password[:cursor_pos] + char_str + password[cursor_pos:]
-                    cursor_pos += 1
-                    print('*', end='', flush=True)
-            except UnicodeDecodeError:
-                pass
-
-def handle_create_user():
-    user_role = scripts.Database.get_user_role(current_user)
-    if user_role != "root":
-        print(f"{Fore.RED}✖ Access denied. Root privileges required.{Style.RESET_ALL}")
-        return True
-
-    print(f"\n┌─ {Fore.CYAN}Create New User {Fore.WHITE}───────────────────┐")
-    print(f"│ Please enter the new user details   │")
-    print(f"└─────────────────────────────────────┘{Style.RESET_ALL}\n")
-
-    username = command_handler.get_input(f"{Fore.CYAN}► Username: {Style.RESET_ALL}")
-    if not username:
-        print(f"{Fore.RED}Username cannot be empty!{Style.RESET_ALL}")
-    
-    print(f"\n{Fore.YELLOW}Password Requirements:{Style.RESET_ALL}")
-    print("• Minimum 8 characters")
-    print("• At least one uppercase letter")
-    print("• At least one lowercase letter")
-    print("• At least one number")
-    print("• At least one special character (!@#$%^&*()_+-=[]{}|;:,.<>?)")
-    
-    password = get_password(f"\n{Fore.CYAN}► Password: {Style.RESET_ALL}")
-    confirm = get_password(f"{Fore.CYAN}► Confirm Password: {Style.RESET_ALL}")
-
-    if password != confirm:
-        print(f"{Fore.RED}✖  Passwords do not match{Style.RESET_ALL}")
-        return True
-
-    print(f"\nSelect role:")
-    print("1. Admin")
-    print("2. User")
-    role_choice = command_handler.get_input(f"{Fore.CYAN}► Choice (1-2): {Style.RESET_ALL}")
-
-    role = ""
-    if role_choice == "1":
-        role = "admin"
-    elif role_choice == "2":
-        role = "user"
-    else:
-        print(f"{Fore.RED}✖  Invalid role choice{Style.RESET_ALL}")
-        return True
-
-    return scripts.Database.add_user(username, password, role)
+get_password = command_handler.get_password
 
 def handle_login():
     global current_user
     
     # Check if root user exists
     if not scripts.Database.has_root_user():
-        print(f"\n┌─ {Fore.YELLOW}First Time Setup {Fore.WHITE}──────────────────────┐")
-        print(f"│ No root account found. Let's create one │")
-        print(f"└─────────────────────────────────────────┘{Style.RESET_ALL}\n")
+        print_panel("First Time Setup", ["No root account found. Let's create one"], color=Fore.YELLOW)
         
         while True:
             username = command_handler.get_input(f"{Fore.CYAN}► Root Username: {Style.RESET_ALL}")
             if not username:
-                print(f"{Fore.RED}Username cannot be empty!{Style.RESET_ALL}")
+                print(f"{Fore.RED}✖  Username cannot be empty!{Style.RESET_ALL}")
             
             print(f"\n{Fore.YELLOW}Password Requirements:{Style.RESET_ALL}")
             print("• Minimum 8 characters")
@@ -149,19 +121,17 @@ def handle_login():
             if scripts.Database.add_user(username, password, "root"):
                 print(f"\n{Fore.GREEN}✓  Root account created successfully!{Style.RESET_ALL}")
                 current_user = username
-                current_session.create(username)
+                start_session(username, "root")
                 return True
             else:
                 print(f"\n{Fore.RED}✖  Failed to create root account. Please try again.{Style.RESET_ALL}\n")
     
     # Regular login process
-    print(f"\n┌─ {Fore.CYAN}Login {Fore.WHITE}──────────────────────────┐")
-    print(f"│ Please enter your credentials    │")
-    print(f"└──────────────────────────────────┘{Style.RESET_ALL}\n")
+    print_panel("Login", ["Please enter your credentials"], min_width=30)
     
     username = command_handler.get_input(f"{Fore.CYAN}►  Username: {Style.RESET_ALL}")
     if not username:
-        print(f"{Fore.RED}Username cannot be empty!{Style.RESET_ALL}")
+        print(f"{Fore.RED}✖  Username cannot be empty!{Style.RESET_ALL}")
     
     password = get_password(f"\n{Fore.CYAN}►  Password: {Style.RESET_ALL}")
     
@@ -169,196 +139,15 @@ def handle_login():
     
     if role:
         current_user = username
-        current_session.create(username)
+        start_session(username, role)
         print(f"\n{Fore.GREEN}Welcome back, {username}!{Style.RESET_ALL}")
         return True
     else:
-        if role is None:  # Account might be locked
+        if role is None:  # Throttled, already reported
             return True
         print(f"{Fore.RED}✖  Invalid username or password{Style.RESET_ALL}")
         return True
 
-def handle_update_user(target_user):
-    user_role = scripts.Database.get_user_role(target_user)
-    
-    if not user_role:
-        print(f"{Fore.RED}✖  User {target_user} not found{Style.RESET_ALL}")
-        return True
-        
-    if user_role == "root" and target_user == "root":
-        print(f"{Fore.RED}✖  Cannot modify the primary root user{Style.RESET_ALL}")
-        return True
-
-    while True:
-        print(f"\n┌─ {Fore.CYAN}Update User {Fore.WHITE}──────────────────┐")
-        print(f"│ 1. Update Username              │")
-        print(f"│ 2. Update Password              │")
-        print(f"│ 3. Update Role                  │")
-        print(f"│ 4. Exit                         │")
-        print(f"└──────────────────────────────────┘{Style.RESET_ALL}")
-        
-        choice = command_handler.get_input(f"{Fore.CYAN}►  Choice (1-4): {Style.RESET_ALL}")
-        
-        if choice == "1":
-            new_name = command_handler.get_input(f"{Fore.CYAN}►  New Username: {Style.RESET_ALL}")
-            return scripts.Database.update_user(target_user, new_name=new_name)
-        elif choice == "2":
-            print(f"\n{Fore.YELLOW}Password Requirements:{Style.RESET_ALL}")
-            print("• Minimum 8 characters")
-            print("• At least one uppercase letter")
-            print("• At least one lowercase letter")
-            print("• At least one number")
-            print("• At least one special character (!@#$%^&*()_+-=[]{}|;:,.<>?)")
-            
-            new_pass = get_password(f"\n{Fore.CYAN}►  New Password: {Style.RESET_ALL}")
-            confirm = get_password(f"{Fore.CYAN}►  Confirm Password: {Style.RESET_ALL}")
-            
-            if new_pass != confirm:
-                print(f"{Fore.RED}✖  Passwords do not match{Style.RESET_ALL}")
-                continue
-                
-            return scripts.Database.update_user(target_user, new_password=new_pass)
-        elif choice == "3":
-            print("\nSelect new role:")
-            print("1. Admin")
-            print("2. User")
-            role_choice = command_handler.get_input(f"{Fore.CYAN}►  Choice (1-2): {Style.RESET_ALL}")
-            
-            new_role = ""
-            if role_choice == "1":
-                new_role = "admin"
-            elif role_choice == "2":
-                new_role = "user"
-            else:
-                print(f"{Fore.RED}✖  Invalid role choice{Style.RESET_ALL}")
-                continue
-                
-            return scripts.Database.update_user(target_user, new_role=new_role)
-        elif choice == "4":
-            return True
-        else:
-            print(f"{Fore.RED}✖  Invalid choice{Style.RESET_ALL}")
-
-def handle_user_command(args):
-    """Handle user management commands"""
-    if not args:
-        print(f"\n┌─ {Fore.CYAN}User Management {Fore.WHITE}────────────────────┐")
-        print(f"│ Available Commands:                  │")
-        print(f"│ • user create  - Create a new user   │")
-        print(f"│ • user delete  - Delete a user       │")
-        print(f"│ • user list    - List all users      │")
-        print(f"│ • user update  - Update user details │")
-        print(f"│ • user upgrade - Upgrade to root     │")
-        print(f"└──────────────────────────────────────┘{Style.RESET_ALL}\n")
-        return True
-
-    subcommand = args[0]
-    
-    # Special handling for dev user
-    if scripts.Database.config['dev']['enabled'] and current_user == scripts.Database.config['dev']['username']:
-        user_role = 'root'
-    else:
-        user_role = scripts.Database.get_user_role(current_user)
-    
-    # Debug logging if enabled
-    if scripts.Database.config['console']['debug']:
-        print(f"\nDEBUG: Current User: {current_user}")
-        print(f"DEBUG: User Role: {user_role}")
-    
-    if subcommand == "create":
-        if user_role != 'root':
-            print(f"{Fore.RED}✖  Access denied. Root privileges required.{Style.RESET_ALL}")
-            return True
-        return handle_create_user()
-    
-    elif subcommand == "delete":
-        if user_role != 'root':
-            print(f"{Fore.RED}✖  Access denied. Root privileges required.{Style.RESET_ALL}")
-            return True
-            
-        if len(args) != 2:
-            print(f"{Fore.RED}✖  Usage: user delete <username>{Style.RESET_ALL}")
-            return True
-            
-        username = args[1]
-        if username == current_user:
-            print(f"{Fore.RED}✖  Cannot delete your own account{Style.RESET_ALL}")
-            return True
-            
-        print(f"\n{Fore.YELLOW}⚠  Warning: You are about to delete user '{username}'{Style.RESET_ALL}")
-        confirm = command_handler.get_input("Are you sure? (y/N): ").lower()
-        if confirm != 'y':
-            print(f"{Fore.YELLOW}Operation cancelled{Style.RESET_ALL}")
-            return True
-            
-        if scripts.Database.delete_user(username):
-            print(f"{Fore.GREEN}✓  User deleted successfully{Style.RESET_ALL}")
-        return True
-    
-    elif subcommand == "list":
-        users = scripts.Database.list_users(current_user)
-        if users:
-            print(f"\n┌─ {Fore.CYAN}User List {Fore.WHITE}────────────────┐")
-            for user, role in users:
-                # Calculate the actual visible length of the username (excluding ANSI codes)
-                visible_length = len(user) - (len(Fore.GREEN) + len(Style.RESET_ALL)) if Fore.GREEN in user else len(user)
-                padding = ' ' * (15 - visible_length)  # Adjust padding based on visible length
-                
-                role_color = {
-                    'root': Fore.RED,
-                    'admin': Fore.YELLOW,
-                    'user': Fore.GREEN
-                }.get(role, Fore.WHITE)
-                print(f"│ {user}{padding} | {role_color}{role:8}{Style.RESET_ALL} │")
-            print(f"└────────────────────────────┘{Style.RESET_ALL}\n")
-        else:
-            print(f"{Fore.YELLOW}No users found{Style.RESET_ALL}")
-        return True
-    
-    elif subcommand == "update":
-        if user_role != 'root':
-            print(f"{Fore.RED}✖  Access denied. Root privileges required.{Style.RESET_ALL}")
-            return True
-            
-        if len(args) != 2:
-            print(f"{Fore.RED}✖  Usage: user update <username>{Style.RESET_ALL}")
-            return True
-            
-        return handle_update_user(args[1])
-    
-    elif subcommand == "upgrade":
-        if user_role != 'root':
-            print(f"{Fore.RED}✖  Access denied. Root privileges required.{Style.RESET_ALL}")
-            return True
-            
-        if len(args) != 2:
-            print(f"{Fore.RED}✖  Usage: user upgrade <username>{Style.RESET_ALL}")
-            return True
-            
-        username = args[1]
-        print(f"\n{Fore.YELLOW}⚠  Warning: You are about to upgrade '{username}' to root privileges{Style.RESET_ALL}")
-        root_password = get_password("Please enter the root password to confirm:\n► Root Password: ")
-        
-        if scripts.Database.verify_root_password(root_password):
-            scripts.Database.upgrade_to_root(username)
-        else:
-            print(f"{Fore.RED}✖  Invalid root password{Style.RESET_ALL}")
-        return True
-    
-    else:
-        print(f"{Fore.RED}✖  Unknown subcommand: {subcommand}{Style.RESET_ALL}")
-        return True
-
-def print_user_help():
-    print(f"\n┌─ {Fore.CYAN}User Management Commands {Fore.WHITE}───────────────────┐")
-    print(f"│ user create                                  │")
-    print(f"│ user delete <username>                       │")
-    print(f"│ user list                                    │")
-    print(f"│ user update <username>                       │")
-    print(f"│ user upgrade <username>                      │")
-    print(f"│ logout                                       │")
-    print(f"└──────────────────────────────────────────────┘{Style.RESET_ALL}\n")
-
 def check_session():
     """Check if the current session is valid"""
     global current_user
@@ -393,11 +182,11 @@ def get_prompt():
         return f"{Fore.WHITE}phantom>{Style.RESET_ALL} "
         
     # Special dev user styling
-    if scripts.Database.config['dev']['enabled'] and current_user == scripts.Database.config['dev']['username']:
+    if config.dev.enabled and current_user == config.dev.username:
         return f"{Fore.MAGENTA}[DEV]{Style.RESET_ALL} {Fore.CYAN}{current_user}@phantom>{Style.RESET_ALL} "
         
     # Normal user styling based on role
-    role = scripts.Database.get_user_role(current_user)
+    role = current_session.role
     role_color = {
         'root': Fore.RED,
         'admin': Fore.YELLOW,
@@ -408,28 +197,49 @@ def get_prompt():
 
 def print_dev_warning():
     """Print a warning when dev mode is enabled"""
-    if scripts.Database.config['dev']['enabled']:
+    if config.dev.enabled:
         print(f"\n{Fore.MAGENTA}╔════════════════════════════════════════╗")
         print(f"{Fore.MAGENTA}║{Style.RESET_ALL}  ⚠  DEVELOPMENT MODE IS ENABLED        {Fore.MAGENTA}║")
-        print(f"{Fore.MAGENTA}║{Style.RESET_ALL}  Username: {scripts.Database.config['dev']['username']:<25} {Fore.MAGENTA}  ║")
-        print(f"{Fore.MAGENTA}║{Style.RESET_ALL}  Password: {scripts.Database.config['dev']['password']:<25} {Fore.MAGENTA}  ║")
+        print(f"{Fore.MAGENTA}║{Style.RESET_ALL}  Username: {config.dev.username:<25} {Fore.MAGENTA}  ║")
+        print(f"{Fore.MAGENTA}║{Style.RESET_ALL}  Password: {config.dev.password:<25} {Fore.MAGENTA}  ║")
         print(f"{Fore.MAGENTA}╚════════════════════════════════════════╝{Style.RESET_ALL}\n")
 
 def clear_screen():
-    os.system('cls')
+    command_handler.terminal.clear()
 
 def print_info():
     """Print information about Phantom Console"""
-    version = scripts.Database.config['Version']
-    print(f"\n┌─ {Fore.CYAN}About Phantom Console {Fore.WHITE}─────────────┐")
-    print(f"│ Version: {Fore.GREEN}{version}{Style.RESET_ALL}{' ' * (27 - len(version))}│")
-    print(f"│ Created by: {Fore.YELLOW}Gerrxt{Style.RESET_ALL}{' ' * 18}│")
-    print(f"│ GitHub: {Fore.MAGENTA}https://github.com/gerrxt07{Style.RESET_ALL} │")
-    print(f"└─────────────────────────────────────┘{Style.RESET_ALL}\n")
+    version = config.version
+    print_panel("About Phantom Console", [
+        f"Version: {Fore.GREEN}{version}{Style.RESET_ALL}",
+        f"Created by: {Fore.YELLOW}Gerrxt{Style.RESET_ALL}",
+        f"GitHub: {Fore.MAGENTA}https://github.com/gerrxt07{Style.RESET_ALL}",
+    ])
+
+def apply_config(config):
+    """Apply the settings that are copied out of config.toml; runs again after every reload"""
+    scripts.permissions.load_roles(config.roles)
+    session_store.configure(config.console.session_timeout, config.console.max_sessions_per_user)
+    session_store.refresh_permissions()
+    command_handler.command_history.max_entries = config.console.history_size
+    job_queue.resize(config.console.job_workers)
+
+def configure_sessions():
+    """Apply role and session settings from config.toml and follow later changes to it"""
+    config.subscribe(apply_config)
+    config.subscribe(scripts.metrics.apply_config)
+    config.subscribe(scripts.sqltrace.apply_config)
+    config.subscribe(scripts.ratelimit.apply_config)
+    if config.console.persist_sessions:
+        enable_persistence(session_store, os.path.join(SESSION_DIR, 'sessions.db'),
+                           config.console.max_persisted_sessions)
+    config.watch()
 
 def main():
     global current_user
     
+    configure_sessions()
+    
     # Start session timeout thread
     timeout_thread = threading.Thread(target=check_session_timeout, daemon=True)
     timeout_thread.start()
@@ -438,6 +248,9 @@ def main():
     print_banner()
     print_dev_warning()  # Show dev mode warning if enabled
     
+    if resume_session():
+        command_handler.print_help(current_session.permissions)
+    
     while True:
         try:
             if not current_user:
@@ -445,62 +258,195 @@ def main():
                     continue
                 clear_screen()
                 print_banner()
-                command_handler.print_help(current_user)
+                command_handler.print_help(current_session.permissions)
             
-            command = command_handler.get_input(get_prompt()).strip()
+            print_notices()
+            command = command_handler.get_input(get_prompt(), complete=complete_command).strip()
             
             if not command:
                 continue
+            
+            update_activity()
                 
             if not handle_command(command):
                 break
                 
         except KeyboardInterrupt:
             print("\nUse 'exit' to quit")
+        except EOFError:
+            break
         except Exception as e:
             logger.error(f"Unexpected error: {e}")
-            print(f"\n{Fore.RED}An unexpected error occurred. Please try again.{Style.RESET_ALL}")
+            print(f"\n{Fore.RED}✖  An unexpected error occurred. Please try again.{Style.RESET_ALL}")
     
     # Save command history before exit
     command_handler.save_history()
+    job_queue.shutdown(wait=False)
     print(f"\n{Fore.GREEN}Goodbye!{Style.RESET_ALL}")
 
+def print_notices():
+    """Print update check results and background job notices before the prompt"""
+    for notice in scripts.Updater.pop_notices() + job_queue.pop_notices(current_session.token):
+        print(notice)
+
+def handle_clear(args):
+    clear_screen()
+    print_banner()
+    if config.dev.enabled:
+        print_dev_warning()
+    return True
+
+def handle_help(args):
+    command_handler.print_help(current_session.permissions)
+    return True
+
+def handle_exit(args):
+    return False
+
+def handle_info(args):
+    print_info()
+    return True
+
+def complete_command(line):
+    """Tab completion for the main prompt"""
+    return registry.complete(line, current_session.permissions)
+
+registry.register('clear', handle_clear, 'Clear the console screen', aliases=('cls',))
+registry.register('help', handle_help, 'Show this help message')
+register_user_commands()
+register_job_commands()
+register_system_commands()
+registry.register('logout', lambda args: handle_logout(), 'Log out current user')
+registry.register('exit', handle_exit, 'Exit Phantom Console')
+registry.register('info', handle_info, 'Show informations')
+
+def handle_background(command: str) -> bool:
+    """Queue a command ending in '&' as a background job"""
+    command = command.strip()[:-1].strip()
+    if not command:
+        print(f"{Fore.RED}✖  Nothing to run in the background{Style.RESET_ALL}")
+        return True
+    spec, _ = registry.resolve(command.split())
+    if spec is not None and spec.interactive:
+        print(f"{Fore.RED}✖  {spec.path} prompts for input and cannot run in the background{Style.RESET_ALL}")
+        return True
+    job = job_queue.submit(command, handle_command, active_session())
+    print(f"{Fore.CYAN}[{job.id}] {command}{Style.RESET_ALL}")
+    return True
+
 def handle_command(command: str) -> bool:
     """Handle a console command"""
+    if command.strip().endswith('&') and not in_job():
+        return handle_background(command)
     try:
         args = command.strip().split()
         if not args:
             return True
-            
-        cmd = args[0].lower()
         
-        if cmd in ["clear", "cls"]:
-            clear_screen()
-            print_banner()
-            if scripts.Database.config['dev']['enabled']:
-                print_dev_warning()
-        elif cmd == "help":
-            command_handler.print_help(current_user)
-        elif cmd == "user":
-            return handle_user_command(args[1:] if len(args) > 1 else [])
-        elif cmd == "logout":
-            return handle_logout()
-        elif cmd == "exit":
-            return False
-        elif cmd == "info":
-            print_info()
-        else:
-            print(f"{Fore.RED}✖  Unknown command: {cmd}{Style.RESET_ALL}")
-            command_handler.print_help(current_user)
+        spec, rest = registry.resolve(args)
+        if spec is None:
+            print(f"{Fore.RED}✖  Unknown command: {args[0].lower()}{Style.RESET_ALL}")
+            command_handler.print_help(current_session.permissions)
+            return True
+        
+        # Debug logging if enabled
+        if config.console.debug:
+            print(f"\nDEBUG: Current User: {current_user}")
+            print(f"DEBUG: User Role: {current_session.role} (permissions {current_session.permissions:#x})")
             
-        return True
+        return registry.execute(spec, rest, current_session.permissions)
         
+    except EOFError:
+        raise
     except Exception as e:
         logger.error(f"Command error: {e}")
         print(f"{Fore.RED}✖  Error executing command: {e}{Style.RESET_ALL}")
         return True
 
+def authenticate_headless(username):
+    """Log in once for headless mode: resume a persisted session or use PHANTOM_PASSWORD"""
+    global current_user
+    with output.capture() as messages:
+        if resume_session():
+            return True
+        username = username or os.getenv('PHANTOM_USER')
+        password = os.getenv('PHANTOM_PASSWORD')
+        if not username or password is None:
+            batch.error("headless mode needs --user (or PHANTOM_USER) and PHANTOM_PASSWORD")
+            return False
+        role = scripts.Database.verify_credentials(username, password)
+    if not role:
+        reason = output.strip_ansi(messages.getvalue()).strip(' ✖⚠\n') or "invalid username or password"
+        batch.error(f"authentication failed: {reason}")
+        return False
+    current_user = username
+    start_session(username, role)
+    return True
+
+def run_batch_command(command):
+    update_activity()
+    return handle_command(command)
+
+def run_headless(args):
+    """Run commands without prompts or redraws and print JSON results"""
+    configure_sessions()
+    # No keyboard: screen clears go nowhere and prompts raise EOFError
+    command_handler.terminal = FakeBackend()
+    
+    if args.commands:
+        commands = batch.split_commands(args.commands)
+    else:
+        commands = batch.read_script(args.script or '-')
+    
+    if not authenticate_headless(args.user):
+        return 2
+    failed = batch.run(commands, run_batch_command)
+    job_queue.shutdown(wait=True)  # let commands queued with '&' finish
+    return 1 if failed else 0
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Phantom Console")
+    parser.add_argument('--script', metavar='FILE',
+                        help="run commands from FILE ('-' for stdin) and print JSON results")
+    parser.add_argument('-c', dest='commands', metavar='COMMANDS',
+                        help="run ';'-separated commands and print JSON results")
+    parser.add_argument('--user', help="username for headless mode (password is read from PHANTOM_PASSWORD)")
+    parser.add_argument('--serve', action='store_true', help="run the remote console server")
+    parser.add_argument('--api', action='store_true', help="run the JSON-RPC management API")
+    parser.add_argument('--host', help="server listen address (default from config.toml)")
+    parser.add_argument('--port', type=int, help="server listen port (default from config.toml)")
+    parser.add_argument('--socket', metavar='PATH', help="serve on a Unix socket instead of TCP")
+    parser.add_argument('--rollback-update', action='store_true', help="undo the last installed update")
+    parser.add_argument('--profile-startup', nargs='?', const='', metavar='JSON',
+                        help="show how long each startup phase took (optionally also write them to JSON)")
+    args = parser.parse_args(argv)
+    # Piped stdin also selects headless mode
+    args.headless = not (args.serve or args.api) and bool(args.script or args.commands or not sys.stdin.isatty())
+    return args
+
 if __name__ == "__main__":
+    startup_profile.mark('imports')
+    args = parse_args()
+    if args.profile_startup is not None:
+        startup_profile.enabled = True
+        startup_profile.output = args.profile_startup or None
     logger.info("Starting Phantom Console")
+    if args.rollback_update:
+        sys.exit(0 if scripts.Updater.rollback() else 1)
+    if args.headless:
+        scripts.Startup.start(check_updates=False)
+        sys.exit(run_headless(args))
+    if args.serve:
+        scripts.Startup.start(check_updates=False)
+        configure_sessions()
+        import scripts.server
+        scripts.server.run(handle_command, args.host, args.port, args.socket)
+        sys.exit(0)
+    if args.api:
+        scripts.Startup.start(check_updates=False)
+        configure_sessions()
+        import scripts.api
+        scripts.api.run(args.host, args.port, args.socket)
+        sys.exit(0)
     scripts.Startup.start()
     main()
\ No newline at end of file
@@ -0,0 +1 @@
+"""Benchmarks for Phantom Console. Run a module with `python -m benchmarks.<name>`."""
@@ -0,0 +1,158 @@
+"""Authentication and console benchmark suite.
+
+Builds synthetic user databases (1k, 100k and 1M users by default, each
+with a large login_attempts history) in a temporary directory and measures
+throughput and p50/p99 latency of the Database functions and of command
+dispatch. Results are written as JSON so they can be compared between
+releases. No network access or Windows console is needed.
+
+    python -m benchmarks.auth --sizes 1000,100000 --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+PASSWORD = 'Bench-Passw0rd!'
+ROLE_SHARES = (('admin', 0.01), ('user', 0.99))
+CHUNK = 50_000
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return sorted_values[index]
+
+def measure(func: Callable[[int], object], iterations: int) -> Dict[str, float]:
+    """Call func(i) iterations times; throughput and latency percentiles in milliseconds"""
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        begin = time.perf_counter()
+        func(i)
+        latencies.append(time.perf_counter() - begin)
+    total = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'iterations': iterations,
+        'ops_per_sec': round(iterations / total, 2) if total else None,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 4),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 4),
+        'max_ms': round(latencies[-1] * 1000, 4),
+    }
+
+def build_database(path: str, users: int, attempts: int, password_hash: str) -> float:
+    """Create a database with users and a login_attempts history; returns the build time"""
+    import scripts.Database as db
+    started = time.perf_counter()
+    db.database = path
+    db.startup()
+    db.create_login_tracking_table()
+    rng = random.Random(users)
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO user (name, password, role) VALUES ('root', ?, 'root')", (password_hash,))
+    for start in range(0, users, CHUNK):
+        conn.executemany(
+            "INSERT INTO user (name, password, role) VALUES (?, ?, ?)",
+            ((f"user{i:07d}", password_hash,
+              rng.choices([role for role, _ in ROLE_SHARES], [share for _, share in ROLE_SHARES])[0])
+             for i in range(start, min(start + CHUNK, users)))
+        )
+    now = int(time.time())
+    for start in range(0, attempts, CHUNK):
+        conn.executemany(
+            "INSERT INTO login_attempts (username, attempt_time, success) "
+            "VALUES (?, datetime(?, 'unixepoch'), ?)",
+            ((f"user{rng.randrange(users):07d}", now - rng.randrange(90 * 86400), rng.random() > 0.1)
+             for _ in range(start, min(start + CHUNK, attempts)))
+        )
+    conn.commit()
+    conn.close()
+    return time.perf_counter() - started
+
+def run_dataset(users: int, args, workdir: str, password_hash: str) -> dict:
+    import scripts.Database as db
+    import PhantomConsole
+    from scripts import output
+
+    path = os.path.join(workdir, f'bench_{users}.db')
+    build = build_database(path, users, args.attempts, password_hash)
+    rng = random.Random(0)
+    names = [f"user{rng.randrange(users):07d}" for _ in range(max(args.iterations, args.bcrypt_iterations))]
+    results = {}
+
+    with output.capture():
+        results['verify_credentials'] = measure(
+            lambda i: db.verify_credentials(names[i], PASSWORD), args.bcrypt_iterations)
+        results['verify_credentials_unknown_user'] = measure(
+            lambda i: db.verify_credentials(f"nobody{i}", PASSWORD), args.bcrypt_iterations)
+        results['get_user_role'] = measure(lambda i: db.get_user_role(names[i]), args.iterations)
+        results['add_user'] = measure(
+            lambda i: db.add_user(f"new{users}_{i:06d}", PASSWORD, 'user'), args.bcrypt_iterations)
+        results['list_users'] = measure(lambda i: db.list_users('root'), args.list_iterations)
+        results['iter_users_first_page'] = measure(
+            lambda i: next(db.iter_users()), args.iterations)
+        results['track_login_attempt'] = measure(
+            lambda i: db.track_login_attempt(names[i], i % 10 != 0), args.iterations)
+
+        # Command dispatch through the console's handler, logged in as root
+        PhantomConsole.current_session.create('root', 'root')
+        for command in ('info', 'help', 'nosuchcommand'):
+            results[f"handle_command:{command}"] = measure(
+                lambda i: PhantomConsole.handle_command(command), args.iterations)
+        PhantomConsole.current_session.clear()
+
+    return {'users': users, 'login_attempts': args.attempts, 'build_seconds': round(build, 2),
+            'db_bytes': os.path.getsize(path), 'results': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Authentication and console benchmarks")
+    parser.add_argument('--sizes', default='1000,100000,1000000', help="comma-separated user counts")
+    parser.add_argument('--attempts', type=int, default=1_000_000, help="login_attempts rows per database")
+    parser.add_argument('--iterations', type=int, default=2000, help="calls per fast operation")
+    parser.add_argument('--bcrypt-iterations', type=int, default=10,
+                        help="calls per operation that hashes a password")
+    parser.add_argument('--list-iterations', type=int, default=3, help="full user listings")
+    parser.add_argument('--output', metavar='FILE', help="write the JSON results to FILE instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Logs and session files of the run stay in the temporary directory
+        os.environ['XDG_DATA_HOME'] = os.path.join(workdir, 'data')
+        os.environ.pop('APPDATA', None)
+        import scripts.Database as db
+        from scripts.config import config
+        config.dev.enabled = False
+        # Measure the functions themselves, not the login throttling in front of them
+        from scripts.ratelimit import admission
+        admission.configure(login_rate=0, source_rate=0, spray_usernames=0, spray_global_usernames=0)
+        password_hash = db.hash_password(PASSWORD)
+
+        datasets = [run_dataset(int(size), args, workdir, password_hash)
+                    for size in args.sizes.split(',') if size.strip()]
+
+    report = {
+        'benchmark': 'auth',
+        'version': config.version,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'sqlite': sqlite3.sqlite_version,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'datasets': datasets,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        sys.stdout.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
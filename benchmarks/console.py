@@ -0,0 +1,139 @@
+"""End-to-end console benchmark driven by a keystroke script.
+
+Runs the interactive console (login prompt, line editor, command dispatch,
+screen clears) against a temporary database on a virtual terminal, replays
+a key script and reports the latency of every interaction: from pressing
+Enter until the next prompt is ready. Needs no real terminal, so it runs
+on headless CI machines.
+
+Key scripts are plain text: every line is typed and submitted with Enter,
+<TAB>, <UP>, <CTRL_C> and the other Key names stand for special keys and
+lines starting with '#' are comments. The default script logs in as root,
+lists users and logs out.
+
+    python -m benchmarks.console --repeat 20 --output results.json
+    python -m benchmarks.console --script session.keys --transcript out.txt
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from benchmarks.auth import percentile
+
+USERNAME = 'root'
+PASSWORD = 'Bench-Passw0rd!'
+USERS = 100
+DEFAULT_SCRIPT = f"""\
+{USERNAME}
+{PASSWORD}
+user list
+logout
+"""
+
+
+def prepare_database(path: str, users: int):
+    import scripts.Database as db
+    db.database = path
+    db.startup()
+    db.create_login_tracking_table()
+    password_hash = db.hash_password(PASSWORD)
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO user (name, password, role) VALUES (?, ?, 'root')", (USERNAME, password_hash))
+    conn.executemany("INSERT INTO user (name, password, role) VALUES (?, ?, 'user')",
+                     ((f"user{i:05d}", password_hash) for i in range(users)))
+    conn.commit()
+    conn.close()
+
+def replay(script: str):
+    """Run the console until the script is exhausted; returns the virtual terminal"""
+    import PhantomConsole
+    from scripts import output
+    from scripts.terminal import ReplayBackend
+
+    terminal = ReplayBackend.from_script(script)
+    PhantomConsole.command_handler.terminal = terminal
+    # Everything printed lands in the terminal next to the editor's echo
+    with output.redirect(terminal):
+        PhantomConsole.main()
+    return terminal
+
+def summarize(interactions):
+    """Latency per interaction label, in script order"""
+    groups = defaultdict(list)
+    for label, seconds in interactions:
+        groups[label].append(seconds)
+    results = {}
+    for label, latencies in groups.items():
+        latencies.sort()
+        results[label] = {
+            'count': len(latencies),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+            'max_ms': round(latencies[-1] * 1000, 3),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end console benchmark")
+    parser.add_argument('--script', metavar='FILE', help="key script to replay (default: login, user list, logout)")
+    parser.add_argument('--repeat', type=int, default=10, help="how often the script is replayed")
+    parser.add_argument('--users', type=int, default=USERS, help="extra users in the benchmark database")
+    parser.add_argument('--transcript', metavar='FILE', help="write everything the console printed to FILE")
+    parser.add_argument('--output', metavar='FILE', help="write the JSON results to FILE instead of stdout")
+    args = parser.parse_args()
+
+    if args.script:
+        with open(args.script, 'r', encoding='utf-8') as f:
+            script = f.read()
+    else:
+        script = DEFAULT_SCRIPT
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # History, sessions and logs of the run stay in the temporary directory
+        os.environ['XDG_DATA_HOME'] = os.path.join(workdir, 'data')
+        os.environ.pop('APPDATA', None)
+        from scripts.config import config
+        config.dev.enabled = False
+        config.console.persist_sessions = False
+        # Replayed logins come faster than the local login throttling allows
+        config.security.source_rate = 0
+        config.security.login_rate = 0
+        prepare_database(os.path.join(workdir, 'bench.db'), args.users)
+
+        started = time.perf_counter()
+        terminal = replay(script * args.repeat)
+        elapsed = time.perf_counter() - started
+
+    if args.transcript:
+        from scripts.output import strip_ansi
+        with open(args.transcript, 'w', encoding='utf-8') as f:
+            f.write(strip_ansi(terminal.getvalue()))
+
+    report = {
+        'benchmark': 'console',
+        'version': config.version,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'repeat': args.repeat,
+        'keys': len(terminal.keys),
+        'total_seconds': round(elapsed, 3),
+        'interactions': summarize(terminal.interactions),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        sys.stdout.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
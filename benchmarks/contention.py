@@ -0,0 +1,121 @@
+"""Multi-process write contention stress test.
+
+Starts several processes on one database file, as if several consoles
+shared resources/database.db, and lets them write at the same time:
+
+  * every process records failed logins for the same account, so the
+    account's login_attempts must end up at exactly processes x iterations,
+  * every process records login attempts in login_attempts,
+  * every process tries to add the same set of new users, so each name
+    must be created exactly once,
+  * every process renames a user of its own back and forth.
+
+Prints a JSON report and exits with status 1 if an update was lost, a
+user was created twice or an operation failed.
+
+    python -m benchmarks.contention --processes 8 --iterations 200
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+PASSWORD = 'Bench-Passw0rd!'
+TARGET = 'contended'
+
+
+def worker(args):
+    path, data_dir, index, iterations, new_users = args
+    os.environ['XDG_DATA_HOME'] = data_dir
+    os.environ.pop('APPDATA', None)
+    import scripts.Database as db
+    from scripts import output
+    from scripts.config import config
+    config.dev.enabled = False
+    db.database = path
+
+    failures = 0
+    added = 0
+    started = time.perf_counter()
+    with output.capture():
+        for i in range(iterations):
+            if db.record_failed_login(TARGET) <= 0:
+                failures += 1
+            db.track_login_attempt(TARGET, False)
+            old, new = (f"own{index}", f"own{index}_renamed") if i % 2 == 0 else (f"own{index}_renamed", f"own{index}")
+            if not db.update_user(old, new_name=new):
+                failures += 1
+        writing = time.perf_counter() - started
+        for name in new_users:
+            if db.add_user(name, PASSWORD, 'user'):
+                added += 1
+    retries = db.BUSY_RETRIES_TOTAL.samples().get((), 0)
+    return {'failures': failures, 'added': added, 'retries': retries, 'write_seconds': writing}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-process write contention test")
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--iterations', type=int, default=200, help="writes of each kind per process")
+    parser.add_argument('--new-users', type=int, default=5, help="users every process tries to add")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        data_dir = os.path.join(workdir, 'data')
+        os.environ['XDG_DATA_HOME'] = data_dir
+        import scripts.Database as db
+        path = os.path.join(workdir, 'contention.db')
+        db.database = path
+        db.startup()
+        db.create_login_tracking_table()
+        conn = sqlite3.connect(path)
+        conn.executemany("INSERT INTO user (name, password, role) VALUES (?, 'x', 'user')",
+                         [(TARGET,)] + [(f"own{i}",) for i in range(args.processes)])
+        conn.commit()
+        conn.close()
+
+        new_users = [f"new{i}" for i in range(args.new_users)]
+        jobs = [(path, data_dir, i, args.iterations, new_users) for i in range(args.processes)]
+        started = time.perf_counter()
+        with multiprocessing.get_context('spawn').Pool(args.processes) as pool:
+            results = pool.map(worker, jobs)
+        elapsed = time.perf_counter() - started
+
+        conn = sqlite3.connect(path)
+        attempts = conn.execute("SELECT login_attempts FROM user WHERE name = ?", (TARGET,)).fetchone()[0]
+        tracked = conn.execute("SELECT COUNT(*) FROM login_attempts").fetchone()[0]
+        created = conn.execute(f"SELECT COUNT(*) FROM user WHERE name IN ({','.join('?' * len(new_users))})",
+                               new_users).fetchone()[0]
+        owned = conn.execute("SELECT COUNT(*) FROM user WHERE name LIKE 'own%'").fetchone()[0]
+        conn.close()
+
+    expected = args.processes * args.iterations
+    report = {
+        'benchmark': 'contention',
+        'processes': args.processes,
+        'iterations': args.iterations,
+        'seconds': round(elapsed, 2),
+        # Failed logins, tracked attempts and renames; adding users is mostly bcrypt
+        'writes_per_sec': round(3 * expected / max(r['write_seconds'] for r in results), 1),
+        'busy_retries': sum(r['retries'] for r in results),
+        'failed_operations': sum(r['failures'] for r in results),
+        'login_attempts': {'expected': expected, 'actual': attempts},
+        'tracked_attempts': {'expected': expected, 'actual': tracked},
+        'new_users': {'expected': len(new_users), 'created': created,
+                      'reported_added': sum(r['added'] for r in results)},
+        'renamed_users': {'expected': args.processes, 'actual': owned},
+    }
+    ok = (attempts == expected and tracked == expected and created == len(new_users)
+          and report['new_users']['reported_added'] == len(new_users)
+          and owned == args.processes and not report['failed_operations'])
+    report['ok'] = ok
+    sys.stdout.write(json.dumps(report, indent=2) + '\n')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""Load generator for the Phantom Console server.
+
+Opens many concurrent sessions against a running server, logs each one in,
+runs a fixed command mix and reports sessions and commands per second.
+All sessions come from one address, so start the server with the login
+throttling relaxed (source_rate = 0 and login_rate = 0 under [security]).
+
+    PHANTOM_PASSWORD=... python -m benchmarks.loadgen --user admin --sessions 200 --commands 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import List
+
+PROMPT = b'@phantom> '
+
+
+async def _session(args, latencies: List[float], logins: List[float]):
+    if args.socket:
+        reader, writer = await asyncio.open_unix_connection(args.socket)
+    else:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+    try:
+        start = time.perf_counter()
+        await reader.readuntil(b'Username: ')
+        writer.write(args.user.encode() + b'\n')
+        await reader.readuntil(b'Password: ')
+        writer.write(args.password.encode() + b'\n')
+        await reader.readuntil(PROMPT)
+        logins.append(time.perf_counter() - start)
+
+        commands = args.command or ['info', 'user list', 'help']
+        for i in range(args.commands):
+            sent = time.perf_counter()
+            writer.write(commands[i % len(commands)].encode() + b'\n')
+            await reader.readuntil(PROMPT)
+            latencies.append(time.perf_counter() - sent)
+        writer.write(b'exit\n')
+    finally:
+        writer.close()
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def _run(args) -> dict:
+    latencies: List[float] = []
+    logins: List[float] = []
+    start = time.perf_counter()
+    results = await asyncio.gather(*(_session(args, latencies, logins) for _ in range(args.sessions)),
+                                   return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    errors = [r for r in results if isinstance(r, BaseException)]
+    return {
+        'sessions': args.sessions,
+        'failed_sessions': len(errors),
+        'commands': len(latencies),
+        'elapsed_s': round(elapsed, 3),
+        'sessions_per_second': round(len(logins) / elapsed, 1),
+        'commands_per_second': round(len(latencies) / elapsed, 1),
+        'login_p50_ms': round(_percentile(logins, 50) * 1000, 2),
+        'command_p50_ms': round(_percentile(latencies, 50) * 1000, 3),
+        'command_p99_ms': round(_percentile(latencies, 99) * 1000, 3),
+        'first_error': repr(errors[0]) if errors else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Phantom Console server load generator")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7420)
+    parser.add_argument('--socket', help="connect to a Unix socket instead of TCP")
+    parser.add_argument('--user', default=os.getenv('PHANTOM_USER'), required=os.getenv('PHANTOM_USER') is None)
+    parser.add_argument('--sessions', type=int, default=100, help="concurrent sessions")
+    parser.add_argument('--commands', type=int, default=20, help="commands per session")
+    parser.add_argument('--command', action='append', help="command to send (repeatable)")
+    args = parser.parse_args()
+    args.password = os.getenv('PHANTOM_PASSWORD', '')
+    print(json.dumps(asyncio.run(_run(args)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Concurrent session validation benchmark.
+
+Creates 10k sessions and validates them from several threads at once,
+comparing the lock-striped SessionStore against a single-shard store.
+"""
+import argparse
+import threading
+import time
+
+from scripts.session import SessionStore
+
+
+def run(shard_count: int, sessions: int, threads: int, rounds: int) -> float:
+    store = SessionStore(timeout_seconds=3600, max_sessions_per_user=0, shard_count=shard_count)
+    tokens = [store.create(f"user{i}") for i in range(sessions)]
+    chunks = [tokens[i::threads] for i in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(chunk):
+        barrier.wait()
+        for _ in range(rounds):
+            for token in chunk:
+                store.validate(token)
+
+    workers = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+    for t in workers:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return sessions * rounds / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sessions', type=int, default=10_000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    for shards in (1, 64):
+        rate = run(shards, args.sessions, args.threads, args.rounds)
+        print(f"shards={shards:<3} sessions={args.sessions} threads={args.threads} "
+              f"validate/s={rate:,.0f}")
+
+
+if __name__ == '__main__':
+    main()
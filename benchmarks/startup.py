@@ -0,0 +1,92 @@
+"""Time-to-first-prompt regression benchmark.
+
+Starts the interactive console on a pseudo-terminal several times, each in
+a fresh working directory with a copy of config.toml and an empty database,
+and measures the wall time from process start until the first prompt is
+shown. Exits with status 1 when the median exceeds the budget.
+
+    python -m benchmarks.startup --runs 10 --budget 0.5
+"""
+import argparse
+import json
+import os
+import select
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_once(workdir: str, timeout: float) -> dict:
+    """Start the console once; returns the wall time and the phases it reported"""
+    import pty
+    profile = os.path.join(workdir, 'startup_profile.json')
+    if os.path.exists(profile):
+        os.remove(profile)
+    start = time.perf_counter()
+    pid, fd = pty.fork()
+    if pid == 0:
+        os.chdir(workdir)
+        os.execv(sys.executable, [sys.executable, os.path.join(ROOT, 'PhantomConsole.py'),
+                                  '--profile-startup', profile])
+    try:
+        deadline = start + timeout
+        # The profile is written the moment the first prompt is reached;
+        # keep draining the terminal so the console never blocks on output
+        while not os.path.exists(profile):
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f"no prompt within {timeout}s")
+            if select.select([fd], [], [], 0.005)[0]:
+                try:
+                    os.read(fd, 65536)
+                except OSError:
+                    raise RuntimeError("console exited before the first prompt")
+        elapsed = time.perf_counter() - start
+    finally:
+        os.kill(pid, 9)
+        os.waitpid(pid, 0)
+        os.close(fd)
+    with open(profile, 'r', encoding='utf-8') as f:
+        result = json.load(f)
+    result['wall'] = elapsed
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time-to-first-prompt benchmark")
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--budget', type=float, default=0.5, help="maximum median seconds to the first prompt")
+    parser.add_argument('--timeout', type=float, default=10.0)
+    args = parser.parse_args()
+    if os.name != 'posix':
+        print("This benchmark needs a POSIX pseudo-terminal.")
+        sys.exit(2)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        shutil.copy(os.path.join(ROOT, 'config.toml'), workdir)
+        os.makedirs(os.path.join(workdir, 'resources'))
+        # Keep logs, caches and sessions of the runs out of the user's data dir
+        os.environ['XDG_DATA_HOME'] = os.path.join(workdir, 'data')
+        os.environ.pop('APPDATA', None)
+        runs = [run_once(workdir, args.timeout) for _ in range(args.runs)]
+
+    phases = {name: statistics.median(run['phases'][name] for run in runs) for name in runs[0]['phases']}
+    median = statistics.median(run['wall'] for run in runs)
+    print(json.dumps({
+        'runs': args.runs,
+        'median_phases_ms': {name: round(seconds * 1000, 1) for name, seconds in phases.items()},
+        'median_profiled_ms': round(statistics.median(run['total'] for run in runs) * 1000, 1),
+        'median_wall_ms': round(median * 1000, 1),
+        'max_wall_ms': round(max(run['wall'] for run in runs) * 1000, 1),
+        'budget_ms': args.budget * 1000,
+    }, indent=2))
+    if median > args.budget:
+        print(f"Time to first prompt {median * 1000:.0f} ms exceeds the budget of {args.budget * 1000:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
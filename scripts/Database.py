@@ -1,20 +1,110 @@
 from colorama import init, Fore, Style
 import sqlite3
-import bcrypt
+import random
 import time
-import toml
+import contextvars
+from contextlib import contextmanager
 from scripts.logging import logger
+from scripts import permissions, sqltrace
+from scripts.ratelimit import admission
+from scripts.config import config
+from scripts.metrics import metrics, timed
 
 init(autoreset=True)
 
-# Load configuration
-with open('config.toml', 'r', encoding='utf-8') as f:
-    config = toml.load(f)
-
 database = 'resources/database.db'
 
+DB_QUERY_SECONDS = metrics.histogram('db_query_duration_seconds', 'Time spent in database functions', ('function',))
+BCRYPT_SECONDS = metrics.histogram('bcrypt_duration_seconds', 'Time to hash or verify a password', ('operation',))
+LOGINS = metrics.counter('logins_total', 'Credential checks by outcome', ('result',))
+LOCKOUTS = metrics.counter('lockouts_total', 'Accounts locked after too many failed attempts')
+THROTTLED = metrics.counter('logins_throttled_total', 'Login attempts rejected before verification', ('reason',))
+BUSY_RETRIES_TOTAL = metrics.counter('db_busy_retries_total', 'Writes retried because another process held the lock')
+
+# Write contention between processes sharing the database file
+BUSY_TIMEOUT = 5.0  # seconds SQLite waits for the lock on each try
+BUSY_RETRIES = 5  # further tries after the first, with jittered backoff in between
+BACKOFF_BASE = 0.05
+BACKOFF_MAX = 1.0
+
+# Connection shared by every call inside transaction(), per thread/task
+_transaction = contextvars.ContextVar('phantom_db_transaction', default=None)
+
+class _SharedConnection:
+    """Connection handed out inside transaction(); commit and close are left to the transaction"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
 def get_db_connection():
-    return sqlite3.connect(database)
+    shared = _transaction.get()
+    if shared is not None:
+        return shared
+    return sqltrace.connect(database)
+
+@contextmanager
+def transaction(timeout: float = 30.0):
+    """Run every database call in the block on one connection and commit once.
+
+    The write lock is taken up front (BEGIN IMMEDIATE), so concurrent
+    transactions queue instead of failing halfway. An exception rolls the
+    whole block back. Nested blocks join the outer transaction.
+    """
+    if _transaction.get() is not None:
+        yield
+        return
+    conn = sqltrace.connect(database, timeout=timeout, isolation_level=None)
+    token = _transaction.set(_SharedConnection(conn))
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        yield
+        conn.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        _transaction.reset(token)
+        conn.close()
+
+def _is_busy(error: sqlite3.Error) -> bool:
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xff in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    return 'locked' in str(error) or 'busy' in str(error)
+
+def run_write(operation):
+    """Run operation(conn) as one write transaction and return its result.
+
+    The write lock is taken before the first read (BEGIN IMMEDIATE), so a
+    read-modify-write cannot interleave with another process. While the
+    database stays locked the whole transaction is retried, at most
+    BUSY_RETRIES times with jittered exponential backoff; operation must
+    therefore only touch the database. Inside transaction() it joins the
+    open transaction instead.
+    """
+    if _transaction.get() is not None:
+        return operation(get_db_connection())
+    for attempt in range(BUSY_RETRIES + 1):
+        try:
+            with transaction(BUSY_TIMEOUT):
+                return operation(get_db_connection())
+        except sqlite3.OperationalError as e:
+            if attempt == BUSY_RETRIES or not _is_busy(e):
+                raise
+            BUSY_RETRIES_TOTAL.inc()
+            delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+            logger.debug(f"Database busy ({e}), retrying in {delay * 1000:.0f} ms")
+            time.sleep(delay)
 
 def validate_password_strength(password: str) -> tuple[bool, str]:
     # Check for common weak passwords
@@ -53,18 +143,17 @@ def create_login_tracking_table():
     except sqlite3.Error as e:
         logger.error(f"Error creating login tracking table: {e}")
 
+@timed(DB_QUERY_SECONDS)
 def track_login_attempt(username: str, success: bool):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
+        run_write(lambda conn: conn.execute(
             "INSERT INTO login_attempts (username, attempt_time, success) VALUES (?, datetime('now'), ?)",
             (username, success)
-        )
-        conn.commit()
+        ))
     except sqlite3.Error as e:
         logger.error(f"Error tracking login attempt: {e}")
 
+@timed(DB_QUERY_SECONDS)
 def is_account_locked(username: str) -> bool:
     """Check if an account is locked due to too many failed attempts"""
     try:
@@ -72,6 +161,7 @@ def is_account_locked(username: str) -> bool:
         cursor = conn.cursor()
         cursor.execute("SELECT login_attempts, last_attempt FROM user WHERE name = ?", (username,))
         result = cursor.fetchone()
+        cursor.close()
         
         if not result:
             return False
@@ -79,7 +169,7 @@ def is_account_locked(username: str) -> bool:
         attempts, last_attempt = result
         
         # If user has less than max attempts, account is not locked
-        if attempts < config['security']['max_login_attempts']:
+        if attempts < config.security.max_login_attempts:
             return False
             
         # If no last attempt recorded, account is not locked
@@ -88,10 +178,12 @@ def is_account_locked(username: str) -> bool:
             
         # Check if lockout period has expired
         time_passed = int(time.time()) - last_attempt
-        if time_passed > config['security']['lockout_duration']:
-            # Reset attempts if lockout period expired
-            cursor.execute("UPDATE user SET login_attempts = 0, last_attempt = NULL WHERE name = ?", (username,))
-            conn.commit()
+        if time_passed > config.security.lockout_duration:
+            # Reset attempts if lockout period expired, unless another attempt came in meanwhile
+            run_write(lambda conn: conn.execute(
+                "UPDATE user SET login_attempts = 0, last_attempt = NULL WHERE name = ? AND last_attempt = ?",
+                (username, last_attempt)
+            ))
             return False
             
         return True
@@ -109,6 +201,9 @@ def startup():
         conn = get_db_connection()
         cursor = conn.cursor()
         
+        # Readers and the writer in other processes no longer block each other
+        cursor.execute("PRAGMA journal_mode=WAL")
+        
         # Create user table with login attempt tracking
         cursor.execute("""
         CREATE TABLE IF NOT EXISTS user (
@@ -119,6 +214,8 @@ def startup():
             last_attempt INTEGER
         )
         """)
+        # Serves keyset paging of the user listing (see iter_users)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_role_name ON user (role, name)")
         
         conn.commit()
         logger.info("Database initialized successfully")
@@ -127,18 +224,50 @@ def startup():
     finally:
         conn.close()
 
+# Hashes made ahead of a transaction, so bcrypt does not run while the write lock is held
+_prehashed = contextvars.ContextVar('phantom_db_prehashed', default=None)
+
+@contextmanager
+def prehashed(passwords):
+    """Hash passwords now; hash_password() in the block uses these hashes instead of hashing again"""
+    hashes = {}
+    for password in passwords:
+        hashes.setdefault(password, []).append(hash_password(password))
+    token = _prehashed.set(hashes)
+    try:
+        yield
+    finally:
+        _prehashed.reset(token)
+
 # In hash_password()
 def hash_password(password: str) -> str:
-    pepper = config['security']['pepper']
+    prepared = _prehashed.get()
+    if prepared and prepared.get(password):
+        return prepared[password].pop()
+    pepper = config.security.pepper
     salted_password = password + pepper  # Or pepper + password
-    return bcrypt.hashpw(salted_password.encode(), bcrypt.gensalt()).decode()
+    import bcrypt  # deferred: not needed until the first login
+    with BCRYPT_SECONDS.time('hash'):
+        return bcrypt.hashpw(salted_password.encode(), bcrypt.gensalt()).decode()
 
 # In verify_password()
 def verify_password(password: str, stored_hash: str) -> bool:
-    pepper = config['security']['pepper']
+    pepper = config.security.pepper
     salted_password = password + pepper
-    return bcrypt.checkpw(salted_password.encode(), stored_hash.encode())
+    import bcrypt
+    with BCRYPT_SECONDS.time('verify'):
+        return bcrypt.checkpw(salted_password.encode(), stored_hash.encode())
+
+_dummy_hash = None
+
+def dummy_verify(password: str):
+    """Spend the time of a real verification, so unknown usernames answer as slowly as known ones"""
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password('phantom-dummy-password')
+    verify_password(password, _dummy_hash)
 
+@timed(DB_QUERY_SECONDS)
 def add_user(name: str, password: str, role: str):
     logger.info(f"Adding new user: {name} with role: {role}")
     try:
@@ -152,20 +281,16 @@ def add_user(name: str, password: str, role: str):
         # Hash the password before storing
         password = hash_password(password)
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Check if username already exists
-        cursor.execute("SELECT COUNT(*) FROM user WHERE name = ?", (name,))
-        if cursor.fetchone()[0] > 0:
+        # The primary key decides between concurrent adds of the same name
+        inserted = run_write(lambda conn: conn.execute(
+            "INSERT INTO user (name, password, role) VALUES (?, ?, ?) ON CONFLICT (name) DO NOTHING",
+            (name, password, role)
+        ).rowcount)
+        if not inserted:
             logger.warning(f"Username {name} already exists")
             print(f"{Fore.RED}✖  Username already exists{Style.RESET_ALL}")
             return False
         
-        cursor.execute("INSERT INTO user (name, password, role) VALUES (?, ?, ?)",
-                      (name, password, role))
-        
-        conn.commit()
         logger.info(f"User {name} added successfully")
         return True
     except sqlite3.Error as e:
@@ -173,55 +298,78 @@ def add_user(name: str, password: str, role: str):
         logger.error(error_msg)
         print(f"{Fore.RED}✖  {error_msg}{Style.RESET_ALL}")
         return False
-    finally:
-        conn.close()
 
+@timed(DB_QUERY_SECONDS)
 def verify_credentials(name: str, password: str) -> str:
-    """Verify user credentials and return their role if valid"""
+    """Verify user credentials and return their role if valid.
+
+    Unknown users, wrong passwords and locked accounts all return "" after
+    the same bcrypt work and print nothing (their warnings only go to the
+    log file), so the answer never tells whether an account exists or is
+    locked; None means the attempt was throttled before any check.
+    """
     logger.debug(f"Verifying credentials for user: {name}")
     
     # Check dev user credentials if dev mode is enabled
-    if config['dev']['enabled'] and name == config['dev']['username'] and password == config['dev']['password']:
+    if config.dev.enabled and name == config.dev.username and password == config.dev.password:
         logger.info("Dev user login successful")
+        LOGINS.inc('dev')
         return "root"
     
+    # Rate limits and spray detection, before any lookup or hashing
+    reason = admission.admit()
+    if reason:
+        LOGINS.inc('throttled')
+        THROTTLED.inc(reason)
+        logger.warning(f"Login attempt for {name} rejected: {reason}", print_to_console=False)
+        print(f"{Fore.RED}✖  Too many login attempts. Please try again later.{Style.RESET_ALL}")
+        return None
+    
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
         
         # Check if account is locked
         if is_account_locked(name):
-            print(f"{Fore.RED}✖  Account is locked. Please try again later.{Style.RESET_ALL}")
-            return None
+            dummy_verify(password)
+            admission.failed(name)
+            logger.warning(f"Failed login attempt: Account {name} is locked", print_to_console=False)
+            LOGINS.inc('locked')
+            return ""
         
-        cursor.execute("SELECT password, role, login_attempts FROM user WHERE name = ?", (name,))
+        cursor.execute("SELECT password, role FROM user WHERE name = ?", (name,))
         result = cursor.fetchone()
+        cursor.close()  # no read transaction stays open during the hash
         
         if not result:
-            logger.warning(f"Failed login attempt: User {name} not found")
+            dummy_verify(password)
+            admission.failed(name)
+            logger.warning(f"Failed login attempt: User {name} not found", print_to_console=False)
+            LOGINS.inc('unknown_user')
             return ""
             
-        stored_hash, role, attempts = result
+        stored_hash, role = result
         
         if verify_password(password, stored_hash):
             # Reset login attempts on successful login
-            cursor.execute("UPDATE user SET login_attempts = 0, last_attempt = NULL WHERE name = ?", (name,))
-            conn.commit()
+            run_write(lambda conn: conn.execute(
+                "UPDATE user SET login_attempts = 0, last_attempt = NULL WHERE name = ?", (name,)
+            ))
             logger.info(f"User {name} logged in successfully")
+            LOGINS.inc('success')
             return role
         else:
-            # Increment login attempts
-            new_attempts = attempts + 1
-            cursor.execute("UPDATE user SET login_attempts = ?, last_attempt = ? WHERE name = ?",
-                         (new_attempts, int(time.time()), name))
-            conn.commit()
+            new_attempts = record_failed_login(name)
+            admission.failed(name)
+            LOGINS.inc('failure')
             
-            if new_attempts >= config['security']['max_login_attempts']:
-                logger.warning(f"Account {name} locked due to too many failed attempts")
-                print(f"{Fore.RED}✖  Too many failed attempts. Account has been locked.{Style.RESET_ALL}")
+            if new_attempts >= config.security.max_login_attempts:
+                LOCKOUTS.inc()
+                logger.warning(f"Account {name} locked due to too many failed attempts", print_to_console=False)
             else:
-                remaining = config['security']['max_login_attempts'] - new_attempts
-                print(f"{Fore.YELLOW}⚠  {remaining} attempts remaining{Style.RESET_ALL}")
+                logger.warning(f"Failed login attempt for {name}: "
+                               f"{config.security.max_login_attempts - new_attempts} attempts remaining",
+                               print_to_console=False)
                 
             return ""
             
@@ -231,10 +379,22 @@ def verify_credentials(name: str, password: str) -> str:
     finally:
         conn.close()
 
+@timed(DB_QUERY_SECONDS)
+def record_failed_login(name: str) -> int:
+    """Count a failed login in the database; returns the account's failed attempts so far"""
+    def increment(conn):
+        # Incremented in SQL, so concurrent failures from other processes are all counted
+        conn.execute("UPDATE user SET login_attempts = COALESCE(login_attempts, 0) + 1, last_attempt = ? "
+                     "WHERE name = ?", (int(time.time()), name))
+        row = conn.execute("SELECT login_attempts FROM user WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+    return run_write(increment)
+
+@timed(DB_QUERY_SECONDS)
 def get_user_role(username: str) -> str:
     """Get the role of a user"""
     # Check if dev mode is enabled and this is the dev user
-    if config['dev']['enabled'] and username == config['dev']['username']:
+    if config.dev.enabled and username == config.dev.username:
         return 'root'
         
     try:
@@ -255,6 +415,7 @@ def get_user_role(username: str) -> str:
     finally:
         conn.close()
 
+@timed(DB_QUERY_SECONDS)
 def has_root_user():
     """Check if any root user exists in the database"""
     logger.debug("Checking for root user existence")
@@ -270,30 +431,42 @@ def has_root_user():
     finally:
         conn.close()
 
+@timed(DB_QUERY_SECONDS)
+def count_users() -> int:
+    """Number of users in the database (0 on error)"""
+    try:
+        conn = get_db_connection()
+        return conn.execute("SELECT COUNT(*) FROM user").fetchone()[0]
+    except sqlite3.Error as e:
+        logger.error(f"Database error while counting users: {e}")
+        return 0
+    finally:
+        conn.close()
+
+@timed(DB_QUERY_SECONDS)
 def delete_user(name: str) -> bool:
     """Delete a user from the database"""
     logger.info(f"Attempting to delete user: {name}")
+    def delete(conn):
+        # Check and delete under one write lock, so the user cannot become root in between
+        result = conn.execute("SELECT role FROM user WHERE name = ?", (name,)).fetchone()
+        if result and result[0] != 'root':
+            conn.execute("DELETE FROM user WHERE name = ?", (name,))
+        return result[0] if result else None
+    
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Check if user exists and get their role
-        cursor.execute("SELECT role FROM user WHERE name = ?", (name,))
-        result = cursor.fetchone()
+        role = run_write(delete)
         
-        if not result:
+        if role is None:
             logger.warning(f"User {name} not found")
             print(f"{Fore.RED}✖  User not found{Style.RESET_ALL}")
             return False
             
-        if result[0] == 'root':
+        if role == 'root':
             logger.warning(f"Attempted to delete root user {name}")
             print(f"{Fore.RED}✖  Cannot delete root users{Style.RESET_ALL}")
             return False
         
-        cursor.execute("DELETE FROM user WHERE name = ?", (name,))
-        conn.commit()
-        
         logger.info(f"Successfully deleted user {name}")
         return True
         
@@ -302,89 +475,89 @@ def delete_user(name: str) -> bool:
         logger.error(error_msg)
         print(f"{Fore.RED}✖  {error_msg}{Style.RESET_ALL}")
         return False
-    finally:
-        conn.close()
 
+@timed(DB_QUERY_SECONDS)
 def update_user(name: str, new_name: str = None, new_password: str = None, new_role: str = None):
     logger.info(f"Attempting to update user: {name}")
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Check if user exists and get current role
-        cursor.execute("SELECT role FROM user WHERE name = ?", (name,))
-        result = cursor.fetchone()
+    
+    # Build update query dynamically
+    updates = []
+    params = []
+    
+    if new_name:
+        updates.append("name = ?")
+        params.append(new_name)
         
-        if not result:
-            msg = f"User {name} not found"
+    if new_password:
+        # Validate password strength
+        valid, msg = validate_password_strength(new_password)
+        if not valid:
             logger.warning(msg)
-            print(f"{Fore.RED}{msg}{Style.RESET_ALL}")
+            print(f"{Fore.RED}✖  {msg}{Style.RESET_ALL}")
             return False
-            
-        current_role = result[0]
         
-        # Prevent modifying root users
-        if current_role == 'root' and (new_role or new_name):
-            msg = "Cannot modify root user's name or role"
+        updates.append("password = ?")
+        params.append(hash_password(new_password))
+        
+    if new_role:
+        if new_role == 'root' or not permissions.is_valid_role(new_role):
+            msg = f"Invalid role. Must be one of: {', '.join(r for r in permissions.role_names() if r != 'root')}"
             logger.warning(msg)
-            print(f"{Fore.RED}{msg}{Style.RESET_ALL}")
+            print(f"{Fore.RED}✖  {msg}{Style.RESET_ALL}")
             return False
+        updates.append("role = ?")
+        params.append(new_role)
         
-        # Build update query dynamically
-        updates = []
-        params = []
+    if not updates:
+        msg = "No updates specified"
+        logger.warning(msg)
+        print(f"{Fore.YELLOW}{msg}{Style.RESET_ALL}")
+        return False
         
-        if new_name:
-            updates.append("name = ?")
-            params.append(new_name)
-            
-        if new_password:
-            # Validate password strength
-            valid, msg = validate_password_strength(new_password)
-            if not valid:
-                logger.warning(msg)
-                print(f"{Fore.RED}{msg}{Style.RESET_ALL}")
-                return False
-            
-            updates.append("password = ?")
-            params.append(hash_password(new_password))
-            
-        if new_role:
-            if new_role not in ['admin', 'user']:
-                msg = "Invalid role. Must be 'admin' or 'user'"
-                logger.warning(msg)
-                print(f"{Fore.RED}{msg}{Style.RESET_ALL}")
-                return False
-            updates.append("role = ?")
-            params.append(new_role)
-            
-        if not updates:
-            msg = "No updates specified"
+    # Add the WHERE clause parameter
+    params.append(name)
+    query = f"UPDATE user SET {', '.join(updates)} WHERE name = ?"
+    
+    def update(conn):
+        # Check and update under one write lock, so the role cannot change in between
+        result = conn.execute("SELECT role FROM user WHERE name = ?", (name,)).fetchone()
+        if result and not (result[0] == 'root' and (new_role or new_name)):
+            conn.execute(query, params)
+        return result[0] if result else None
+    
+    try:
+        current_role = run_write(update)
+        
+        if current_role is None:
+            msg = f"User {name} not found"
             logger.warning(msg)
-            print(f"{Fore.YELLOW}{msg}{Style.RESET_ALL}")
+            print(f"{Fore.RED}✖  {msg}{Style.RESET_ALL}")
             return False
             
-        # Add the WHERE clause parameter
-        params.append(name)
-        
-        # Execute update
-        query = f"UPDATE user SET {', '.join(updates)} WHERE name = ?"
-        cursor.execute(query, params)
-        conn.commit()
+        # Prevent modifying root users
+        if current_role == 'root' and (new_role or new_name):
+            msg = "Cannot modify root user's name or role"
+            logger.warning(msg)
+            print(f"{Fore.RED}✖  {msg}{Style.RESET_ALL}")
+            return False
         
         msg = f"User {name} updated successfully"
         logger.info(msg)
         print(f"{Fore.GREEN}{msg}{Style.RESET_ALL}\n")
         return True
         
+    except sqlite3.IntegrityError:
+        msg = f"Username {new_name} already exists"
+        logger.warning(msg)
+        print(f"{Fore.RED}✖  {msg}{Style.RESET_ALL}")
+        return False
     except sqlite3.Error as e:
         error_msg = f"Database error while updating user: {e}"
         logger.error(error_msg)
-        print(f"{Fore.RED}{error_msg}{Style.RESET_ALL}")
+        print(f"{Fore.RED}✖  {error_msg}{Style.RESET_ALL}")
         return False
-    finally:
-        conn.close()
 
+@timed(DB_QUERY_SECONDS)
 def list_users(current_user=None):
     logger.info("Listing all users")
     try:
@@ -404,22 +577,98 @@ def list_users(current_user=None):
     except sqlite3.Error as e:
         error_msg = f"Database error while listing users: {e}"
         logger.error(error_msg)
-        print(f"{Fore.RED}{error_msg}{Style.RESET_ALL}")
+        print(f"{Fore.RED}✖  {error_msg}{Style.RESET_ALL}")
         return None
     finally:
         conn.close()
 
+@timed(DB_QUERY_SECONDS)
+def find_users(prefix: str, limit: int = 50) -> list:
+    """(name, role) of at most limit users whose name starts with prefix, by name"""
+    pattern = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    try:
+        conn = get_db_connection()
+        # LIKE ignores ASCII case, substr() keeps the match exact
+        return conn.execute(
+            "SELECT name, role FROM user WHERE name LIKE ? || '%' ESCAPE '\\' AND substr(name, 1, ?) = ? "
+            "ORDER BY name LIMIT ?", (pattern, len(prefix), prefix, limit)
+        ).fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Database error while searching users: {e}")
+        return []
+    finally:
+        conn.close()
+
+def iter_users(page_size: int = 100, max_page_size: int = 5000):
+    """Yield (name, role) in listing order, one short keyset query per page.
+
+    No cursor or read lock is held between pages, so a listing left open in
+    the pager never blocks writers. Pages start small for a fast first
+    screen and grow while the caller keeps reading.
+    """
+    try:
+        conn = get_db_connection()
+        roles = [row[0] for row in conn.execute("SELECT DISTINCT role FROM user ORDER BY role DESC")]
+    except sqlite3.Error as e:
+        error_msg = f"Database error while listing users: {e}"
+        logger.error(error_msg)
+        print(f"{Fore.RED}✖  {error_msg}{Style.RESET_ALL}")
+        return
+    finally:
+        conn.close()
+
+    for role in roles:
+        last = ''
+        while True:
+            try:
+                conn = get_db_connection()
+                with DB_QUERY_SECONDS.time('iter_users'):
+                    rows = conn.execute(
+                        "SELECT name, role FROM user WHERE role = ? AND name > ? ORDER BY name LIMIT ?",
+                        (role, last, page_size)
+                    ).fetchall()
+            except sqlite3.Error as e:
+                error_msg = f"Database error while listing users: {e}"
+                logger.error(error_msg)
+                print(f"{Fore.RED}✖  {error_msg}{Style.RESET_ALL}")
+                return
+            finally:
+                conn.close()
+            yield from rows
+            if len(rows) < page_size:
+                break
+            last = rows[-1][0]
+            page_size = min(page_size * 2, max_page_size)
+
 def validate_role(role: str) -> bool:
-    return role.lower() in ['admin', 'user', 'root']
+    return permissions.is_valid_role(role.lower())
+
+# Root password checks made ahead of a transaction, like _prehashed
+_root_verified = contextvars.ContextVar('phantom_db_root_verified', default=None)
 
+@contextmanager
+def preverified_root(passwords):
+    """Check root passwords now; verify_root_password() in the block uses these results"""
+    results = {password: verify_root_password(password) for password in set(passwords)}
+    token = _root_verified.set(results)
+    try:
+        yield
+    finally:
+        _root_verified.reset(token)
+
+@timed(DB_QUERY_SECONDS)
 def verify_root_password(password: str) -> bool:
     """Verify the root user's password"""
     logger.debug("Verifying root password")
+    verified = _root_verified.get()
+    if verified is not None and password in verified:
+        return verified[password]
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
         cursor.execute("SELECT password FROM user WHERE role = 'root' LIMIT 1")
         result = cursor.fetchone()
+        cursor.close()
         
         if not result:
             logger.error("No root user found")
@@ -433,6 +682,7 @@ def verify_root_password(password: str) -> bool:
     finally:
         conn.close()
 
+@timed(DB_QUERY_SECONDS)
 def upgrade_to_root(name: str) -> bool:
     """Upgrade a user to root privileges"""
     logger.info(f"Attempting to upgrade user {name} to root")
@@ -443,6 +693,7 @@ def upgrade_to_root(name: str) -> bool:
         # Check if user exists and isn't already root
         cursor.execute("SELECT role FROM user WHERE name = ?", (name,))
         result = cursor.fetchone()
+        cursor.close()  # nothing stays locked while waiting for the password
         
         if not result:
             logger.warning(f"User {name} not found")
@@ -456,17 +707,22 @@ def upgrade_to_root(name: str) -> bool:
         
         print(f"\n{Fore.YELLOW}⚠  Warning: You are about to upgrade '{name}' to root privileges{Style.RESET_ALL}")
         print(f"{Fore.MAGENTA}Please enter the root password to confirm:{Style.RESET_ALL}")
-        from PhantomConsole import get_password
-        root_password = get_password(f"{Fore.MAGENTA}► Root Password: {Style.RESET_ALL}")
+        from scripts.command_handler import command_handler
+        root_password = command_handler.get_password(f"{Fore.MAGENTA}► Root Password: {Style.RESET_ALL}")
         
         if not verify_root_password(root_password):
             logger.warning("Root password verification failed")
             print(f"{Fore.RED}✖  Root password verification failed{Style.RESET_ALL}")
             return False
         
-        # Update user role to root
-        cursor.execute("UPDATE user SET role = 'root' WHERE name = ?", (name,))
-        conn.commit()
+        # Update user role to root, unless the user was changed while the password was entered
+        upgraded = run_write(lambda conn: conn.execute(
+            "UPDATE user SET role = 'root' WHERE name = ? AND role = ?", (name, result[0])
+        ).rowcount)
+        if not upgraded:
+            logger.warning(f"User {name} changed during the upgrade")
+            print(f"{Fore.RED}✖  User was changed or deleted meanwhile, please try again{Style.RESET_ALL}")
+            return False
         
         logger.info(f"Successfully upgraded {name} to root")
         print(f"{Fore.GREEN}✓  Successfully upgraded user to root{Style.RESET_ALL}")
@@ -1,9 +1,19 @@
 import scripts.Updater
 import scripts.Database
+from scripts.startup_profile import startup_profile
 from colorama import init, Fore, Style
 init(autoreset=True)
 
 
-def start():
-    scripts.Updater.update()
-    scripts.Database.startup()
+def start(check_updates: bool = True):
+    # Roll back an update that was cut off half way, before anything else uses the files
+    scripts.Updater.recover_interrupted()
+    if check_updates:
+        # A release found by an earlier check is installed now, before anything uses the files
+        with startup_profile.phase('update install'):
+            scripts.Updater.install_pending()
+        # Runs in the background; anything it reports is shown at the next prompt
+        with startup_profile.phase('update check'):
+            scripts.Updater.start_background_check()
+    with startup_profile.phase('db init'):
+        scripts.Database.startup()
@@ -1,68 +1,495 @@
-import toml
-import requests
 import os
-import ssl
-import certifi
 from colorama import Fore
-import zipfile
-import io
+import json
+import fnmatch
+import hashlib
+import posixpath
+import urllib.parse
+import re
 import shutil
+import threading
 import time
+from collections import deque
+from typing import List, Optional
 import scripts.logging
+from scripts import output
+from scripts.config import Config, UpdatesConfig, config as shared_config
+from scripts.metrics import metrics
+from scripts.download import CHUNK_SIZE, DownloadError, download, sha256_file
+from scripts.paths import DATA_DIR
 
 logger = scripts.logging.logger
 
 # --------------- [ Secure Update Script ] --------------- #
+#
+# The release check runs on a background thread so startup never waits on
+# the network. Its result is cached on disk together with the response
+# ETag: within check_interval no request is made at all, and afterwards a
+# conditional request (If-None-Match) usually comes back as a cheap 304.
+# Anything the check prints is collected and shown at the next prompt.
+# The background thread only checks: a new release is announced and
+# installed by install_pending() at the next start, before the console
+# imports commands or watches config.toml, never under a running session.
+# requests, certifi, ssl and zipfile are imported inside the functions that
+# use them, so importing this module does not delay the first prompt.
 
-def update():
-    logger.info("Updater started.")
-    # Use context managers for file operations
-    with open('config.toml', 'r', encoding='utf-8') as config_file:
-        config = toml.load(config_file)
+RELEASES_URL = 'https://api.github.com/repos/Gerrxt07/PhantomConsole/releases/latest'
+CACHE_FILE = os.path.join(DATA_DIR, 'update_check.json')
+DOWNLOAD_DIR = os.path.join(DATA_DIR, 'updates')
+# Release asset: {"version", "archive": {"url", "sha256", "size"},
+#                 "files": {"<path>": "<sha256>", ...}, "files_url": "<base url of the release files>"}
+MANIFEST_NAME = 'manifest.json'
 
-    version = config['Version']
+_notices = deque()
+UPDATE_CHECKS = metrics.counter('update_checks_total', 'Release checks by how they were answered', ('result',))
 
-    def get_latest_version():
-        logger.info("Checking for the latest release from GitHub.")
-        try:
-            # Use certifi for trusted CA certificates
-            ssl_context = ssl.create_default_context(cafile=certifi.where())
-            
-            # Enforce TLS 1.2 or higher
-            ssl_context.minimum_version = ssl.TLSVersion.TLSv1_2
-            
-            # Strict hostname and certificate verification
-            ssl_context.check_hostname = True
-            ssl_context.verify_mode = ssl.CERT_REQUIRED
-            
-            url = 'https://api.github.com/repos/Gerrxt07/PhantomConsole/releases/latest'
-            
-            # Custom headers to prevent potential API abuse
-            headers = {
-                'User-Agent': 'PhantomConsole-Updater',
-                'Accept': 'application/vnd.github.v3+json'
-            }
-            
-            response = requests.get(
-                url, 
-                headers=headers, 
-                verify=certifi.where(),  # Additional certificate verification
-                timeout=10  # Prevent indefinite hanging
-            )
-            
+def load_cache() -> dict:
+    """Read the cached release check ({} if there is none)"""
+    try:
+        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_cache(cache: dict):
+    """Write the release check cache atomically"""
+    try:
+        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+        tmp_path = CACHE_FILE + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, CACHE_FILE)
+    except OSError as e:
+        logger.error(f"Could not save update check cache: {e}")
+
+def get_latest_version(settings: Optional[UpdatesConfig] = None, force: bool = False) -> Optional[dict]:
+    """Return the latest release, from the cache when it is fresh enough"""
+    settings = settings or shared_config.updates
+    interval = settings.check_interval
+    url = settings.url or RELEASES_URL
+    cache = load_cache()
+    if cache.get('url') != url:
+        cache = {}
+
+    if not force and cache.get('release') and time.time() - cache.get('checked_at', 0) < interval:
+        logger.info("Using cached release information.")
+        UPDATE_CHECKS.inc('cached')
+        return cache['release']
+
+    logger.info("Checking for the latest release from GitHub.")
+    import ssl
+    import certifi
+    import requests
+    try:
+        # Use certifi for trusted CA certificates
+        ssl_context = ssl.create_default_context(cafile=certifi.where())
+        
+        # Enforce TLS 1.2 or higher
+        ssl_context.minimum_version = ssl.TLSVersion.TLSv1_2
+        
+        # Strict hostname and certificate verification
+        ssl_context.check_hostname = True
+        ssl_context.verify_mode = ssl.CERT_REQUIRED
+        
+        # Custom headers to prevent potential API abuse
+        headers = {
+            'User-Agent': 'PhantomConsole-Updater',
+            'Accept': 'application/vnd.github.v3+json'
+        }
+        if cache.get('etag') and cache.get('release'):
+            headers['If-None-Match'] = cache['etag']
+        
+        response = requests.get(
+            url, 
+            headers=headers, 
+            verify=certifi.where(),  # Additional certificate verification
+            timeout=10  # Prevent indefinite hanging
+        )
+        
+        if response.status_code == 304:
+            logger.info("Release information not modified since the last check.")
+            UPDATE_CHECKS.inc('not_modified')
+        else:
             response.raise_for_status()  # Raise an exception for bad status codes
-            return response.json()
-            
-        except requests.exceptions.SSLError:
-            logger.error("SSL Certificate verification failed. Update aborted.")
-            print(Fore.RED + "SSL Certificate Verification Failed. Update Aborted.")
-            return None
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Update check failed: {e}")
-            print(Fore.RED + f"Update Check Failed: {e}")
-            return None
-
-    latest_release = get_latest_version()
+            data = response.json()
+            manifest = next((asset['browser_download_url'] for asset in data.get('assets', [])
+                             if asset.get('name') == MANIFEST_NAME), None)
+            cache['release'] = {'tag_name': data['tag_name'], 'zipball_url': data['zipball_url'],
+                                'manifest_url': manifest}
+            cache['etag'] = response.headers.get('ETag')
+            UPDATE_CHECKS.inc('fetched')
+        cache['url'] = url
+        cache['checked_at'] = time.time()
+        save_cache(cache)
+        return cache['release']
+        
+    except requests.exceptions.SSLError:
+        logger.error("SSL Certificate verification failed. Update aborted.")
+        print(Fore.RED + "SSL Certificate Verification Failed. Update Aborted.")
+        UPDATE_CHECKS.inc('failed')
+        return None
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Update check failed: {e}")
+        print(Fore.RED + f"Update Check Failed: {e}")
+        UPDATE_CHECKS.inc('failed')
+        return None
+    except (KeyError, ValueError) as e:
+        logger.error(f"Unexpected release information: {e}")
+        print(Fore.RED + "Update Check Failed: unexpected response")
+        UPDATE_CHECKS.inc('failed')
+        return None
+
+def fetch_manifest(release: dict) -> Optional[dict]:
+    """Download the release manifest that carries the archive checksum"""
+    if not release.get('manifest_url'):
+        return None
+    import certifi
+    import requests
+    response = requests.get(
+        release['manifest_url'],
+        headers={'User-Agent': 'PhantomConsole-Updater', 'Accept': 'application/octet-stream'},
+        verify=certifi.where(),
+        timeout=10
+    )
+    response.raise_for_status()
+    return response.json()
+
+# --------------- [ Delta Install ] --------------- #
+#
+# The manifest lists a SHA-256 for every file of a release. Only files whose
+# hash differs from the installed copy are fetched - one by one from
+# files_url, or out of the verified release archive - and written to a
+# staging directory next to the install, so the final step is a rename on
+# the same filesystem. Each file being replaced or removed is moved into a
+# rollback directory first; if the swap fails half way, everything is put
+# back. The local database and config.toml are never touched (only the
+# Version line of config.toml is rewritten).
+#
+# A journal in the rollback directory exists for exactly as long as the
+# swap runs. It also serves as the install lock. If the process dies half
+# way, the journal is still there at the next start, and
+# recover_interrupted() rolls the tree back to the previous version before
+# anything is imported from it.
+
+STAGING_DIR = '.update_staging'
+ROLLBACK_DIR = '.update_rollback'
+SWAP_JOURNAL = 'swap.json'
+INSTALLED_MANIFEST = os.path.join(DATA_DIR, 'installed_manifest.json')
+PROTECTED = ('config.toml', 'resources/*.db', 'resources/*.db-*', 'resources/*.db-journal',
+             STAGING_DIR + '/*', ROLLBACK_DIR + '/*', '.git/*')
+DOWNLOAD_HEADERS = {
+    'User-Agent': 'PhantomConsole-Updater',
+    'Accept': 'application/octet-stream'
+}
+
+
+class UpdateError(Exception):
+    pass
+
+
+def _safe_path(path: str) -> str:
+    """Normalize a manifest path; reject anything that would leave the install directory"""
+    normalized = posixpath.normpath(path.replace('\\', '/'))
+    if normalized.startswith(('/', '../')) or normalized in ('.', '..') or ':' in normalized:
+        raise UpdateError(f"Unsafe path in manifest: {path}")
+    return normalized
+
+def is_protected(path: str) -> bool:
+    return any(fnmatch.fnmatch(path, pattern) for pattern in PROTECTED)
+
+def _local_path(root: str, path: str) -> str:
+    return os.path.join(root, *path.split('/'))
+
+def changed_files(files: dict, root: str = '.') -> List[str]:
+    """Manifest paths whose installed copy is missing or differs"""
+    changed = []
+    for path, digest in files.items():
+        local = _local_path(root, path)
+        if not os.path.isfile(local) or sha256_file(local) != digest.lower():
+            changed.append(path)
+    return changed
+
+def load_installed_manifest() -> dict:
+    try:
+        with open(INSTALLED_MANIFEST, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_json(path: str, data: dict):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp = path + '.tmp'
+    with open(temp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(temp, path)
+
+def set_installed_version(version: str, path: str = 'config.toml'):
+    """Rewrite only the Version line so comments and settings in config.toml survive"""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    text, count = re.subn(r'^Version\s*=.*$', f'Version = "{version}"', text, count=1, flags=re.M)
+    if not count:
+        text = f'Version = "{version}"\n' + text
+    temp = path + '.tmp'
+    with open(temp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temp, path)
+
+def _archive_members(zip_ref: 'zipfile.ZipFile') -> dict:
+    """Map release paths to archive members, dropping the zipball's top-level folder"""
+    names = [info.filename for info in zip_ref.infolist() if not info.is_dir()]
+    prefixes = {name.split('/', 1)[0] for name in names}
+    strip = len(prefixes) == 1 and all('/' in name for name in names)
+    return {_safe_path(name.split('/', 1)[1] if strip else name): name for name in names}
+
+def archive_hashes(archive_path: str) -> dict:
+    """Per-file hashes computed from an archive (for releases whose manifest lists none)"""
+    import zipfile
+    hashes = {}
+    with zipfile.ZipFile(archive_path) as zip_ref:
+        for path, member in _archive_members(zip_ref).items():
+            hasher = hashlib.sha256()
+            with zip_ref.open(member) as source:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                    hasher.update(chunk)
+            hashes[path] = hasher.hexdigest()
+    return hashes
+
+def stage_from_archive(archive_path: str, paths: List[str], files: dict, staging: str):
+    """Extract only the given paths into staging, checking each against its manifest hash"""
+    import zipfile
+    with zipfile.ZipFile(archive_path) as zip_ref:
+        members = _archive_members(zip_ref)
+        for path in paths:
+            if path not in members:
+                raise UpdateError(f"{path} is missing from the release archive")
+            target = _local_path(staging, path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            hasher = hashlib.sha256()
+            with zip_ref.open(members[path]) as source, open(target, 'wb') as dest:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                    dest.write(chunk)
+                    hasher.update(chunk)
+            if hasher.hexdigest() != files[path].lower():
+                raise UpdateError(f"SHA-256 mismatch for {path} in the release archive")
+
+def stage_from_urls(files_url: str, paths: List[str], files: dict, staging: str):
+    """Download only the given paths into staging; download() verifies each hash"""
+    base = files_url.rstrip('/')
+    for path in paths:
+        download(f"{base}/{urllib.parse.quote(path)}", _local_path(staging, path), files[path],
+                 headers=DOWNLOAD_HEADERS)
+
+def swap_in(changed: List[str], removed: List[str], staging: str, rollback_dir: str, root: str = '.') -> dict:
+    """Move staged files into place, keeping the replaced ones in rollback_dir.
+
+    Every step is a rename; if one fails, the files already swapped are
+    restored before the error is raised.
+    """
+    backed_up, added = [], []
+    try:
+        for path in removed + changed:
+            target = _local_path(root, path)
+            if os.path.exists(target):
+                backup = _local_path(rollback_dir, path)
+                os.makedirs(os.path.dirname(backup), exist_ok=True)
+                os.replace(target, backup)
+                backed_up.append(path)
+            if path in removed:
+                continue
+            os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+            os.replace(_local_path(staging, path), target)
+            if backed_up[-1:] != [path]:
+                added.append(path)
+    except OSError:
+        logger.error("Update swap failed, restoring replaced files")
+        _restore(backed_up, added, rollback_dir, root)
+        raise
+    return {'restore': backed_up, 'added': added}
+
+def _restore(backed_up: List[str], added: List[str], rollback_dir: str, root: str = '.'):
+    for path in added:
+        target = _local_path(root, path)
+        if os.path.exists(target):
+            os.remove(target)
+    for path in backed_up:
+        target = _local_path(root, path)
+        os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+        os.replace(_local_path(rollback_dir, path), target)
+
+def _running(pid: int) -> bool:
+    """Whether another live process has this pid (POSIX only; elsewhere it is assumed gone)"""
+    if pid == os.getpid() or os.name != 'posix':
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _restore_installed(version: str, manifest: dict, root: str = '.'):
+    set_installed_version(version, os.path.join(root, 'config.toml'))
+    if manifest:
+        _write_json(INSTALLED_MANIFEST, manifest)
+    elif os.path.exists(INSTALLED_MANIFEST):
+        os.remove(INSTALLED_MANIFEST)
+
+def recover_interrupted(root: str = '.') -> bool:
+    """Roll back a swap that did not finish (its journal is left); False if there was none to undo"""
+    rollback_dir = os.path.join(root, ROLLBACK_DIR)
+    path = os.path.join(rollback_dir, SWAP_JOURNAL)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            journal = json.load(f)
+    except FileNotFoundError:
+        return False
+    except (OSError, ValueError):
+        # The journal is complete before the first file moves, so nothing was swapped yet
+        logger.warning("Removing an incomplete update journal")
+        os.remove(path)
+        return False
+    if _running(journal.get('pid', 0)):
+        return False
+    logger.warning(f"Update to {journal['target']} was interrupted, restoring version {journal['version']}")
+    existing = set(journal['existing'])
+    for item in journal['removed'] + journal['changed']:
+        target = _local_path(root, item)
+        backup = _local_path(rollback_dir, item)
+        if os.path.exists(backup):
+            os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+            os.replace(backup, target)
+        elif item not in existing and os.path.exists(target):
+            os.remove(target)
+    _restore_installed(journal['version'], journal['manifest'], root)
+    # The previous update's rollback copy was dropped when this one started
+    shutil.rmtree(rollback_dir, ignore_errors=True)
+    shutil.rmtree(os.path.join(root, STAGING_DIR), ignore_errors=True)
+    print(Fore.YELLOW + f"⚠  An interrupted update was rolled back to version {journal['version']}.")
+    return True
+
+def rollback(root: str = '.') -> bool:
+    """Undo the last installed update from its rollback copy"""
+    if recover_interrupted(root):
+        return True
+    rollback_dir = os.path.join(root, ROLLBACK_DIR)
+    try:
+        with open(os.path.join(rollback_dir, 'rollback.json'), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        print(Fore.RED + "✖  No update to roll back.")
+        return False
+    _restore(state['restore'], state['added'], rollback_dir, root)
+    _restore_installed(state['version'], state.get('manifest'), root)
+    shutil.rmtree(rollback_dir, ignore_errors=True)
+    logger.info(f"Rolled back to version {state['version']}")
+    print(Fore.GREEN + f"Rolled back to version {state['version']}.")
+    print(Fore.YELLOW + 'Please restart the application to apply the change.')
+    return True
+
+def install_release(release: dict, config: Config = shared_config, root: str = '.'):
+    import requests
+    latest_version = release['tag_name']
+    staging = os.path.join(root, STAGING_DIR)
+    journal_path = os.path.join(root, ROLLBACK_DIR, SWAP_JOURNAL)
+    journal = None
+    archive_path = os.path.join(DOWNLOAD_DIR, re.sub(r'[^A-Za-z0-9._-]', '_', latest_version) + '.zip')
+    try:
+        recover_interrupted(root)
+        if os.path.exists(journal_path):
+            logger.warning("Another update is being installed")
+            print(Fore.YELLOW + '⚠  Another update is being installed. Update skipped.')
+            return
+        manifest = fetch_manifest(release) or {}
+        archive = manifest.get('archive', {})
+        files = manifest.get('files')
+        if not (archive.get('sha256') or files) and not config.updates.allow_unverified:
+            logger.error(f"Release {latest_version} publishes no {MANIFEST_NAME} checksum. Update aborted.")
+            print(Fore.RED + f"Release {latest_version} has no checksum manifest. Update aborted.")
+            return
+
+        use_archive = not (files and manifest.get('files_url'))
+        if use_archive:
+            logger.info(f"Attempting to download version {latest_version}")
+            # Prefer the archive named in the manifest, else the zipball URL from the latest release
+            download_url = archive.get('url') or release['zipball_url']
+            # Stream to disk (resuming an interrupted download) and verify the checksum
+            download(download_url, archive_path, archive.get('sha256'), archive.get('size'),
+                     {**DOWNLOAD_HEADERS, 'Accept': 'application/vnd.github.v3.raw'})
+            if not files:
+                files = archive_hashes(archive_path)
+
+        files = {_safe_path(path): digest for path, digest in files.items()}
+        files = {path: digest for path, digest in files.items() if not is_protected(path)}
+        changed = changed_files(files, root)
+        previous = load_installed_manifest().get('files', {})
+        removed = [path for path in previous
+                   if path not in files and not is_protected(path)
+                   and os.path.isfile(_local_path(root, path))]
+        logger.info(f"Update {latest_version}: {len(changed)} changed, {len(removed)} removed, "
+                    f"{len(files) - len(changed)} unchanged")
+
+        if not changed and not removed:
+            # Nothing to swap; keep the rollback copy of the previous update
+            _write_json(INSTALLED_MANIFEST, {'version': latest_version, 'files': files})
+            set_installed_version(latest_version, os.path.join(root, 'config.toml'))
+            logger.info(f"Installed files already match version {latest_version}")
+            print(Fore.GREEN + f'Already up to date with version {latest_version}.')
+            return
+
+        if os.path.exists(staging):
+            shutil.rmtree(staging)
+        if use_archive:
+            stage_from_archive(archive_path, changed, files, staging)
+        else:
+            stage_from_urls(manifest['files_url'], changed, files, staging)
+
+        # Keep only the rollback copy of this update
+        rollback_dir = os.path.join(root, ROLLBACK_DIR)
+        if os.path.exists(rollback_dir):
+            shutil.rmtree(rollback_dir)
+        os.makedirs(rollback_dir)
+        journal = {'pid': os.getpid(), 'target': latest_version, 'version': config.version,
+                   'manifest': load_installed_manifest(), 'changed': changed, 'removed': removed,
+                   'existing': [path for path in removed + changed if os.path.exists(_local_path(root, path))]}
+        # Exclusive create: two installers never swap at the same time
+        with open(journal_path, 'x', encoding='utf-8') as f:
+            json.dump(journal, f)
+        state = swap_in(changed, removed, staging, rollback_dir, root)
+        state.update(version=journal['version'], manifest=journal['manifest'])
+        _write_json(os.path.join(rollback_dir, 'rollback.json'), state)
+
+        _write_json(INSTALLED_MANIFEST, {'version': latest_version, 'files': files})
+        set_installed_version(latest_version, os.path.join(root, 'config.toml'))
+        os.remove(journal_path)
+
+        logger.info(f"Successfully updated to version {latest_version}")
+        print(Fore.GREEN + f'Successfully updated to version {latest_version}! '
+              f'({len(changed)} files changed, {len(removed)} removed)')
+        print(Fore.YELLOW + 'Please restart the application to apply the update.')
+    except requests.exceptions.SSLError:
+        logger.error("SSL Certificate verification failed during download.")
+        print(Fore.RED + "SSL Certificate Verification Failed during download. Update Aborted.")
+    except (requests.exceptions.RequestException, DownloadError) as e:
+        logger.error(f"Download failed: {e}")
+        print(Fore.RED + f"Download Failed: {e}")
+    except Exception as e:
+        logger.error(f"Error during update: {str(e)}")
+        print(Fore.RED + f'Error during update: {str(e)}')
+    finally:
+        # A swap that stopped half way is undone now, or at the next start if this process dies
+        if journal is not None and os.path.exists(journal_path):
+            recover_interrupted(root)
+        shutil.rmtree(staging, ignore_errors=True)
+        if os.path.exists(archive_path):
+            os.remove(archive_path)
+
+def update(force: bool = False):
+    logger.info("Updater started.")
+    version = shared_config.version
+
+    latest_release = get_latest_version(shared_config.updates, force)
 
     if latest_release:
         logger.info(f"Latest release found: {latest_release['tag_name']}")
@@ -72,74 +499,58 @@ def update():
             pass
         else:
             print(Fore.YELLOW + 'New Update found: ' + Fore.WHITE + latest_version + Fore.YELLOW + ' | Downloading...')
-            
-            # Download new Version
-            try:
-                logger.info(f"Attempting to download version {latest_release['tag_name']}")
-                # Get the zipball URL from the latest release
-                download_url = latest_release['zipball_url']
-                
-                # Modified headers for zipball download
-                headers = {
-                    'User-Agent': 'PhantomConsole-Updater',
-                    # Remove the incorrect Accept header or use the GitHub-specific one
-                    'Accept': 'application/vnd.github.v3.raw'
-                }
-                
-                response = requests.get(
-                    download_url,
-                    headers=headers,
-                    verify=certifi.where(),
-                    timeout=30  # Longer timeout for download
-                )
-                response.raise_for_status()
-                
-                if response.status_code == 200:
-                    # Create a temporary directory for the update
-                    temp_dir = 'temp_update'
-                    if os.path.exists(temp_dir):
-                        shutil.rmtree(temp_dir)
-                    os.makedirs(temp_dir)
-
-                    # Extract the downloaded zip
-                    with zipfile.ZipFile(io.BytesIO(response.content)) as zip_ref:
-                        zip_ref.extractall(temp_dir)
-                    
-                    # Get the extracted folder name (it will be the only folder in temp_dir)
-                    extracted_dir = os.path.join(temp_dir, os.listdir(temp_dir)[0])
-                    
-                    # Copy new files to current directory
-                    for item in os.listdir(extracted_dir):
-                        source = os.path.join(extracted_dir, item)
-                        destination = os.path.join('.', item)
-                        
-                        if os.path.isdir(source):
-                            if os.path.exists(destination):
-                                shutil.rmtree(destination)
-                            shutil.copytree(source, destination)
-                        else:
-                            shutil.copy2(source, destination)
-                    
-                    # Update the version in config.toml
-                    config['Version'] = latest_version
-                    with open('config.toml', 'w') as f:
-                        toml.dump(config, f)
-                    
-                    # Clean up
-                    shutil.rmtree(temp_dir)
-                    logger.info(f"Successfully updated to version {latest_version}")
-                    print(Fore.GREEN + f'Successfully updated to version {latest_version}!')
-                    print(Fore.YELLOW + 'Please restart the application to apply the update.')
-                    time.sleep(3000)
-            except requests.exceptions.SSLError:
-                logger.error("SSL Certificate verification failed during download.")
-                print(Fore.RED + "SSL Certificate Verification Failed during download. Update Aborted.")
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Download failed: {e}")
-                print(Fore.RED + f"Download Failed: {e}")
-            except Exception as e:
-                logger.error(f"Error during update: {str(e)}")
-                print(Fore.RED + f'Error during update: {str(e)}')
+            install_release(latest_release)
     else:
         logger.error("Could not check for updates.")
-        print(Fore.RED + 'Could not check for updates.')
\ No newline at end of file
+        print(Fore.RED + 'Could not check for updates.')
+
+def pending_release() -> Optional[dict]:
+    """A newer release found by an earlier check, from the cache (no network)"""
+    cache = load_cache()
+    if cache.get('url') != (shared_config.updates.url or RELEASES_URL):
+        return None
+    release = cache.get('release')
+    if release and release.get('tag_name') != shared_config.version:
+        return release
+    return None
+
+def install_pending():
+    """Install a release announced by an earlier background check; runs at startup only"""
+    if not shared_config.updates.enabled:
+        return
+    release = pending_release()
+    if release:
+        print(Fore.YELLOW + 'Installing update: ' + Fore.WHITE + release['tag_name'])
+        install_release(release)
+
+def _background_check():
+    with output.capture() as messages:
+        try:
+            release = get_latest_version(shared_config.updates)
+            if release is None:
+                print(Fore.RED + 'Could not check for updates.')
+            elif release['tag_name'] != shared_config.version:
+                logger.info(f"Update {release['tag_name']} available")
+                print(Fore.YELLOW + 'New Update found: ' + Fore.WHITE + release['tag_name'] + Fore.YELLOW
+                      + ' | It will be installed the next time Phantom Console starts.')
+        except Exception as e:
+            logger.error(f"Error during update check: {e}")
+    text = messages.getvalue().strip()
+    if text:
+        _notices.append(text)
+
+def start_background_check() -> Optional[threading.Thread]:
+    """Run the release check (never the install) on a daemon thread; never blocks the caller"""
+    if not shared_config.updates.enabled:
+        logger.info("Update check disabled.")
+        return None
+    thread = threading.Thread(target=_background_check, name='phantom-updater', daemon=True)
+    thread.start()
+    return thread
+
+def pop_notices() -> List[str]:
+    """Messages from the background update check that have not been shown yet"""
+    notices = []
+    while _notices:
+        notices.append(_notices.popleft())
+    return notices
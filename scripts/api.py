@@ -0,0 +1,434 @@
+import asyncio
+import contextvars
+import inspect
+import json
+import os
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+import scripts.Database
+from scripts import output, permissions
+from scripts.config import config
+from scripts.logging import logger
+from scripts.ratelimit import login_source, peer_source
+from scripts.session import session_store
+from scripts.terminal import InputBackend, use_terminal
+
+# --------------- [ Management API ] --------------- #
+#
+# A small JSON-RPC 2.0 over HTTP/1.1 endpoint for scripted user
+# administration. Connections are keep-alive (requests may be pipelined)
+# and a JSON array is a batch: all calls in a batch run in one worker thread
+# on one database transaction, so provisioning a thousand users costs one
+# commit instead of a thousand. New passwords are hashed before that
+# transaction takes the write lock, and password checks (login,
+# verify_credentials) cannot be batched: a rolled back batch would undo
+# their failed-login accounting. Changes to live sessions (revoked tokens,
+# new roles) are applied only once the batch has committed. Tokens are
+# ordinary sessions from the shared SessionStore and carry the caller's
+# role permissions.
+#
+#   POST /rpc            {"jsonrpc": "2.0", "id": 1, "method": "login",
+#                         "params": {"username": "...", "password": "..."}}
+#   POST /rpc?atomic=1   [...]  roll the whole batch back if any call fails
+#
+# Every call except login needs "Authorization: Bearer <token>".
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 7422
+MAX_BODY = 1024 * 1024
+RPC_PATH = '/rpc'
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+OPERATION_FAILED = -32000
+UNAUTHORIZED = -32001
+FORBIDDEN = -32003
+
+HTTP_REASONS = {200: 'OK', 204: 'No Content', 400: 'Bad Request', 404: 'Not Found',
+                405: 'Method Not Allowed', 413: 'Payload Too Large'}
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class _ParamsTerminal(InputBackend):
+    """Line-mode terminal answering prompts from request params (e.g. the root password)"""
+
+    line_mode = True
+
+    def __init__(self, *lines: str):
+        self.lines = list(lines)
+
+    def read_line(self) -> str:
+        if not self.lines:
+            raise EOFError
+        return self.lines.pop(0)
+
+    def read_key(self, timeout: Optional[float] = None) -> Optional[str]:
+        raise EOFError
+
+    def write(self, text: str):
+        pass
+
+    def flush(self):
+        pass
+
+
+# --------------- [ Methods ] --------------- #
+
+METHODS: Dict[str, Tuple[Callable, bool]] = {}
+UNBATCHED = set()  # methods rejected inside batches
+PASSWORD_PARAMS: Dict[str, str] = {}  # method -> parameter holding a new password
+ROOT_PASSWORD_PARAMS: Dict[str, str] = {}  # method -> parameter holding the root password
+
+def method(name: str, capabilities=(), auth: bool = True, batch: bool = True,
+           password: Optional[str] = None, root_password: Optional[str] = None):
+    """Register an API method and the capabilities it requires"""
+    def decorator(func):
+        permissions.declare('api', name, capabilities)
+        METHODS[name] = (func, auth)
+        if not batch:
+            UNBATCHED.add(name)
+        if password:
+            PASSWORD_PARAMS[name] = password
+        if root_password:
+            ROOT_PASSWORD_PARAMS[name] = root_password
+        return func
+    return decorator
+
+# Session changes waiting for the batch transaction to commit
+_pending_sessions = contextvars.ContextVar('phantom_api_pending_sessions', default=None)
+
+def _after_commit(change: Callable, *args):
+    """Apply a session change now, or once the enclosing batch has committed"""
+    pending = _pending_sessions.get()
+    if pending is None:
+        change(*args)
+    else:
+        pending.append((change, args))
+
+def _call(func, *args, **kwargs):
+    """Call a Database function, turning a falsy result into an RpcError with its printed message"""
+    with output.capture() as messages:
+        result = func(*args, **kwargs)
+    if not result:
+        text = output.strip_ansi(messages.getvalue()).strip(' ✖⚠\n')
+        message = text.splitlines()[-1].strip(' ✖⚠') if text else f"{func.__name__} failed"
+        raise RpcError(OPERATION_FAILED, message)
+    return result
+
+@method('login', auth=False, batch=False)
+def rpc_login(caller, username: str, password: str):
+    # One answer for every failure, so lockout and throttling messages do not reveal which usernames exist
+    with output.capture():
+        role = scripts.Database.verify_credentials(username, password)
+    if not role:
+        raise RpcError(OPERATION_FAILED, "Invalid username or password")
+    token = session_store.create(username, role)
+    return {'token': token, 'role': role, 'expires_in': session_store.timeout_seconds}
+
+@method('logout')
+def rpc_logout(caller):
+    return session_store.revoke(caller.token)
+
+@method('verify_credentials', batch=False)
+def rpc_verify_credentials(caller, name: str, password: str):
+    with output.capture():
+        role = scripts.Database.verify_credentials(name, password)
+    return {'valid': bool(role), 'role': role or None}
+
+@method('list_users', ('user.list',))
+def rpc_list_users(caller, prefix: Optional[str] = None, limit: int = 100):
+    if prefix is not None:
+        if not isinstance(prefix, str) or not isinstance(limit, int) or limit < 1:
+            raise RpcError(INVALID_PARAMS, "prefix must be a string and limit a positive integer")
+        users = scripts.Database.find_users(prefix, limit)
+    else:
+        users = scripts.Database.list_users()
+    if users is None:
+        raise RpcError(OPERATION_FAILED, "Database error while listing users")
+    return [{'name': name, 'role': role} for name, role in users]
+
+@method('add_user', ('user.create',), password='password')
+def rpc_add_user(caller, name: str, password: str, role: str = 'user'):
+    if role == 'root' or not permissions.is_valid_role(role):
+        raise RpcError(INVALID_PARAMS, f"Invalid role: {role}")
+    return _call(scripts.Database.add_user, name, password, role)
+
+@method('delete_user', ('user.delete',))
+def rpc_delete_user(caller, name: str):
+    if name == caller.username:
+        raise RpcError(OPERATION_FAILED, "Cannot delete your own account")
+    _call(scripts.Database.delete_user, name)
+    _after_commit(session_store.revoke_user, name)
+    return True
+
+@method('update_user', ('user.update',), password='new_password')
+def rpc_update_user(caller, name: str, new_name: Optional[str] = None,
+                    new_password: Optional[str] = None, new_role: Optional[str] = None):
+    _call(scripts.Database.update_user, name, new_name=new_name,
+          new_password=new_password, new_role=new_role)
+    if new_name:
+        _after_commit(session_store.revoke_user, name)
+    elif new_role:
+        _after_commit(session_store.set_role, name, new_role)
+    return True
+
+@method('upgrade_to_root', ('user.upgrade',), root_password='root_password')
+def rpc_upgrade_to_root(caller, name: str, root_password: str):
+    with use_terminal(_ParamsTerminal(root_password)):
+        _call(scripts.Database.upgrade_to_root, name)
+    _after_commit(session_store.set_role, name, 'root')
+    return True
+
+
+# --------------- [ Dispatch ] --------------- #
+
+def authenticate(token: Optional[str]):
+    """Resolve a bearer token to its session record; persisted console sessions are resumed"""
+    if not token:
+        return None
+    if session_store.validate(token):
+        session_store.touch(token)
+    else:
+        username = session_store.persistence is not None and session_store.resume(token)
+        if not username:
+            return None
+        role = scripts.Database.get_user_role(username)
+        if not role:
+            # Deleted or renamed since the token was issued
+            session_store.revoke(token)
+            return None
+        session_store.set_role(username, role)
+    return session_store.get(token)
+
+def _error(request_id, code: int, message: str) -> dict:
+    return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+
+def _bind(func, caller, params) -> inspect.BoundArguments:
+    try:
+        if isinstance(params, list):
+            return inspect.signature(func).bind(caller, *params)
+        if isinstance(params, dict):
+            return inspect.signature(func).bind(caller, **params)
+        raise TypeError("params must be an array or object")
+    except TypeError as e:
+        raise RpcError(INVALID_PARAMS, str(e))
+
+def _allowed(name: str, caller) -> bool:
+    return caller is not None and permissions.allowed(caller.permissions, 'api', name)
+
+def invoke(request, caller, batched: bool = False) -> Optional[dict]:
+    """Run one JSON-RPC call; returns its response (None for notifications)"""
+    if not isinstance(request, dict) or request.get('jsonrpc') != '2.0' \
+            or not isinstance(request.get('method'), str):
+        return _error(None, INVALID_REQUEST, "Invalid request")
+    request_id = request.get('id')
+    name = request['method']
+    try:
+        if name not in METHODS:
+            raise RpcError(METHOD_NOT_FOUND, f"Method not found: {name}")
+        if batched and name in UNBATCHED:
+            raise RpcError(INVALID_REQUEST, f"{name} cannot be called in a batch")
+        func, needs_auth = METHODS[name]
+        if needs_auth:
+            if caller is None:
+                raise RpcError(UNAUTHORIZED, "Missing or expired token")
+            if not _allowed(name, caller):
+                raise RpcError(FORBIDDEN, "Access denied")
+        bound = _bind(func, caller, request.get('params', {}))
+        result = func(*bound.args, **bound.kwargs)
+    except RpcError as e:
+        return _error(request_id, e.code, e.message) if 'id' in request else None
+    except Exception as e:
+        logger.error(f"API error in {name}: {e}")
+        return _error(request_id, INTERNAL_ERROR, str(e)) if 'id' in request else None
+    if 'id' not in request:
+        return None
+    return {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+
+class _Rollback(Exception):
+    pass
+
+def _batch_params(requests: List, caller, params: Dict[str, str]) -> List[str]:
+    """String values of the named parameter (params: method -> parameter) in calls the caller may make"""
+    values = []
+    for request in requests:
+        name = request.get('method') if isinstance(request, dict) else None
+        if name not in params or not _allowed(name, caller):
+            continue
+        try:
+            bound = _bind(METHODS[name][0], caller, request.get('params', {}))
+        except RpcError:
+            continue
+        value = bound.arguments.get(params[name])
+        if isinstance(value, str):
+            values.append(value)
+    return values
+
+def _new_passwords(requests: List, caller) -> List[str]:
+    """Valid new passwords in the calls of a batch the caller may make"""
+    return [password for password in _batch_params(requests, caller, PASSWORD_PARAMS)
+            if scripts.Database.validate_password_strength(password)[0]]
+
+def run_batch(requests: List, token: Optional[str], atomic: bool = False) -> List[dict]:
+    """Run a batch of calls on one transaction; atomic batches roll back on the first error"""
+    caller = authenticate(token)
+    responses = []
+    shared = scripts.Database.transaction() if len(requests) > 1 else nullcontext()
+    pending = []
+    token = _pending_sessions.set(pending)
+    try:
+        # bcrypt runs before the transaction, so the write lock only covers the SQL
+        with scripts.Database.prehashed(_new_passwords(requests, caller)), \
+                scripts.Database.preverified_root(_batch_params(requests, caller, ROOT_PASSWORD_PARAMS)), shared:
+            for request in requests:
+                response = invoke(request, caller, batched=True)
+                if response is not None:
+                    responses.append(response)
+                if atomic and response is not None and 'error' in response:
+                    raise _Rollback
+    except _Rollback:
+        failed = responses[-1]
+        message = f"Batch rolled back: {failed['error']['message']}"
+        return [r if r is failed else _error(r['id'], OPERATION_FAILED, message) for r in responses]
+    finally:
+        _pending_sessions.reset(token)
+    # Committed: now the sessions may follow the database
+    for change, args in pending:
+        change(*args)
+    return responses
+
+def handle_payload(body: bytes, token: Optional[str], atomic: bool = False):
+    """Decode a request body and run it; returns the JSON-serialisable response (or None)"""
+    try:
+        payload = json.loads(body)
+    except (ValueError, UnicodeDecodeError):
+        return _error(None, PARSE_ERROR, "Parse error")
+    if isinstance(payload, list):
+        if not payload:
+            return _error(None, INVALID_REQUEST, "Empty batch")
+        return run_batch(payload, token, atomic) or None
+    return invoke(payload, authenticate(token))
+
+
+# --------------- [ HTTP ] --------------- #
+
+class ApiServer:
+    def __init__(self, workers: int = 8, max_body: int = MAX_BODY):
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix='phantom-api')
+        self.max_body = max_body
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        """Parse one HTTP/1.x request; returns (method, target, version, headers, body) or None on EOF"""
+        line = await reader.readline()
+        if not line:
+            return None
+        parts = line.decode('latin-1').split()
+        if len(parts) != 3:
+            raise ValueError("Malformed request line")
+        headers = {}
+        while True:
+            header = await reader.readline()
+            if header in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = header.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get('content-length') or 0)
+        if length > self.max_body:
+            raise OverflowError
+        body = await reader.readexactly(length) if length else b''
+        return parts[0].upper(), parts[1], parts[2].upper(), headers, body
+
+    @staticmethod
+    def _respond(writer: asyncio.StreamWriter, status: int, payload=None, keep_alive: bool = True):
+        body = b'' if payload is None else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = [f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}",
+                f"Content-Length: {len(body)}",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if body:
+            head.append("Content-Type: application/json")
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        source = peer_source(writer.get_extra_info('peername'))
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except OverflowError:
+                    self._respond(writer, 413, _error(None, INVALID_REQUEST, "Request too large"), False)
+                    break
+                except (ValueError, asyncio.IncompleteReadError):
+                    self._respond(writer, 400, _error(None, PARSE_ERROR, "Malformed HTTP request"), False)
+                    break
+                if request is None:
+                    break
+                verb, target, version, headers, body = request
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection == 'keep-alive' or (version == 'HTTP/1.1' and connection != 'close')
+
+                path, _, query = target.partition('?')
+                if path not in (RPC_PATH, '/'):
+                    self._respond(writer, 404, _error(None, INVALID_REQUEST, "Not found"), keep_alive)
+                elif verb != 'POST':
+                    self._respond(writer, 405, _error(None, INVALID_REQUEST, "Use POST"), keep_alive)
+                else:
+                    auth = headers.get('authorization', '')
+                    token = auth[7:].strip() if auth.lower().startswith('bearer ') else None
+                    atomic = 'atomic=1' in query.split('&') or 'atomic=true' in query.split('&')
+                    with login_source(source):
+                        ctx = contextvars.copy_context()
+                    payload = await loop.run_in_executor(self.pool, ctx.run, handle_payload, body, token, atomic)
+                    self._respond(writer, 200 if payload is not None else 204, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                    unix_socket: Optional[str] = None):
+        output.install()
+        if unix_socket:
+            server = await asyncio.start_unix_server(self.handle_client, path=unix_socket)
+            where = unix_socket
+        else:
+            server = await asyncio.start_server(self.handle_client, host, port)
+            where = ', '.join(str(sock.getsockname()) for sock in server.sockets)
+        logger.info(f"Management API listening on {where}", print_to_console=True)
+        async with server:
+            await server.serve_forever()
+
+def run(host: Optional[str] = None, port: Optional[int] = None, unix_socket: Optional[str] = None):
+    """Start the management API using the [api] settings from config.toml"""
+    settings = config.api
+    server = ApiServer(workers=settings.workers, max_body=settings.max_body)
+    unix_socket = unix_socket or settings.unix_socket or None
+    try:
+        asyncio.run(server.serve(
+            host or settings.host,
+            port or settings.port,
+            unix_socket,
+        ))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if unix_socket and os.path.exists(unix_socket):
+            os.remove(unix_socket)
@@ -0,0 +1,85 @@
+import json
+import sys
+import time
+from typing import Callable, Iterable, Iterator, Optional, TextIO
+from scripts import output
+
+# --------------- [ Headless Batch Mode ] --------------- #
+#
+# Streams commands through the normal dispatcher without prompts or screen
+# redraws and reports one JSON object per command (JSON Lines), followed by
+# a summary line.
+
+ERROR_MARKER = '✖'  # Every console error message starts with this glyph
+
+def read_script(path: str) -> Iterator[str]:
+    """Yield commands from a script file ('-' for stdin); '#' starts a comment"""
+    stream = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    try:
+        for line in stream:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+def split_commands(text: str) -> Iterator[str]:
+    """Split a -c argument on ';'"""
+    for command in text.split(';'):
+        command = command.strip()
+        if command:
+            yield command
+
+def run_command(command: str, execute: Callable[[str], bool]) -> dict:
+    """Run one command with its output captured and return its JSON result"""
+    result = {'command': command, 'ok': True}
+    keep_going = True
+    start = time.perf_counter()
+    with output.capture() as buffer:
+        try:
+            keep_going = execute(command)
+        except EOFError:
+            result['ok'] = False
+            result['error'] = 'command requires interactive input'
+        except Exception as e:
+            result['ok'] = False
+            result['error'] = str(e)
+    result['duration_ms'] = round((time.perf_counter() - start) * 1000, 3)
+
+    text = output.strip_ansi(buffer.getvalue()).strip('\n')
+    result['output'] = text
+    if result['ok'] and ERROR_MARKER in text:
+        result['ok'] = False
+        result['error'] = next(line.strip(' ✖') for line in text.splitlines() if ERROR_MARKER in line)
+    result['exit'] = keep_going is False
+    return result
+
+def run(commands: Iterable[str], execute: Callable[[str], bool],
+        out: Optional[TextIO] = None) -> int:
+    """Run commands and write JSON results; returns the number of failed commands"""
+    out = out or sys.stdout
+    count = failed = 0
+    start = time.perf_counter()
+    for command in commands:
+        result = run_command(command, execute)
+        count += 1
+        failed += not result['ok']
+        out.write(json.dumps(result, ensure_ascii=False) + '\n')
+        if result['exit']:
+            break
+    elapsed = time.perf_counter() - start
+    out.write(json.dumps({'summary': {
+        'commands': count,
+        'failed': failed,
+        'duration_ms': round(elapsed * 1000, 3),
+        'commands_per_second': round(count / elapsed, 1) if elapsed > 0 else None,
+    }}) + '\n')
+    out.flush()
+    return failed
+
+def error(message: str, out: Optional[TextIO] = None):
+    """Report a fatal headless-mode error as JSON"""
+    out = out or sys.stdout
+    out.write(json.dumps({'error': message}) + '\n')
+    out.flush()
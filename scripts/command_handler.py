@@ -1,49 +1,44 @@
 import os
-from typing import List, Dict, Optional
-import msvcrt
+from typing import Callable, List, Dict, Optional
 from colorama import Fore, Style
-import scripts.Database
+import scripts.permissions
+from scripts.config import config
+from scripts.history import CommandHistory
+from scripts.paths import DATA_DIR
+from scripts.terminal import InputBackend, Key, active_terminal, get_backend
+from scripts.line_editor import LineEditor
+from scripts.registry import registry
+from scripts.render import display_width, pad, panel, write
+from scripts.startup_profile import startup_profile
 
 class CommandHandler:
     def __init__(self):
-        self.commands: Dict[str, str] = {
-            'clear & cls': 'Clear the console screen',
-            'help': 'Show this help message',
-            'user': 'Open the user management',
-            'logout': 'Log out current user',
-            'exit': 'Exit Phantom Console',
-            'info': 'Show informations'
-        }
-        self.command_history: List[str] = []
-        self.history_file = os.path.join(os.getenv('APPDATA'), 'PhantomConsole', 'command_history.txt')
-        self.history_index = 0
-        self._load_history()
-
-    def _load_history(self):
-        """Load command history from file"""
-        try:
-            os.makedirs(os.path.dirname(self.history_file), exist_ok=True)
-            if os.path.exists(self.history_file):
-                with open(self.history_file, 'r') as f:
-                    self.command_history = [line.strip() for line in f.readlines()]
-                    self.history_index = len(self.command_history)
-        except Exception:
-            self.command_history = []
-            self.history_index = 0
+        self.history_file = os.path.join(DATA_DIR, 'command_history.txt')
+        self._terminal = get_backend()
+        self.command_history = CommandHistory(
+            self.history_file,
+            config.console.history_size
+        )
+        self.history_index = len(self.command_history)
         
+    @property
+    def terminal(self) -> InputBackend:
+        """The terminal of the current context (a remote connection), else the local one"""
+        terminal = active_terminal()
+        return terminal if terminal is not None else self._terminal
+
+    @terminal.setter
+    def terminal(self, terminal: InputBackend):
+        self._terminal = terminal
+
     def save_history(self):
-        """Save command history to file"""
-        try:
-            with open(self.history_file, 'w') as f:
-                f.write('\n'.join(self.command_history[-1000:]))  # Keep last 1000 commands
-        except Exception:
-            pass
+        """Flush command history to file (entries are already appended as they are entered)"""
+        self.command_history.close()
 
     def add_to_history(self, command: str):
         """Add a command to history"""
-        if command and (not self.command_history or command != self.command_history[-1]):
-            self.command_history.append(command)
-            self.history_index = len(self.command_history)
+        self.command_history.add(command)
+        self.history_index = len(self.command_history)
 
     def get_previous_command(self) -> Optional[str]:
         """Get previous command from history"""
@@ -59,87 +54,150 @@ class CommandHandler:
         self.history_index = min(len(self.command_history), self.history_index + 1)
         return self.command_history[self.history_index - 1] if self.history_index > 0 else None
 
-    def get_input(self, prompt: str) -> str:
-        """Get input with command history support"""
-        current_input = ""
-        cursor_pos = 0
-        print(prompt, end='', flush=True)
-        
+    def reverse_search(self, editor: LineEditor) -> Optional[str]:
+        """Run Ctrl+R reverse-incremental search inside a line editor.
+
+        Returns the key that ended the search if the caller should act on it
+        (ENTER runs the match), or None when the search was cancelled.
+        """
+        prompt = editor.prompt
+        original = editor.buffer
+        query = ""
+        match = None
+        failed = False
+
+        def show():
+            label = "failed reverse-i-search" if failed else "reverse-i-search"
+            editor.buffer = match[1] if match else (original if not query else editor.buffer)
+            editor.cursor = len(editor.buffer)
+            editor.redraw(f"({label})`{query}': ")
+            editor.flush()
+
+        show()
         while True:
-            if msvcrt.kbhit():
-                char = msvcrt.getch()
+            key = editor.read_key()
+            if key == Key.CTRL_R:
+                if match:
+                    older = self.command_history.search(query, before=match[0])
+                    failed = older is None
+                    match = older or match
+            elif key == Key.BACKSPACE:
+                query = query[:-1]
+                match = self.command_history.search(query)
+                failed = bool(query) and match is None
+            elif key is not None and len(key) == 1 and key.isprintable():
+                query += key
+                found = self.command_history.search(query)
+                failed = found is None
+                match = found or match
+            elif key in (Key.CTRL_C, Key.ESCAPE):
+                editor.buffer = original
+                editor.cursor = len(original)
+                editor.redraw(prompt)
+                return None
+            else:
+                # Any other key accepts the match and is then handled normally
+                editor.redraw(prompt)
+                return key
+            show()
+
+    def complete(self, editor: LineEditor, complete: Callable[[str], List[str]]):
+        """Tab completion: extend the word before the cursor or list the candidates"""
+        line = editor.buffer[:editor.cursor]
+        word = '' if not line or line[-1].isspace() else line.split()[-1]
+        matches = complete(line)
+        if not matches:
+            return
+        common = os.path.commonprefix(matches)
+        if len(matches) == 1:
+            editor.insert(common[len(word):] + ' ')
+        elif len(common) > len(word):
+            editor.insert(common[len(word):])
+        else:
+            editor.emit('\n' + '  '.join(matches) + '\n')
+            editor.redraw()
+
+    def get_input(self, prompt: str, complete: Optional[Callable[[str], List[str]]] = None) -> str:
+        """Get input with line editing, command history and optional Tab completion"""
+        startup_profile.first_prompt()
+        terminal = self.terminal
+        if terminal.line_mode:
+            terminal.write(prompt)
+            terminal.flush()
+            return terminal.read_line()
+        editor = LineEditor(terminal, prompt)
+        editor.start()
+        editor.flush()
+        
+        with terminal:
+            while True:
+                key = editor.read_key()
                 
-                if char in [b'\r', b'\n']:  # Enter
-                    print()
+                if key == Key.ENTER:
+                    current_input = editor.accept()
                     if current_input.strip():
                         self.add_to_history(current_input)
                     return current_input
                     
-                elif char == b'\x03':  # Ctrl+C
+                elif key == Key.CTRL_C:
                     raise KeyboardInterrupt
+                
+                elif key == Key.CTRL_R:
+                    editor.lookahead = self.reverse_search(editor)
+                
+                elif key == Key.TAB:
+                    if complete is not None:
+                        self.complete(editor, complete)
                     
-                elif char == b'\xe0':  # Special keys
-                    second_char = msvcrt.getch()
-                    if second_char == b'H':  # Up arrow
-                        prev_cmd = self.get_previous_command()
-                        if prev_cmd is not None:
-                            # Clear current line
-                            print('\r' + ' ' * (len(prompt) + len(current_input)) + '\r', end='')
-                            print(prompt + prev_cmd, end='', flush=True)
-                            current_input = prev_cmd
-                            cursor_pos = len(current_input)
-                    elif second_char == b'P':  # Down arrow
-                        next_cmd = self.get_next_command()
-                        if next_cmd is not None:
-                            # Clear current line
-                            print('\r' + ' ' * (len(prompt) + len(current_input)) + '\r', end='')
-                            print(prompt + next_cmd, end='', flush=True)
-                            current_input = next_cmd
-                            cursor_pos = len(current_input)
-                            
-                elif char == b'\x08':  # Backspace
-                    if cursor_pos > 0:
-                        current_input = current_input[:cursor_pos-1] + current_input[cursor_pos:]
-                        cursor_pos -= 1
-                        # Redraw the line
-                        print('\r' + ' ' * (len(prompt) + len(current_input) + 1) + '\r', end='')
-                        print(prompt + current_input, end='', flush=True)
-                        if cursor_pos < len(current_input):
-                            # Move cursor back to position
-                            print('\b' * (len(current_input) - cursor_pos), end='', flush=True)
-                            
-                else:  # Regular character
-                    try:
-                        char_str = char.decode('utf-8')
-                        if char_str.isprintable():
-                            current_input = (
-                                current_input[:cursor_pos] + 
-                                char_str + 
-                                current_input[cursor_pos:]
-                            )
-                            cursor_pos += 1
-                            # Redraw the line
-                            print('\r' + prompt + current_input, end='', flush=True)
-                    except UnicodeDecodeError:
-                        pass
+                elif key in (Key.UP, Key.DOWN):
+                    cmd = self.get_previous_command() if key == Key.UP else self.get_next_command()
+                    if cmd is not None:
+                        editor.replace(cmd)
+                
+                else:
+                    editor.handle(key)
+                
+                editor.flush()
 
-    def print_help(self, current_user: str = None):
-        """Print available commands with descriptions"""
-        print(f"\n┌─ {Fore.CYAN}Available Commands {Fore.WHITE}─────────────────────┐")
+    def get_password(self, prompt: str) -> str:
+        """Get password input with asterisk masking"""
+        startup_profile.first_prompt()
+        terminal = self.terminal
+        if terminal.line_mode:
+            terminal.write(prompt)
+            terminal.flush()
+            return terminal.read_line()
+        editor = LineEditor(terminal, prompt, mask='*')
+        editor.start()
+        editor.flush()
         
-        # Get user role, handling dev user case
-        user_role = scripts.Database.get_user_role(current_user) if current_user else None
+        with terminal:
+            while True:
+                key = editor.read_key()
+                if key == Key.ENTER:
+                    return editor.accept()
+                elif key == Key.CTRL_C:
+                    raise KeyboardInterrupt
+                editor.handle(key)
+                editor.flush()
+
+    def print_help(self, permissions: int = 0):
+        """Print the commands available to a permission mask with descriptions"""
+        # Skip commands the session holds no capability for
+        commands = [(' & '.join((spec.name,) + spec.aliases), spec.description)
+                    for spec in registry.top_level()
+                    if scripts.permissions.visible(permissions, spec.name)]
+        width = max((display_width(name) for name, _ in commands), default=0)
+        lines = [f"{pad(name, width)} - {description}" for name, description in commands]
         
-        for cmd, desc in self.commands.items():
-            # Skip root-only commands for non-root users
-            if cmd.startswith('user') and user_role != 'root':
-                continue
-            print(f"│ {cmd:12} - {desc:25} │")
-            
-        print(f"└──────────────────────────────────────────┘{Style.RESET_ALL}\n")
-        print(f"{Fore.YELLOW}Tips:{Style.RESET_ALL}")
-        print("• Use Up/Down arrows for command history")
-        print("• Type 'help' to see this message again\n")
+        write(panel("Available Commands", lines, min_width=40) +
+              f"{Fore.YELLOW}Tips:{Style.RESET_ALL}\n"
+              "• Use Up/Down arrows for command history\n"
+              "• Use Left/Right, Home/End to edit the current line\n"
+              "• Press Ctrl+R to search command history\n"
+              "• Press Tab to complete commands\n"
+              "• End a command with '&' to run it in the background\n"
+              "• Type 'help' to see this message again\n\n")
 
 # Initialize command handler
 command_handler = CommandHandler()
@@ -0,0 +1,52 @@
+from scripts.registry import registry
+
+# --------------- [ Command Declarations ] --------------- #
+#
+# Only metadata lives here; each command module is imported the first time
+# one of its commands (or completers) is used.
+
+USER = 'scripts.commands.user'
+JOBS = 'scripts.commands.jobs'
+STATS = 'scripts.commands.stats'
+SQLTRACE = 'scripts.commands.sqltrace'
+PROFILE = 'scripts.commands.profile'
+
+def register_user_commands():
+    registry.register('user', f'{USER}:handle_user_menu', 'Open the user management')
+    registry.register('user create', f'{USER}:handle_create_user', 'Create a new user',
+                      capabilities=('user.create',), interactive=True)
+    registry.register('user delete', f'{USER}:handle_delete_user', 'Delete a user',
+                      capabilities=('user.delete',), args=('<username>',),
+                      completer=f'{USER}:complete_username', interactive=True)
+    registry.register('user list', f'{USER}:handle_list_users', 'List all users',
+                      capabilities=('user.list',))
+    registry.register('user update', f'{USER}:handle_update_user', 'Update user details',
+                      capabilities=('user.update',), args=('<username>',),
+                      completer=f'{USER}:complete_username', interactive=True)
+    registry.register('user upgrade', f'{USER}:handle_upgrade_user', 'Upgrade to root',
+                      capabilities=('user.upgrade',), args=('<username>',),
+                      completer=f'{USER}:complete_username', interactive=True)
+
+def register_job_commands():
+    registry.register('jobs', f'{JOBS}:handle_jobs', 'List background jobs')
+    registry.register('job', f'{JOBS}:handle_jobs', 'Manage background jobs')
+    registry.register('job status', f'{JOBS}:handle_job_status', 'Show a job and its output',
+                      args=('<id>',), completer=f'{JOBS}:complete_job_id')
+    registry.register('job cancel', f'{JOBS}:handle_job_cancel', 'Cancel a background job',
+                      args=('<id>',), completer=f'{JOBS}:complete_job_id')
+
+def register_system_commands():
+    registry.register('stats', f'{STATS}:handle_stats', 'Show performance metrics',
+                      capabilities=('system.stats',))
+    registry.register('sqltrace', f'{SQLTRACE}:handle_sqltrace_menu', 'Trace database statements',
+                      capabilities=('system.debug',))
+    registry.register('sqltrace on', f'{SQLTRACE}:handle_sqltrace_on', 'Start tracing database statements',
+                      capabilities=('system.debug',))
+    registry.register('sqltrace off', f'{SQLTRACE}:handle_sqltrace_off', 'Stop tracing database statements',
+                      capabilities=('system.debug',))
+    registry.register('sqltrace top', f'{SQLTRACE}:handle_sqltrace_top', 'Show the slowest statements',
+                      capabilities=('system.debug',))
+    registry.register('sqltrace reset', f'{SQLTRACE}:handle_sqltrace_reset', 'Clear the trace statistics',
+                      capabilities=('system.debug',))
+    registry.register('profile', f'{PROFILE}:handle_profile', 'Profile a command',
+                      capabilities=('system.debug',))
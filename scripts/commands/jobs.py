@@ -0,0 +1,71 @@
+from colorama import Fore, Style
+from scripts.jobs import job_queue, RUNNING, DONE, FAILED, CANCELLED
+from scripts.render import Column, print_panel, render_table
+from scripts.session import current_session
+
+# --------------- [ Job Commands ] --------------- #
+
+STATUS_COLORS = {
+    RUNNING: Fore.CYAN,
+    DONE: Fore.GREEN,
+    FAILED: Fore.RED,
+    CANCELLED: Fore.YELLOW,
+}
+
+def _job_from_args(args):
+    if not args[0].isdigit():
+        print(f"{Fore.RED}✖  Invalid job id: {args[0]}{Style.RESET_ALL}")
+        return None
+    job = job_queue.get(int(args[0]), current_session.token)
+    if job is None:
+        print(f"{Fore.RED}✖  Job {args[0]} not found{Style.RESET_ALL}")
+    return job
+
+def complete_job_id(prefix, args):
+    """Complete ids of the current user's jobs"""
+    return [str(job.id) for job in job_queue.list(current_session.token)
+            if str(job.id).startswith(prefix)]
+
+def handle_jobs(args):
+    """List the current user's background jobs"""
+    jobs = job_queue.list(current_session.token)
+    if not jobs:
+        print(f"{Fore.YELLOW}No background jobs. End a command with '&' to run it in the background.{Style.RESET_ALL}")
+        return True
+    rows = ((job.id,
+             f"{STATUS_COLORS.get(job.status, Fore.WHITE)}{job.status}{Style.RESET_ALL}",
+             f"{job.progress * 100:.0f}%" if job.progress is not None and job.active else '',
+             f"{job.elapsed:.1f}s",
+             job.command) for job in jobs)
+    render_table([Column('ID', '>'), Column('Status'), Column('Progress', '>'),
+                  Column('Elapsed', '>'), Column('Command')], rows, title="Jobs")
+    return True
+
+def handle_job_status(args):
+    job = _job_from_args(args)
+    if job is None:
+        return True
+    color = STATUS_COLORS.get(job.status, Fore.WHITE)
+    lines = [f"Command:  {job.command}", f"Status:   {color}{job.status}{Style.RESET_ALL}"]
+    if job.progress is not None:
+        detail = f" - {job.message}" if job.message else ''
+        lines.append(f"Progress: {job.progress * 100:.0f}%{detail}")
+    lines.append(f"Elapsed:  {job.elapsed:.2f}s")
+    if job.error:
+        lines.append(f"Error:    {Fore.RED}{job.error}{Style.RESET_ALL}")
+    print_panel(f"Job {job.id}", lines, min_width=30)
+    if job.output:
+        print(job.output + '\n')
+    return True
+
+def handle_job_cancel(args):
+    job = _job_from_args(args)
+    if job is None:
+        return True
+    if job_queue.cancel(job.id, current_session.token):
+        print(f"{Fore.YELLOW}⚠  Cancellation requested for job {job.id}{Style.RESET_ALL}")
+    elif job.active:
+        print(f"{Fore.RED}✖  Job {job.id} is already running and cannot be stopped{Style.RESET_ALL}")
+    else:
+        print(f"{Fore.RED}✖  Job {job.id} has already finished{Style.RESET_ALL}")
+    return True
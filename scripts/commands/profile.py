@@ -0,0 +1,79 @@
+import time
+from colorama import Fore, Style
+from scripts import profiler
+from scripts.logging import logger
+from scripts.registry import registry
+from scripts.render import Column, render_table
+from scripts.session import current_session
+
+# --------------- [ Profile Command ] --------------- #
+
+DEFAULT_TOP = 15
+USAGE = "profile [--sample] [--top N] <command...>"
+
+def _parse(args):
+    """Split leading options from the profiled command; None on bad usage"""
+    sample = False
+    top = DEFAULT_TOP
+    args = list(args)
+    while args and args[0].startswith('--'):
+        option = args.pop(0)
+        if option == '--sample':
+            sample = True
+        elif option == '--top' and args and args[0].isdigit():
+            top = int(args.pop(0))
+        else:
+            return None
+    if not args:
+        return None
+    return sample, top, ' '.join(args)
+
+def handle_profile(args):
+    """Run a command under the profiler and show where its time went"""
+    parsed = _parse(args)
+    if parsed is None:
+        print(f"{Fore.RED}✖  Usage: {USAGE}{Style.RESET_ALL}")
+        return True
+    sample, top, command = parsed
+
+    run = lambda: registry.dispatch(command, current_session.permissions)
+    started = time.perf_counter()
+    if sample:
+        result, sampler = profiler.sample_call(run)
+        entries = sampler.hot_functions()
+        path = profiler.output_path(command, '.folded')
+        save = sampler.save
+        unit = f"{sampler.samples} samples"
+    else:
+        result, profile = profiler.profile_call(run)
+        entries = profiler.hot_functions(profile)
+        path = profiler.output_path(command, '.pstats')
+        save = profile.dump_stats
+        unit = None
+    elapsed = time.perf_counter() - started
+
+    if sample and not sampler.samples:
+        print(f"{Fore.YELLOW}⚠  '{command}' finished before the first sample; "
+              f"profile it without --sample{Style.RESET_ALL}")
+        return result
+
+    if sample:
+        total = sampler.samples
+        rows = ((function, own, f"{own / total * 100:.1f}%", f"{cumulative / total * 100:.1f}%")
+                for function, _, own, cumulative in entries[:top])
+        columns = [Column('Function'), Column('Samples', '>'), Column('Self', '>'), Column('Total', '>')]
+    else:
+        rows = ((function, calls, f"{own * 1000:.2f} ms", f"{cumulative * 1000:.2f} ms")
+                for function, calls, own, cumulative in entries[:top])
+        columns = [Column('Function'), Column('Calls', '>'), Column('Self', '>'), Column('Cumulative', '>')]
+    print()
+    render_table(columns, rows,
+                 title=f"Profile of '{command}' ({elapsed * 1000:.1f} ms{', ' + unit if unit else ''})")
+
+    try:
+        save(path)
+        print(f"{Fore.GREEN}✔  Profile saved to {path}{Style.RESET_ALL}")
+    except OSError as e:
+        logger.error(f"Could not save profile: {e}")
+        print(f"{Fore.RED}✖  Could not save profile: {e}{Style.RESET_ALL}")
+    return result
@@ -0,0 +1,73 @@
+from colorama import Fore, Style
+import scripts.Database
+from scripts import sqltrace
+from scripts.render import Column, print_panel, render_table
+
+# --------------- [ SQL Trace Commands ] --------------- #
+
+EXPLAINED = 5  # query plans shown below the top table
+
+def _shorten(sql: str, width: int = 70) -> str:
+    return sql if len(sql) <= width else sql[:width - 1] + '…'
+
+def handle_sqltrace_menu(args):
+    """Show the tracing state and the available subcommands"""
+    settings = sqltrace.settings()
+    state = f"{Fore.GREEN}on" if settings['enabled'] else f"{Fore.YELLOW}off"
+    print_panel("SQL Trace", [
+        f"Tracing: {state}{Style.RESET_ALL}",
+        f"Slow query log: {settings['log']} (≥ {settings['slow_ms']:g} ms)",
+        "",
+        "Available Commands:",
+        "• sqltrace on      - Trace new database connections",
+        "• sqltrace off     - Stop tracing",
+        "• sqltrace top [n] - Slowest statements and their query plans",
+        "• sqltrace reset   - Clear the collected statistics",
+    ])
+    return True
+
+def handle_sqltrace_on(args):
+    sqltrace.enable()
+    print(f"{Fore.GREEN}✔  SQL tracing enabled{Style.RESET_ALL}")
+    return True
+
+def handle_sqltrace_off(args):
+    sqltrace.disable()
+    print(f"{Fore.GREEN}✔  SQL tracing disabled{Style.RESET_ALL}")
+    return True
+
+def handle_sqltrace_reset(args):
+    sqltrace.reset()
+    print(f"{Fore.GREEN}✔  SQL trace statistics cleared{Style.RESET_ALL}")
+    return True
+
+def handle_sqltrace_top(args):
+    """List statements by total time and EXPLAIN the worst of them"""
+    if len(args) > 1 or (args and not args[0].isdigit()):
+        print(f"{Fore.RED}✖  Usage: sqltrace top [n]{Style.RESET_ALL}")
+        return True
+    entries = sqltrace.top(int(args[0]) if args else 10)
+    if not entries:
+        hint = '' if sqltrace.enabled() else " (tracing is off, enable it with 'sqltrace on')"
+        print(f"{Fore.YELLOW}⚠  No statements traced yet{hint}{Style.RESET_ALL}")
+        return True
+
+    render_table([Column('Caller'), Column('Statement'), Column('Calls', '>'), Column('Avg', '>'),
+                  Column('Max', '>'), Column('Rows', '>'), Column('Total', '>')],
+                 ((caller, _shorten(sql), stats.count, f"{stats.total / stats.count * 1000:.2f} ms",
+                   f"{stats.max * 1000:.2f} ms", stats.rows, f"{stats.total * 1000:.1f} ms")
+                  for caller, sql, stats in entries),
+                 title="Statements by total time")
+
+    for caller, sql, _ in entries[:EXPLAINED]:
+        plan = sqltrace.explain(scripts.Database.database, sql)
+        if not plan:
+            continue
+        print(f"\n{Fore.CYAN}{caller}{Style.RESET_ALL}: {_shorten(sql, 100)}")
+        for detail in plan:
+            # A SCAN without an index reads the whole table
+            full_scan = detail.startswith('SCAN') and 'INDEX' not in detail
+            color = Fore.YELLOW if full_scan else ''
+            marker = '⚠ ' if full_scan else '  '
+            print(f"  {color}{marker}{detail}{Style.RESET_ALL}")
+    return True
@@ -0,0 +1,75 @@
+import time
+from colorama import Fore, Style
+from scripts.metrics import PREFIX, Histogram, metrics
+from scripts.render import Column, print_panel, render_table
+
+# --------------- [ Stats Command ] --------------- #
+
+def _short(name: str) -> str:
+    return name[len(PREFIX):] if name.startswith(PREFIX) else name
+
+def _ms(seconds) -> str:
+    if seconds is None:
+        return '> 10 s'
+    return f"{seconds * 1000:.2f} ms"
+
+def _uptime(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m {seconds:02d}s"
+
+def _hit_rates():
+    """(cache, hits, misses) rows from the cache and update check counters"""
+    rows = {}
+    cache = metrics.get('cache_requests_total')
+    for (name, result), value in (cache.samples() if cache else {}).items():
+        hits, misses = rows.get(name, (0, 0))
+        rows[name] = (hits + value, misses) if result == 'hit' else (hits, misses + value)
+    checks = metrics.get('update_checks_total')
+    if checks:
+        samples = checks.samples()
+        hits = samples.get(('cached',), 0) + samples.get(('not_modified',), 0)
+        misses = samples.get(('fetched',), 0) + samples.get(('failed',), 0)
+        if hits or misses:
+            rows['update_check'] = (hits, misses)
+    return [(name, int(hits), int(misses),
+             f"{hits / (hits + misses) * 100:.1f}%" if hits + misses else '-')
+            for name, (hits, misses) in sorted(rows.items())]
+
+def handle_stats(args):
+    """Show command, database and authentication metrics of this process"""
+    summary = [f"Uptime: {Fore.GREEN}{_uptime(time.time() - metrics.started)}{Style.RESET_ALL}"]
+    counters = []
+    histograms = []
+    for metric in metrics.metrics.values():
+        if isinstance(metric, Histogram):
+            histograms.append(metric)
+        elif metric.name != PREFIX + 'cache_requests_total':
+            for labels, value in sorted(metric.samples().items()):
+                if labels:
+                    counters.append((_short(metric.name), ', '.join(labels), f"{value:g}"))
+                else:
+                    summary.append(f"{metric.description}: {Fore.CYAN}{value:g}{Style.RESET_ALL}")
+    print_panel("Statistics", summary, min_width=40)
+
+    for metric in histograms:
+        samples = metric.samples()
+        if not samples:
+            continue
+        # Where the time went: largest total first
+        ordered = sorted(samples.items(), key=lambda item: item[1].sum, reverse=True)
+        rows = ((', '.join(labels) or '-', series.count, _ms(series.sum / series.count),
+                 f"≤ {_ms(metric.quantile(series, 0.5))}", f"≤ {_ms(metric.quantile(series, 0.99))}",
+                 f"{series.sum:.3f} s")
+                for labels, series in ordered)
+        render_table([Column(', '.join(metric.labels).title() or 'Series'), Column('Count', '>'),
+                      Column('Avg', '>'), Column('p50', '>'), Column('p99', '>'), Column('Total', '>')],
+                     rows, title=metric.description)
+
+    if counters:
+        render_table([Column('Counter'), Column('Labels'), Column('Value', '>')], counters, title="Counters")
+    rates = _hit_rates()
+    if rates:
+        render_table([Column('Cache'), Column('Hits', '>'), Column('Misses', '>'), Column('Hit rate', '>')],
+                     rates, title="Cache hit rates")
+    return True
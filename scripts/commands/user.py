@@ -0,0 +1,177 @@
+from itertools import chain
+from colorama import Fore, Style
+import scripts.Database
+import scripts.permissions
+from scripts.command_handler import command_handler
+from scripts.jobs import in_job, track
+from scripts.pager import page_table
+from scripts.render import Column, print_panel
+from scripts.session import current_session, session_store
+
+# --------------- [ User Management Commands ] --------------- #
+
+get_password = command_handler.get_password
+COMPLETION_LIMIT = 50  # usernames offered per Tab press
+
+def prompt_role(prompt):
+    """Let the operator pick one of the configured non-root roles"""
+    roles = [role for role in scripts.permissions.role_names() if role != 'root']
+    print(f"\n{prompt}")
+    for i, role in enumerate(roles, 1):
+        print(f"{i}. {role.capitalize()}")
+    role_choice = command_handler.get_input(f"{Fore.CYAN}►  Choice (1-{len(roles)}): {Style.RESET_ALL}")
+    if role_choice.isdigit() and 1 <= int(role_choice) <= len(roles):
+        return roles[int(role_choice) - 1]
+    print(f"{Fore.RED}✖  Invalid role choice{Style.RESET_ALL}")
+    return None
+
+def complete_username(prefix, args):
+    """Complete usernames for user subcommands"""
+    return [name for name, _ in scripts.Database.find_users(prefix, COMPLETION_LIMIT)]
+
+def handle_user_menu(args):
+    """Show the user management overview"""
+    print_panel("User Management", [
+        "Available Commands:",
+        "• user create  - Create a new user",
+        "• user delete  - Delete a user",
+        "• user list    - List all users",
+        "• user update  - Update user details",
+        "• user upgrade - Upgrade to root",
+    ])
+    return True
+
+def handle_create_user(args=None):
+    print_panel("Create New User", ["Please enter the new user details"])
+
+    username = command_handler.get_input(f"{Fore.CYAN}► Username: {Style.RESET_ALL}")
+    if not username:
+        print(f"{Fore.RED}✖  Username cannot be empty!{Style.RESET_ALL}")
+
+    print(f"\n{Fore.YELLOW}Password Requirements:{Style.RESET_ALL}")
+    print("• Minimum 8 characters")
+    print("• At least one uppercase letter")
+    print("• At least one lowercase letter")
+    print("• At least one number")
+    print("• At least one special character (!@#$%^&*()_+-=[]{}|;:,.<>?)")
+
+    password = get_password(f"\n{Fore.CYAN}► Password: {Style.RESET_ALL}")
+    confirm = get_password(f"{Fore.CYAN}► Confirm Password: {Style.RESET_ALL}")
+
+    if password != confirm:
+        print(f"{Fore.RED}✖  Passwords do not match{Style.RESET_ALL}")
+        return True
+
+    role = prompt_role("Select role:")
+    if not role:
+        return True
+
+    scripts.Database.add_user(username, password, role)
+    return True
+
+def handle_delete_user(args):
+    username = args[0]
+    if username == current_session.username:
+        print(f"{Fore.RED}✖  Cannot delete your own account{Style.RESET_ALL}")
+        return True
+
+    print(f"\n{Fore.YELLOW}⚠  Warning: You are about to delete user '{username}'{Style.RESET_ALL}")
+    confirm = command_handler.get_input("Are you sure? (y/N): ").lower()
+    if confirm != 'y':
+        print(f"{Fore.YELLOW}Operation cancelled{Style.RESET_ALL}")
+        return True
+
+    if scripts.Database.delete_user(username):
+        session_store.revoke_user(username)
+        print(f"{Fore.GREEN}✓  User deleted successfully{Style.RESET_ALL}")
+    return True
+
+ROLE_COLORS = {
+    'root': Fore.RED,
+    'admin': Fore.YELLOW,
+    'user': Fore.GREEN
+}
+
+def handle_list_users(args):
+    users = scripts.Database.iter_users()
+    first = next(users, None)
+    if first is None:
+        print(f"{Fore.YELLOW}No users found{Style.RESET_ALL}")
+        return True
+    me = current_session.username
+    rows = ((f"{Fore.GREEN}{user}{Style.RESET_ALL}" if user == me else user,
+             f"{ROLE_COLORS.get(role, Fore.WHITE)}{role}{Style.RESET_ALL}")
+            for user, role in chain([first], users))
+    if in_job():
+        rows = track(rows, scripts.Database.count_users(), "users listed")
+    page_table([Column(min_width=15), Column(min_width=8)], rows, title="User List")
+    return True
+
+def handle_update_user(args):
+    target_user = args[0]
+    user_role = scripts.Database.get_user_role(target_user)
+
+    if not user_role:
+        print(f"{Fore.RED}✖  User {target_user} not found{Style.RESET_ALL}")
+        return True
+
+    if user_role == "root" and target_user == "root":
+        print(f"{Fore.RED}✖  Cannot modify the primary root user{Style.RESET_ALL}")
+        return True
+
+    while True:
+        print_panel("Update User", [
+            "1. Update Username",
+            "2. Update Password",
+            "3. Update Role",
+            "4. Exit",
+        ], min_width=30)
+
+        choice = command_handler.get_input(f"{Fore.CYAN}►  Choice (1-4): {Style.RESET_ALL}")
+
+        if choice == "1":
+            new_name = command_handler.get_input(f"{Fore.CYAN}►  New Username: {Style.RESET_ALL}")
+            if scripts.Database.update_user(target_user, new_name=new_name):
+                session_store.revoke_user(target_user)
+            return True
+        elif choice == "2":
+            print(f"\n{Fore.YELLOW}Password Requirements:{Style.RESET_ALL}")
+            print("• Minimum 8 characters")
+            print("• At least one uppercase letter")
+            print("• At least one lowercase letter")
+            print("• At least one number")
+            print("• At least one special character (!@#$%^&*()_+-=[]{}|;:,.<>?)")
+
+            new_pass = get_password(f"\n{Fore.CYAN}►  New Password: {Style.RESET_ALL}")
+            confirm = get_password(f"{Fore.CYAN}►  Confirm Password: {Style.RESET_ALL}")
+
+            if new_pass != confirm:
+                print(f"{Fore.RED}✖  Passwords do not match{Style.RESET_ALL}")
+                continue
+
+            scripts.Database.update_user(target_user, new_password=new_pass)
+            return True
+        elif choice == "3":
+            new_role = prompt_role("Select new role:")
+            if not new_role:
+                continue
+
+            if scripts.Database.update_user(target_user, new_role=new_role):
+                session_store.set_role(target_user, new_role)
+            return True
+        elif choice == "4":
+            return True
+        else:
+            print(f"{Fore.RED}✖  Invalid choice{Style.RESET_ALL}")
+
+def handle_upgrade_user(args):
+    username = args[0]
+    print(f"\n{Fore.YELLOW}⚠  Warning: You are about to upgrade '{username}' to root privileges{Style.RESET_ALL}")
+    root_password = get_password("Please enter the root password to confirm:\n► Root Password: ")
+
+    if scripts.Database.verify_root_password(root_password):
+        if scripts.Database.upgrade_to_root(username):
+            session_store.set_role(username, 'root')
+    else:
+        print(f"{Fore.RED}✖  Invalid root password{Style.RESET_ALL}")
+    return True
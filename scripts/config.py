@@ -0,0 +1,225 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+import toml
+from scripts.logging import logger
+from scripts.startup_profile import startup_profile
+
+# --------------- [ Configuration ] --------------- #
+#
+# config.toml is parsed once into typed sections with __slots__, shared by
+# every module (`from scripts.config import config`), so hot paths read
+# plain attributes (config.security.max_login_attempts) instead of nested
+# dict lookups. A watcher thread compares the file's mtime every few
+# seconds and reloads it when it changed; subscribers are then called with
+# the config so they can apply settings that were copied elsewhere (the
+# session timeout, the role table). A file that fails to parse on reload
+# keeps the previous settings; at startup there are none to keep, and the
+# defaults (an empty pepper among them) would fail every stored password,
+# so a missing or broken file is fatal there.
+
+CONFIG_FILE = 'config.toml'
+WATCH_INTERVAL = 2.0  # seconds between mtime checks
+
+Subscriber = Callable[['Config'], None]
+
+
+class ConfigError(Exception):
+    pass
+
+
+class _Section:
+    """A config table with typed fields; FIELDS maps name -> (type, default)"""
+    __slots__ = ()
+    FIELDS: Dict[str, tuple] = {}
+
+    def __init__(self, data: Optional[dict] = None, name: str = ''):
+        data = data or {}
+        for field, (kind, default) in self.FIELDS.items():
+            value = data.get(field, default)
+            if not _matches(value, kind):
+                logger.warning(f"config.toml: [{name}] {field} should be {kind.__name__}, "
+                               f"got {value!r}; using {default!r}")
+                value = default
+            setattr(self, field, float(value) if kind is float else value)
+
+    def __repr__(self) -> str:
+        values = ', '.join(f"{field}={getattr(self, field)!r}" for field in self.FIELDS)
+        return f"{type(self).__name__}({values})"
+
+def _matches(value, kind: type) -> bool:
+    if kind is float:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if kind is int:
+        return isinstance(value, int) and not isinstance(value, bool)
+    return isinstance(value, kind)
+
+
+class DevConfig(_Section):
+    FIELDS = {'enabled': (bool, False), 'username': (str, 'dev'), 'password': (str, 'dev')}
+    __slots__ = tuple(FIELDS)
+
+class ConsoleConfig(_Section):
+    FIELDS = {
+        'session_timeout': (float, 300.0),
+        'max_sessions_per_user': (int, 5),
+        'persist_sessions': (bool, False),
+        'max_persisted_sessions': (int, 100),
+        'history_size': (int, 10000),
+        'job_workers': (int, 0),
+        'debug': (bool, False),
+    }
+    __slots__ = tuple(FIELDS)
+
+class SecurityConfig(_Section):
+    FIELDS = {
+        'max_login_attempts': (int, 3),
+        'lockout_duration': (float, 300.0),
+        'pepper': (str, ''),
+        'login_rate': (float, 10.0),
+        'login_burst': (float, 20.0),
+        'source_rate': (float, 1.0),
+        'source_burst': (float, 5.0),
+        'spray_usernames': (int, 10),
+        'spray_global_usernames': (int, 100),
+        'spray_window': (float, 300.0),
+        'spray_rate': (float, 1.0),
+    }
+    __slots__ = tuple(FIELDS)
+
+class UpdatesConfig(_Section):
+    FIELDS = {
+        'enabled': (bool, True),
+        'check_interval': (float, 86400.0),
+        'url': (str, ''),
+        'allow_unverified': (bool, False),
+    }
+    __slots__ = tuple(FIELDS)
+
+class ServerConfig(_Section):
+    FIELDS = {
+        'host': (str, '127.0.0.1'),
+        'port': (int, 7420),
+        'unix_socket': (str, ''),
+        'max_connections': (int, 1000),
+        'auth_workers': (int, 4),
+        'command_workers': (int, 16),
+    }
+    __slots__ = tuple(FIELDS)
+
+class ApiConfig(_Section):
+    FIELDS = {
+        'host': (str, '127.0.0.1'),
+        'port': (int, 7422),
+        'unix_socket': (str, ''),
+        'workers': (int, 8),
+        'max_body': (int, 1024 * 1024),
+    }
+    __slots__ = tuple(FIELDS)
+
+class MetricsConfig(_Section):
+    FIELDS = {'textfile': (str, ''), 'interval': (float, 15.0)}
+    __slots__ = tuple(FIELDS)
+
+class SqlTraceConfig(_Section):
+    FIELDS = {'enabled': (bool, False), 'slow_ms': (float, 50.0), 'log': (str, '')}
+    __slots__ = tuple(FIELDS)
+
+
+SECTIONS = {
+    'dev': DevConfig,
+    'console': ConsoleConfig,
+    'security': SecurityConfig,
+    'updates': UpdatesConfig,
+    'server': ServerConfig,
+    'api': ApiConfig,
+    'metrics': MetricsConfig,
+    'sqltrace': SqlTraceConfig,
+}
+
+
+class Config:
+    __slots__ = ('path', 'mtime', 'version', 'roles', '_subscribers', '_lock', '_watcher') + tuple(SECTIONS)
+
+    def __init__(self, path: str = CONFIG_FILE):
+        self.path = path
+        self.mtime: Optional[int] = None
+        self._subscribers: List[Subscriber] = []
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self.apply({})
+
+    def apply(self, data: dict):
+        """Replace every section from a parsed config.toml"""
+        self.version = str(data.get('Version', ''))
+        roles = data.get('roles', {})
+        self.roles = roles if isinstance(roles, dict) else {}
+        for name, section in SECTIONS.items():
+            table = data.get(name)
+            setattr(self, name, section(table if isinstance(table, dict) else {}, name))
+
+    def load(self, strict: bool = False) -> bool:
+        """Parse the file; on error the current settings stay in place (strict: raise ConfigError)"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = toml.load(f)
+        except (OSError, toml.TomlDecodeError) as e:
+            if strict:
+                raise ConfigError(f"Could not load {self.path}: {e}") from e
+            logger.error(f"Could not load {self.path}: {e}")
+            return False
+        with self._lock:
+            self.apply(data)
+            self.mtime = mtime
+        return True
+
+    def reload_if_changed(self) -> bool:
+        """Reload and notify subscribers when the file changed since the last load"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self.mtime:
+            return False
+        if not self.load():
+            self.mtime = mtime  # don't retry a broken file until it is saved again
+            return False
+        logger.info(f"Reloaded {self.path}")
+        self.notify()
+        return True
+
+    def subscribe(self, callback: Subscriber, call_now: bool = True):
+        """Call callback(config) after every reload (and right away unless call_now is false)"""
+        self._subscribers.append(callback)
+        if call_now:
+            callback(self)
+
+    def notify(self):
+        for callback in list(self._subscribers):
+            try:
+                callback(self)
+            except Exception as e:
+                logger.error(f"Config subscriber {getattr(callback, '__name__', callback)} failed: {e}")
+
+    def watch(self, interval: float = WATCH_INTERVAL) -> threading.Thread:
+        """Start the daemon thread that reloads the file when it changes"""
+        if self._watcher is None:
+            def run():
+                while True:
+                    time.sleep(interval)
+                    self.reload_if_changed()
+
+            self._watcher = threading.Thread(target=run, name='phantom-config', daemon=True)
+            self._watcher.start()
+        return self._watcher
+
+
+config = Config()
+with startup_profile.phase('config load'):
+    try:
+        config.load(strict=True)
+    except ConfigError as e:
+        logger.error(str(e), print_to_console=False)
+        raise SystemExit(f"✖  {e}\nPhantom Console cannot start without its configuration.")
@@ -0,0 +1,98 @@
+import hashlib
+import os
+from typing import Optional
+import scripts.logging
+
+logger = scripts.logging.logger
+
+# --------------- [ Verified Downloads ] --------------- #
+#
+# Files are streamed to "<dest>.part" in fixed-size chunks and hashed on the
+# way, so memory use does not grow with the file. An interrupted transfer
+# continues from the bytes already on disk with an HTTP Range request. Only
+# a file whose SHA-256 matches the expected digest is renamed into place.
+
+CHUNK_SIZE = 64 * 1024
+DEFAULT_RETRIES = 3
+DEFAULT_TIMEOUT = (10, 30)  # connect, read (seconds)
+
+
+class DownloadError(Exception):
+    pass
+
+
+def sha256_file(path: str, chunk_size: int = CHUNK_SIZE) -> str:
+    """SHA-256 hex digest of a file, read in chunks"""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def _resume_state(part: str):
+    """Bytes already downloaded and a hasher primed with them"""
+    hasher = hashlib.sha256()
+    if not os.path.exists(part):
+        return 0, hasher
+    offset = 0
+    with open(part, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            hasher.update(chunk)
+            offset += len(chunk)
+    return offset, hasher
+
+def download(url: str, dest: str, sha256: Optional[str] = None, size: Optional[int] = None,
+             headers: Optional[dict] = None, retries: int = DEFAULT_RETRIES,
+             timeout=DEFAULT_TIMEOUT) -> str:
+    """Stream url to dest, resuming partial downloads, and verify its SHA-256"""
+    import certifi
+    import requests
+    os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+    part = dest + '.part'
+
+    for attempt in range(retries + 1):
+        offset, hasher = _resume_state(part)
+        resumed = offset > 0
+        request_headers = dict(headers or {})
+        if resumed:
+            request_headers['Range'] = f'bytes={offset}-'
+            logger.info(f"Resuming download of {url} at {offset} bytes")
+
+        try:
+            with requests.get(url, headers=request_headers, stream=True, timeout=timeout,
+                              verify=certifi.where()) as response:
+                # 416: the part file already holds the whole file
+                if not (resumed and response.status_code == 416):
+                    response.raise_for_status()
+                    if resumed and response.status_code != 206:
+                        # Server ignored the range; start over
+                        offset, hasher, resumed = 0, hashlib.sha256(), False
+                    with open(part, 'ab' if resumed else 'wb') as f:
+                        for chunk in response.iter_content(CHUNK_SIZE):
+                            f.write(chunk)
+                            hasher.update(chunk)
+                            offset += len(chunk)
+        except requests.exceptions.SSLError:
+            raise
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Download interrupted at {offset} bytes ({e}), attempt {attempt + 1}/{retries + 1}")
+            continue
+
+        if size is not None and offset < size:
+            logger.warning(f"Download ended early ({offset}/{size} bytes), attempt {attempt + 1}/{retries + 1}")
+            continue
+
+        digest = hasher.hexdigest()
+        if sha256 and digest != sha256.lower():
+            os.remove(part)
+            if resumed:
+                # The bytes on disk may be from an older file; retry from scratch
+                logger.warning("Checksum mismatch after resuming, downloading again")
+                continue
+            raise DownloadError(f"SHA-256 mismatch for {url}: expected {sha256}, got {digest}")
+
+        os.replace(part, dest)
+        logger.info(f"Downloaded {url} ({offset} bytes, sha256 {digest})")
+        return dest
+
+    raise DownloadError(f"Download of {url} failed after {retries + 1} attempts")
@@ -0,0 +1,159 @@
+import os
+from collections import deque
+from typing import Deque, Dict, Optional, Set, Tuple
+from scripts.logging import logger
+
+DEFAULT_MAX_ENTRIES = 1000
+COMPACT_FACTOR = 2  # compact once the log holds this many times max_entries
+SCAN_THRESHOLD = 512  # candidate count above which a newest-first scan is cheaper
+
+
+class CommandHistory:
+    """Append-only command history with a bounded in-memory ring.
+
+    Every command is appended to the log file as soon as it is entered, so
+    a crash loses nothing. Only the newest max_entries stay in memory; the
+    file is compacted down to them once it grows to COMPACT_FACTOR times
+    that size. A trigram index over the distinct commands in the ring keeps
+    reverse search fast however long the history gets.
+    """
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries: Deque[Tuple[int, str]] = deque()
+        self.last_seen: Dict[str, int] = {}
+        self.trigrams: Dict[str, Set[str]] = {}
+        self.next_seq = 0
+        self.file_lines = 0
+        self._file = None
+        self._load()
+
+    def _load(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            needs_newline = False
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8', errors='replace') as f:
+                    for line in f:
+                        needs_newline = not line.endswith('\n')
+                        command = line.strip()
+                        if command:
+                            self._remember(command)
+                            self.file_lines += 1
+            self._file = open(self.path, 'a', encoding='utf-8')
+            if needs_newline:
+                # Older history files were written without a trailing newline
+                self._file.write('\n')
+                self._file.flush()
+        except OSError as e:
+            logger.error(f"Error loading command history: {e}")
+
+    @staticmethod
+    def _grams(text: str) -> Set[str]:
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def _remember(self, command: str):
+        seq = self.next_seq
+        self.next_seq += 1
+        self.entries.append((seq, command))
+        if command not in self.last_seen:
+            for gram in self._grams(command.lower()):
+                self.trigrams.setdefault(gram, set()).add(command)
+        self.last_seen[command] = seq
+
+        while len(self.entries) > self.max_entries:
+            old_seq, old_command = self.entries.popleft()
+            if self.last_seen.get(old_command) == old_seq:
+                del self.last_seen[old_command]
+                for gram in self._grams(old_command.lower()):
+                    commands = self.trigrams.get(gram)
+                    if commands is not None:
+                        commands.discard(old_command)
+                        if not commands:
+                            del self.trigrams[gram]
+
+    def add(self, command: str):
+        """Record a command in memory and append it to the log"""
+        command = command.strip()
+        if not command or (self.entries and self.entries[-1][1] == command):
+            return
+        self._remember(command)
+        if self._file is None:
+            return
+        try:
+            self._file.write(command + '\n')
+            self._file.flush()
+            self.file_lines += 1
+            if self.file_lines >= self.max_entries * COMPACT_FACTOR:
+                self.compact()
+        except OSError as e:
+            logger.error(f"Error writing command history: {e}")
+
+    def compact(self):
+        """Rewrite the log with only the entries still held in memory"""
+        temp_path = self.path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.writelines(command + '\n' for _, command in self.entries)
+                f.flush()
+                os.fsync(f.fileno())
+            if self._file is not None:
+                self._file.close()
+            os.replace(temp_path, self.path)
+            self._file = open(self.path, 'a', encoding='utf-8')
+            self.file_lines = len(self.entries)
+        except OSError as e:
+            logger.error(f"Error compacting command history: {e}")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __getitem__(self, index: int) -> str:
+        return self.entries[index][1]
+
+    def search(self, query: str, before: Optional[int] = None) -> Optional[Tuple[int, str]]:
+        """Find the most recent command containing query, older than seq `before`.
+
+        Returns (seq, command) or None. Pass the seq of the previous match as
+        `before` to step to the next older match.
+        """
+        if before is None:
+            before = self.next_seq
+        if not query:
+            return None
+        needle = query.lower()
+
+        if len(needle) < 3:
+            # Too short for the index; walk back from the newest entry
+            return self._scan(needle, before)
+
+        # Only the rarest trigram's commands need checking
+        postings = []
+        for gram in self._grams(needle):
+            commands = self.trigrams.get(gram)
+            if not commands:
+                return None
+            postings.append(commands)
+        candidates = min(postings, key=len)
+        if len(candidates) > SCAN_THRESHOLD:
+            # Common query: a recent entry almost certainly matches
+            return self._scan(needle, before)
+
+        best = None
+        for command in candidates:
+            seq = self.last_seen[command]
+            if seq < before and (best is None or seq > best[0]) and needle in command.lower():
+                best = (seq, command)
+        return best
+
+    def _scan(self, needle: str, before: int) -> Optional[Tuple[int, str]]:
+        for seq, command in reversed(self.entries):
+            if seq < before and self.last_seen.get(command) == seq and needle in command.lower():
+                return seq, command
+        return None
@@ -0,0 +1,242 @@
+import contextvars
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+from colorama import Fore, Style
+from scripts import batch
+from scripts.logging import logger
+from scripts.metrics import metrics
+from scripts.session import Session, use_session
+from scripts.terminal import FakeBackend, use_terminal
+
+# --------------- [ Background Jobs ] --------------- #
+#
+# A command ending in '&' is queued on a worker pool instead of running on
+# the prompt thread. Jobs run with the submitting session bound and their
+# output captured; they have no keyboard, so a command that prompts fails
+# instead of stealing the operator's input. bcrypt and SQLite release the
+# GIL, so heavy jobs really do run on the other cores.
+#
+# Long-running code reports progress with report_progress() and honours
+# "job cancel" by calling check_cancelled() between steps (track() does
+# both for a loop). A running job that never reached such a checkpoint
+# cannot be stopped, so "job cancel" refuses it. Progress and completion
+# notices are collected and printed at the submitter's next prompt.
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+DEFAULT_MAX_FINISHED = 50
+
+_current_job = contextvars.ContextVar('phantom_job', default=None)
+T = TypeVar('T')
+
+
+class JobCancelled(Exception):
+    def __init__(self):
+        super().__init__("cancelled")
+
+
+class Job:
+    """A single queued or running console command"""
+    __slots__ = ('id', 'command', 'session', 'owner', 'status', 'created', 'started', 'finished',
+                 'progress', 'message', 'shown_progress', 'output', 'error', 'future', 'cancel_event',
+                 'cancellable')
+
+    def __init__(self, job_id: int, command: str, session: Session):
+        self.id = job_id
+        self.command = command
+        self.session = session
+        self.owner = session.token  # notices and listings are scoped to the submitting login
+        self.status = QUEUED
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.progress: Optional[float] = None
+        self.message: Optional[str] = None
+        self.shown_progress: Optional[tuple] = None
+        self.output = ''
+        self.error: Optional[str] = None
+        self.future = None
+        self.cancel_event = threading.Event()
+        self.cancellable = False  # set once the job checks for cancellation
+
+    @property
+    def active(self) -> bool:
+        return self.status in (QUEUED, RUNNING)
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+
+class JobQueue:
+    def __init__(self, workers: Optional[int] = None, max_finished: int = DEFAULT_MAX_FINISHED):
+        self.workers = workers or os.cpu_count() or 2
+        self.max_finished = max_finished
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._retired: List[ThreadPoolExecutor] = []  # replaced by resize(), still finishing their jobs
+        self._ids = itertools.count(1)
+        self._jobs: Dict[int, Job] = {}
+        self._finished = deque()
+        self._notices: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ThreadPoolExecutor:
+        # Called with _lock held, so resize() cannot retire the pool in between
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix='phantom-job')
+        return self._pool
+
+    def resize(self, workers: Optional[int] = None):
+        """Run jobs submitted from now on on workers threads; earlier jobs finish on the old pool"""
+        workers = workers or os.cpu_count() or 2
+        with self._lock:
+            if workers == self.workers:
+                return
+            self.workers = workers
+            if self._pool is not None:
+                self._retired.append(self._pool)
+                self._pool.shutdown(wait=False)
+                self._pool = None
+        logger.info(f"Background jobs now run on {workers} workers")
+
+    def submit(self, command: str, execute: Callable[[str], bool], session: Session) -> Job:
+        """Queue a command to run in the background as session"""
+        with self._lock:
+            job = Job(next(self._ids), command, session)
+            self._jobs[job.id] = job
+            job.future = self._executor().submit(contextvars.copy_context().run, self._run, job, execute)
+        logger.info(f"Job {job.id} queued for {session.username}: {command}")
+        return job
+
+    def _run(self, job: Job, execute: Callable[[str], bool]):
+        if job.cancel_event.is_set():
+            self._finish(job, CANCELLED)
+            return
+        job.status = RUNNING
+        job.started = time.time()
+        token = _current_job.set(job)
+        try:
+            with use_session(job.session), use_terminal(FakeBackend()):
+                result = batch.run_command(job.command, execute)
+        finally:
+            _current_job.reset(token)
+        job.output = result['output']
+        if job.cancel_event.is_set() and not result['ok']:
+            self._finish(job, CANCELLED)
+        elif result['ok']:
+            self._finish(job, DONE)
+        else:
+            job.error = result['error']
+            self._finish(job, FAILED)
+
+    def _finish(self, job: Job, status: str):
+        job.status = status
+        job.finished = time.time()
+        logger.info(f"Job {job.id} {status}: {job.command}")
+        with self._lock:
+            self._notices.setdefault(job.owner, []).append(format_notice(job))
+            self._finished.append(job.id)
+            while len(self._finished) > self.max_finished:
+                self._jobs.pop(self._finished.popleft(), None)
+
+    def get(self, job_id: int, owner: Optional[str] = None) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is None or (owner is not None and job.owner != owner):
+            return None
+        return job
+
+    def list(self, owner: Optional[str] = None) -> List[Job]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job for job in jobs if owner is None or job.owner == owner]
+
+    def cancel(self, job_id: int, owner: Optional[str] = None) -> bool:
+        """Cancel a queued job, or ask a running one to stop at its next checkpoint"""
+        job = self.get(job_id, owner)
+        if job is None or not job.active or (job.status == RUNNING and not job.cancellable):
+            return False
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            self._finish(job, CANCELLED)
+        return True
+
+    def pop_notices(self, owner: Optional[str]) -> List[str]:
+        """Progress and completion notices for owner since the last call"""
+        if owner is None:
+            return []
+        notices = []
+        for job in self.list(owner):
+            state = (job.progress, job.message)
+            if job.status == RUNNING and job.progress is not None and state != job.shown_progress:
+                job.shown_progress = state
+                notices.append(format_notice(job))
+        with self._lock:
+            notices.extend(self._notices.pop(owner, ()))
+        return notices
+
+    def active_count(self) -> int:
+        return sum(1 for job in self.list() if job.active)
+
+    def shutdown(self, wait: bool = True):
+        """Stop the pool; without wait, queued jobs are dropped and running ones asked to stop"""
+        if not wait:
+            for job in self.list():
+                job.cancel_event.set()
+        with self._lock:
+            pools = self._retired + ([self._pool] if self._pool is not None else [])
+            self._retired, self._pool = [], None
+        for pool in pools:
+            pool.shutdown(wait=wait, cancel_futures=not wait)
+
+
+def format_notice(job: Job) -> str:
+    if job.status == RUNNING:
+        percent = f"{job.progress * 100:3.0f}%" if job.progress is not None else '...'
+        detail = f" {job.message}" if job.message else ''
+        return f"{Fore.CYAN}[{job.id}] {percent}{detail}  {job.command}{Style.RESET_ALL}"
+    if job.status == DONE:
+        return f"{Fore.GREEN}[{job.id}] Done ({job.elapsed:.1f}s)  {job.command}{Style.RESET_ALL}"
+    if job.status == CANCELLED:
+        return f"{Fore.YELLOW}[{job.id}] Cancelled  {job.command}{Style.RESET_ALL}"
+    return f"{Fore.RED}[{job.id}] Failed: {job.error}  {job.command}{Style.RESET_ALL}"
+
+def report_progress(fraction: float, message: Optional[str] = None):
+    """Report progress of the job running in this context (no-op outside jobs)"""
+    job = _current_job.get()
+    if job is not None:
+        job.progress = max(0.0, min(1.0, fraction))
+        job.message = message
+
+def check_cancelled():
+    """Raise JobCancelled if the job running in this context was cancelled"""
+    job = _current_job.get()
+    if job is None:
+        return
+    job.cancellable = True
+    if job.cancel_event.is_set():
+        raise JobCancelled()
+
+def track(items: Iterable[T], total: int, message: Optional[str] = None) -> Iterator[T]:
+    """Yield items, reporting progress out of total and stopping when the job is cancelled"""
+    check_cancelled()
+    for done, item in enumerate(items, 1):
+        yield item
+        check_cancelled()
+        report_progress(done / total if total else 1.0, message)
+
+def in_job() -> bool:
+    return _current_job.get() is not None
+
+job_queue = JobQueue()
+metrics.callback('jobs_active', 'Background jobs queued or running', job_queue.active_count)
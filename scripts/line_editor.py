@@ -0,0 +1,162 @@
+from typing import List, Optional
+from scripts.terminal import InputBackend, Key
+
+# --------------- [ Line Editor ] --------------- #
+#
+# Keeps the input buffer and cursor and emits only the terminal changes each
+# edit needs (append, cursor moves, erase to end of line) instead of
+# redrawing the whole line. Output is collected and written with one flush
+# per input event.
+
+ERASE_TO_END = '\033[K'
+
+def cursor_left(n: int) -> str:
+    return f'\033[{n}D' if n > 0 else ''
+
+def cursor_right(n: int) -> str:
+    return f'\033[{n}C' if n > 0 else ''
+
+def is_printable(key: Optional[str]) -> bool:
+    return key is not None and len(key) == 1 and key.isprintable()
+
+
+class LineEditor:
+    def __init__(self, terminal: InputBackend, prompt: str = '', mask: Optional[str] = None):
+        self.terminal = terminal
+        self.prompt = prompt
+        self.mask = mask
+        self.buffer = ''
+        self.cursor = 0
+        self.pending: List[str] = []
+        self.lookahead: Optional[str] = None
+
+    def _shown(self, text: str) -> str:
+        return self.mask * len(text) if self.mask is not None else text
+
+    def emit(self, text: str):
+        if text:
+            self.pending.append(text)
+
+    def flush(self):
+        """Write all pending changes in a single terminal write"""
+        if self.pending:
+            self.terminal.write(''.join(self.pending))
+            self.pending.clear()
+        self.terminal.flush()
+
+    def start(self):
+        """Print the prompt and any preset buffer"""
+        self.emit(self.prompt + self._shown(self.buffer))
+        self.cursor = len(self.buffer)
+
+    def insert(self, text: str):
+        """Insert text at the cursor"""
+        if not text:
+            return
+        tail = self.buffer[self.cursor:]
+        self.buffer = self.buffer[:self.cursor] + text + tail
+        self.cursor += len(text)
+        # Appending at the end is the common case and needs no cursor moves
+        self.emit(self._shown(text + tail) + cursor_left(len(tail)))
+
+    def backspace(self):
+        """Remove the character before the cursor"""
+        if self.cursor == 0:
+            return
+        tail = self.buffer[self.cursor:]
+        self.buffer = self.buffer[:self.cursor - 1] + tail
+        self.cursor -= 1
+        if tail:
+            self.emit('\b' + self._shown(tail) + ERASE_TO_END + cursor_left(len(tail)))
+        else:
+            self.emit('\b \b')
+
+    def delete(self):
+        """Remove the character under the cursor"""
+        tail = self.buffer[self.cursor + 1:]
+        if self.cursor >= len(self.buffer):
+            return
+        self.buffer = self.buffer[:self.cursor] + tail
+        self.emit(self._shown(tail) + ERASE_TO_END + cursor_left(len(tail)))
+
+    def move_to(self, position: int):
+        """Move the cursor to a buffer position"""
+        position = max(0, min(len(self.buffer), position))
+        if position < self.cursor:
+            self.emit(cursor_left(self.cursor - position))
+        elif position > self.cursor:
+            self.emit(cursor_right(position - self.cursor))
+        self.cursor = position
+
+    def left(self):
+        self.move_to(self.cursor - 1)
+
+    def right(self):
+        self.move_to(self.cursor + 1)
+
+    def home(self):
+        self.move_to(0)
+
+    def end(self):
+        self.move_to(len(self.buffer))
+
+    def replace(self, text: str):
+        """Replace the whole buffer, rewriting only what differs"""
+        common = 0
+        limit = min(len(text), len(self.buffer))
+        while common < limit and text[common] == self.buffer[common]:
+            common += 1
+        self.move_to(common)
+        self.emit(self._shown(text[common:]))
+        if len(text) < len(self.buffer):
+            self.emit(ERASE_TO_END)
+        self.buffer = text
+        self.cursor = len(text)
+
+    def redraw(self, prompt: Optional[str] = None):
+        """Repaint the whole line, e.g. after the prompt changed"""
+        if prompt is not None:
+            self.prompt = prompt
+        self.emit('\r' + self.prompt + self._shown(self.buffer) + ERASE_TO_END +
+                  cursor_left(len(self.buffer) - self.cursor))
+
+    def read_key(self) -> Optional[str]:
+        """Read the next key, honouring a key left over from a paste"""
+        if self.lookahead is not None:
+            key, self.lookahead = self.lookahead, None
+            return key
+        return self.terminal.read_key()
+
+    def handle(self, key: Optional[str]) -> bool:
+        """Apply an editing key; return False if the caller must handle it"""
+        if is_printable(key):
+            # Drain keys that are already waiting (a paste) into one insert
+            chars = [key]
+            while True:
+                nxt = self.terminal.read_key(timeout=0)
+                if not is_printable(nxt):
+                    self.lookahead = nxt
+                    break
+                chars.append(nxt)
+            self.insert(''.join(chars))
+        elif key == Key.BACKSPACE:
+            self.backspace()
+        elif key == Key.DELETE:
+            self.delete()
+        elif key == Key.LEFT:
+            self.left()
+        elif key == Key.RIGHT:
+            self.right()
+        elif key == Key.HOME:
+            self.home()
+        elif key == Key.END:
+            self.end()
+        else:
+            return False
+        return True
+
+    def accept(self) -> str:
+        """Finish editing: move past the line and return the buffer"""
+        self.emit('\n')
+        self.flush()
+        return self.buffer
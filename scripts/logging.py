@@ -3,13 +3,15 @@ import datetime
 from pathlib import Path
 from colorama import init, Fore, Style
 import logging
+from scripts.paths import DATA_DIR
+from scripts.startup_profile import startup_profile
 
 init(autoreset=True)
 
 class Logger:
     def __init__(self):
-        # Get AppData\Roaming path
-        self.base_path = os.path.join(os.getenv('APPDATA'), 'PhantomConsole')
+        # Get AppData\Roaming path (or the XDG data dir elsewhere)
+        self.base_path = DATA_DIR
         self.logs_path = os.path.join(self.base_path, 'logs')
         self.current_log_file = None
         self.ensure_directories()
@@ -77,7 +79,7 @@ def setup_logger():
     logger.setLevel(logging.DEBUG)
 
     # Create logs directory if it doesn't exist
-    log_dir = os.path.join(os.getenv('APPDATA'), 'PhantomConsole', 'logs')
+    log_dir = os.path.join(DATA_DIR, 'logs')
     os.makedirs(log_dir, exist_ok=True)
 
     # Create file handler
@@ -95,4 +97,5 @@ def setup_logger():
     return logger
 
 # Create a global logger instance
-logger = Logger()
+with startup_profile.phase('logger init'):
+    logger = Logger()
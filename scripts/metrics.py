@@ -0,0 +1,246 @@
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+from scripts.logging import logger
+
+# --------------- [ Metrics ] --------------- #
+#
+# Counters and histograms live in process memory. Recording one is a dict
+# lookup and an addition under the metric's own lock (a histogram also does
+# one bisect over its bucket bounds), so instrumenting a hot path costs
+# less than a microsecond. Values that already exist elsewhere (session counts,
+# lru_cache statistics) are read through callbacks only when the metrics
+# are collected. The `stats` command shows everything; a background writer
+# can dump it in Prometheus text format for node-exporter's textfile
+# collector.
+
+PREFIX = 'phantom_'
+# Upper bounds in seconds, from sub-millisecond SQLite queries to bcrypt
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = PREFIX + name
+        self.description = description
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+
+    def samples(self) -> Dict[LabelValues, object]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        super().__init__(name, description, labels)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> Dict[LabelValues, float]:
+        with self.lock:
+            return dict(self.values)
+
+
+class _Series:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, size: int):
+        self.counts = [0] * size  # per bucket, not cumulative; the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(buckets)
+        self.series: Dict[LabelValues, _Series] = {}
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = _Series(len(self.buckets) + 1)
+            series.counts[index] += 1
+            series.sum += value
+            series.count += 1
+
+    @contextmanager
+    def time(self, *labels: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def samples(self) -> Dict[LabelValues, _Series]:
+        with self.lock:
+            copies = {}
+            for labels, series in self.series.items():
+                copy = copies[labels] = _Series(0)
+                copy.counts, copy.sum, copy.count = list(series.counts), series.sum, series.count
+            return copies
+
+    def quantile(self, series: _Series, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None past the last bound)"""
+        target = q * series.count
+        running = 0
+        for bound, count in zip(self.buckets, series.counts):
+            running += count
+            if running >= target:
+                return bound
+        return None
+
+
+class Callback(_Metric):
+    """A counter or gauge whose values are read from func() at collection time"""
+
+    def __init__(self, name: str, description: str, func: Callable[[], Dict[LabelValues, float]],
+                 kind: str = 'gauge', labels: Sequence[str] = ()):
+        super().__init__(name, description, labels)
+        self.kind = kind
+        self.func = func
+
+    def samples(self) -> Dict[LabelValues, float]:
+        try:
+            values = self.func()
+        except Exception as e:
+            logger.error(f"Metric {self.name} failed: {e}")
+            return {}
+        return values if isinstance(values, dict) else {(): values}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+        self.started = time.time()
+
+    def _add(self, metric: _Metric) -> _Metric:
+        return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, description: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, description, labels))
+
+    def histogram(self, name: str, description: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, description, labels, buckets))
+
+    def callback(self, name: str, description: str, func: Callable, kind: str = 'gauge',
+                 labels: Sequence[str] = ()) -> Callback:
+        return self._add(Callback(name, description, func, kind, labels))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self.metrics.get(PREFIX + name)
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics.values():
+            samples = metric.samples()
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for labels, value in sorted(samples.items()):
+                pairs = list(zip(metric.labels, labels))
+                if isinstance(metric, Histogram):
+                    running = 0
+                    for bound, count in zip(metric.buckets + (float('inf'),), value.counts):
+                        running += count
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        lines.append(f"{metric.name}_bucket{_labels(pairs + [('le', le)])} {running}")
+                    lines.append(f"{metric.name}_sum{_labels(pairs)} {value.sum!r}")
+                    lines.append(f"{metric.name}_count{_labels(pairs)} {value.count}")
+                else:
+                    lines.append(f"{metric.name}{_labels(pairs)} {_number(value)}")
+        return '\n'.join(lines) + '\n'
+
+def _labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    text = ','.join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return '{' + text + '}' if text else ''
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+metrics = MetricsRegistry()
+
+def timed(histogram: Histogram):
+    """Decorator recording each call's duration in histogram, labelled with the function name"""
+    def decorate(func):
+        name = func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started, name)
+        return wrapper
+    return decorate
+
+def lru_stats(**caches) -> Callable[[], Dict[LabelValues, float]]:
+    """Callback reading hits and misses of functools.lru_cache functions"""
+    def collect():
+        values = {}
+        for name, func in caches.items():
+            info = func.cache_info()
+            values[(name, 'hit')] = info.hits
+            values[(name, 'miss')] = info.misses
+        return values
+    return collect
+
+
+# --------------- [ Prometheus Textfile ] --------------- #
+
+_writer: Optional[threading.Thread] = None
+_textfile = {'path': '', 'interval': 15.0}
+
+def write_textfile(path: str):
+    """Write all metrics to path atomically, so the collector never reads half a file"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp = f"{path}.{os.getpid()}.tmp"
+    with open(temp, 'w', encoding='utf-8') as f:
+        f.write(metrics.render_prometheus())
+    os.replace(temp, path)
+
+def _write_loop():
+    while True:
+        path = _textfile['path']
+        if not path:
+            return
+        try:
+            write_textfile(path)
+        except OSError as e:
+            logger.error(f"Could not write metrics to {path}: {e}")
+        time.sleep(_textfile['interval'])
+
+def apply_config(config):
+    """Start, retarget or stop the textfile writer from the [metrics] settings"""
+    global _writer
+    _textfile['path'] = config.metrics.textfile
+    _textfile['interval'] = max(config.metrics.interval, 1.0)
+    if _textfile['path'] and (_writer is None or not _writer.is_alive()):
+        _writer = threading.Thread(target=_write_loop, name='phantom-metrics', daemon=True)
+        _writer.start()
@@ -0,0 +1,61 @@
+import io
+import re
+import sys
+import contextvars
+from contextlib import contextmanager
+
+# --------------- [ Output Capture ] --------------- #
+#
+# Commands print straight to stdout. To capture what one command prints
+# without touching the rest of the process, sys.stdout is wrapped once in a
+# proxy that writes to a context-local target when one is set. Threads and
+# asyncio tasks each get their own context, so captures never mix.
+
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;?]*[A-Za-z]')
+
+_target = contextvars.ContextVar('phantom_output_target', default=None)
+
+
+class _StdoutProxy:
+    def __init__(self, real):
+        self._real = real
+
+    def write(self, text):
+        target = _target.get()
+        return (target if target is not None else self._real).write(text)
+
+    def flush(self):
+        target = _target.get()
+        (target if target is not None else self._real).flush()
+
+    def __getattr__(self, name):
+        return getattr(self._real, name)
+
+
+def install():
+    """Route sys.stdout through the context-aware proxy (idempotent)"""
+    if not isinstance(sys.stdout, _StdoutProxy):
+        sys.stdout = _StdoutProxy(sys.stdout)
+
+@contextmanager
+def redirect(target):
+    """Send everything printed in the current context to target"""
+    install()
+    token = _target.set(target)
+    try:
+        yield target
+    finally:
+        _target.reset(token)
+
+def is_redirected() -> bool:
+    """Whether output in the current context goes somewhere other than the real stdout"""
+    return _target.get() is not None
+
+@contextmanager
+def capture():
+    """Capture everything printed in the current context into a StringIO"""
+    with redirect(io.StringIO()) as buffer:
+        yield buffer
+
+def strip_ansi(text: str) -> str:
+    return ANSI_ESCAPE.sub('', text)
@@ -0,0 +1,171 @@
+import shutil
+import sys
+from itertools import chain, islice
+from typing import Iterable, Iterator, List, Optional, Sequence
+from scripts import output
+from scripts.command_handler import command_handler
+from scripts.render import Column, TableLayout, truncate, write
+from scripts.terminal import InputBackend, Key
+
+# --------------- [ Pager ] --------------- #
+#
+# Long listings are shown one screen at a time. Lines are pulled from the
+# source iterator only when they are about to be displayed (or searched),
+# and cached so paging back is free; formatting happens in the generator,
+# so time to the first screen does not depend on the size of the result.
+# Output that fits on one screen, or goes anywhere but an interactive
+# terminal, is written straight through.
+
+HELP = "Space/PgDn next  b/PgUp back  ↑/↓ line  g/G top/end  / search  n next  q quit"
+
+
+class Pager:
+    def __init__(self, lines: Iterable[str], terminal: InputBackend,
+                 header: Sequence[str] = (), footer: Sequence[str] = (), height: Optional[int] = None):
+        self.source: Iterator[str] = iter(lines)
+        self.lines: List[str] = []
+        self.exhausted = False
+        self.terminal = terminal
+        self.header = list(header)
+        self.footer = list(footer)
+        size = shutil.get_terminal_size((80, 24))
+        self.height = height or size.lines
+        self.width = size.columns
+        self.top = 0
+        self.query = ''
+        self.message = ''
+
+    @property
+    def page_size(self) -> int:
+        return max(self.height - len(self.header) - len(self.footer) - 1, 1)
+
+    def fetch(self, count: int) -> int:
+        """Make sure the first count lines are cached; returns how many are available"""
+        while len(self.lines) < count and not self.exhausted:
+            chunk = list(islice(self.source, count - len(self.lines)))
+            if not chunk:
+                self.exhausted = True
+            self.lines.extend(chunk)
+        return len(self.lines)
+
+    def fits(self) -> bool:
+        """Whether everything fits on one screen (checked without fetching more than a screen)"""
+        return self.fetch(self.page_size + 1) <= self.page_size
+
+    def scroll(self, delta: int):
+        target = max(self.top + delta, 0)
+        if delta > 0:
+            available = self.fetch(target + self.page_size)
+            target = min(target, max(available - self.page_size, 0))
+        self.top = target
+
+    def end(self):
+        while not self.exhausted:
+            self.fetch(len(self.lines) + 1000)
+        self.top = max(len(self.lines) - self.page_size, 0)
+
+    def search(self, start: int) -> bool:
+        """Move to the next line at or after start containing the query (case-insensitive)"""
+        query = self.query.lower()
+        index = start
+        while True:
+            if index >= self.fetch(index + 1):
+                return False
+            if query in output.strip_ansi(self.lines[index]).lower():
+                self.top = index
+                return True
+            index += 1
+
+    def screen(self) -> str:
+        available = self.fetch(self.top + self.page_size + 1)
+        page = self.lines[self.top:self.top + self.page_size]
+        at_end = self.exhausted and self.top + self.page_size >= available
+        total = f"{available}" if self.exhausted else f"{available}+"
+        status = self.message or f"lines {self.top + 1}-{self.top + len(page)} of {total}  {HELP}"
+        body = self.header + page + (self.footer if at_end else [])
+        body += [''] * (self.height - 1 - len(body))
+        return '\033[H\033[2J' + '\n'.join(body) + f"\n\033[7m{truncate(status, self.width - 1)}\033[0m"
+
+    def prompt_query(self) -> Optional[str]:
+        """Read a search pattern on the status line"""
+        query = ''
+        while True:
+            self.terminal.write(f"\r\033[K/{query}")
+            self.terminal.flush()
+            key = self.terminal.read_key()
+            if key == Key.ENTER:
+                return query
+            if key in (Key.ESCAPE, Key.CTRL_C):
+                return None
+            if key == Key.BACKSPACE:
+                query = query[:-1]
+            elif key is not None and len(key) == 1 and key.isprintable():
+                query += key
+
+    def run(self):
+        # Page on the alternate screen so the console looks untouched afterwards
+        self.terminal.write('\033[?1049h')
+        with self.terminal:
+            while True:
+                self.terminal.write(self.screen())
+                self.terminal.flush()
+                self.message = ''
+                key = self.terminal.read_key()
+                if key in ('q', 'Q', Key.ESCAPE, Key.CTRL_C):
+                    break
+                elif key in (' ', 'f', Key.PAGE_DOWN):
+                    self.scroll(self.page_size)
+                elif key in ('b', Key.PAGE_UP):
+                    self.scroll(-self.page_size)
+                elif key in (Key.DOWN, Key.ENTER, 'j'):
+                    self.scroll(1)
+                elif key in (Key.UP, 'k'):
+                    self.scroll(-1)
+                elif key in ('g', Key.HOME):
+                    self.top = 0
+                elif key in ('G', Key.END):
+                    self.end()
+                elif key in ('/', 'n'):
+                    if key == '/':
+                        query = self.prompt_query()
+                        if not query:
+                            continue
+                        self.query = query
+                        start = self.top
+                    else:
+                        start = self.top + 1
+                    if not self.query or not self.search(start):
+                        self.message = f"Pattern not found: {self.query}"
+        self.terminal.write('\033[?1049l')
+        self.terminal.flush()
+
+
+def interactive(terminal: InputBackend) -> bool:
+    """Paging needs a keyboard and a screen: not remote, captured, piped or headless"""
+    return (not terminal.line_mode and not output.is_redirected()
+            and sys.stdout.isatty() and sys.stdin.isatty())
+
+def page(lines: Iterable[str], header: Sequence[str] = (), footer: Sequence[str] = (),
+         terminal: Optional[InputBackend] = None):
+    """Show lines in the pager, or write them through when paging is not possible or needed"""
+    terminal = terminal or command_handler.terminal
+    pager = Pager(lines, terminal, header, footer)
+    if not interactive(terminal) or pager.fits():
+        # Stream straight through, one write per screenful
+        pending = list(pager.header) + pager.lines
+        write('\n'.join(pending) + '\n' if pending else '')
+        for chunk in iter(lambda: list(islice(pager.source, pager.page_size)), []):
+            write('\n'.join(chunk) + '\n')
+        if pager.footer:
+            write('\n'.join(pager.footer) + '\n')
+        return
+    pager.run()
+
+def page_table(columns: Sequence[Column], rows: Iterable[Sequence], title: Optional[str] = None):
+    """Page a table; only the rows that are displayed are fetched and formatted"""
+    rows = iter(rows)
+    size = shutil.get_terminal_size((80, 24))
+    sample = list(islice(rows, size.lines))
+    layout = TableLayout(columns, sample, title, size.columns)
+    lines = (layout.row(row) for row in chain(sample, rows))
+    page(lines, header=['', *layout.header()], footer=[layout.footer(), ''])
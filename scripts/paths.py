@@ -0,0 +1,8 @@
+import os
+
+def get_data_dir() -> str:
+    """Get the per-user PhantomConsole data directory (AppData on Windows)"""
+    base = os.getenv('APPDATA') or os.getenv('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+    return os.path.join(base, 'PhantomConsole')
+
+DATA_DIR = get_data_dir()
@@ -0,0 +1,91 @@
+from typing import Dict, Iterable, List, Optional
+from scripts.logging import logger
+
+# --------------- [ Role Based Access Control ] --------------- #
+#
+# Every command and subcommand declares the capabilities it needs when it is
+# registered (see scripts/registry.py). Roles are compiled once into integer
+# bitmasks, so authorizing a command on the dispatch path is a single AND
+# against the mask cached on the session.
+
+CAPABILITIES = (
+    'user.list',
+    'user.create',
+    'user.delete',
+    'user.update',
+    'user.upgrade',
+    'system.stats',
+    'system.debug',
+)
+
+CAPABILITY_BITS: Dict[str, int] = {name: 1 << i for i, name in enumerate(CAPABILITIES)}
+ALL_CAPABILITIES = (1 << len(CAPABILITIES)) - 1
+
+DEFAULT_ROLES = {
+    'root': ['*'],
+    'admin': ['user.list'],
+    'user': ['user.list'],
+}
+
+def compile_mask(capabilities: Iterable[str]) -> int:
+    """Compile a list of capability names into a bitmask"""
+    mask = 0
+    for name in capabilities:
+        if name == '*':
+            mask |= ALL_CAPABILITIES
+        elif name in CAPABILITY_BITS:
+            mask |= CAPABILITY_BITS[name]
+        else:
+            logger.warning(f"Unknown capability in role definition: {name}")
+    return mask
+
+ROLE_MASKS: Dict[str, int] = {}
+# (command, subcommand) -> required mask; (command, '*') holds the union over
+# its subcommands and decides whether the command is shown in help
+REQUIRED: Dict[tuple, int] = {}
+
+def declare(command: str, subcommand: Optional[str], capabilities: Iterable[str]):
+    """Declare the capabilities a command or subcommand requires"""
+    mask = compile_mask(capabilities)
+    REQUIRED[(command, subcommand)] = mask
+    if subcommand is None:
+        REQUIRED.setdefault((command, '*'), mask)
+    else:
+        REQUIRED[(command, '*')] = REQUIRED.get((command, '*'), 0) | mask
+
+def load_roles(roles: Optional[dict] = None):
+    """Compile role definitions (from the [roles] config table) into bitmasks"""
+    definitions = dict(DEFAULT_ROLES)
+    if roles:
+        definitions.update(roles)
+    # root always holds every capability
+    definitions['root'] = ['*']
+    ROLE_MASKS.clear()
+    for role, capabilities in definitions.items():
+        ROLE_MASKS[role] = compile_mask(capabilities)
+
+def role_mask(role: Optional[str]) -> int:
+    """Get the compiled bitmask of a role"""
+    return ROLE_MASKS.get(role, 0) if role else 0
+
+def role_names() -> List[str]:
+    """Get all known role names"""
+    return list(ROLE_MASKS)
+
+def is_valid_role(role: str) -> bool:
+    return role in ROLE_MASKS
+
+def required_mask(command: str, subcommand: Optional[str] = None) -> int:
+    return REQUIRED.get((command, subcommand), 0)
+
+def allowed(mask: int, command: str, subcommand: Optional[str] = None) -> bool:
+    """Check whether a permission mask may run a command or subcommand"""
+    required = REQUIRED.get((command, subcommand), 0)
+    return mask & required == required
+
+def visible(mask: int, command: str) -> bool:
+    """Check whether a command should be listed in help for a permission mask"""
+    required = REQUIRED.get((command, '*'), 0)
+    return not required or mask & required != 0
+
+load_roles()
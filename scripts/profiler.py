@@ -0,0 +1,118 @@
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, List, Optional, Tuple
+from scripts.paths import DATA_DIR
+
+# --------------- [ Profiling ] --------------- #
+#
+# Two ways to look inside one console command. Deterministic profiling
+# (cProfile) counts every call of the thread that runs it and is exact for
+# short commands, but slows Python-heavy code down noticeably. The sampler
+# is a background thread that looks at the command's stack every few
+# milliseconds; its overhead does not depend on the command, so it suits
+# long jobs. Deterministic results are saved as .pstats, samples as
+# collapsed stacks (one "outer;inner;leaf count" line per stack), which
+# flamegraph.pl, speedscope and inferno read directly.
+
+PROFILE_DIR = os.path.join(DATA_DIR, 'profiles')
+DEFAULT_INTERVAL = 0.005
+
+# (function, calls, self seconds or samples, cumulative seconds or samples)
+HotFunction = Tuple[str, int, float, float]
+
+
+def _label(filename: str, line: int, name: str) -> str:
+    if filename == '~':  # built-ins have no source file
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+class Sampler:
+    """Samples the stack of one thread at a fixed interval"""
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = DEFAULT_INTERVAL):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._root = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        # Frames from here outwards belong to the console, not the profiled command
+        self._root = sys._getframe(1)
+        self._thread = threading.Thread(target=self._run, name='phantom-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not self._root:
+                code = frame.f_code
+                stack.append(_label(code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def hot_functions(self) -> List[HotFunction]:
+        """Functions by samples spent in their own code (self) and below them (total)"""
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for function in set(frames):
+                total[function] += count
+        return sorted(((function, 0, own[function], total[function]) for function in total),
+                      key=lambda entry: (entry[2], entry[3]), reverse=True)
+
+    def save(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def profile_call(func: Callable[[], object]) -> Tuple[object, cProfile.Profile]:
+    """Run func under cProfile; returns its result and the profile"""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        result = func()
+    finally:
+        profiler.disable()
+    return result, profiler
+
+def sample_call(func: Callable[[], object], interval: float = DEFAULT_INTERVAL) -> Tuple[object, Sampler]:
+    """Run func while a Sampler watches the calling thread"""
+    sampler = Sampler(interval=interval)
+    sampler.start()
+    try:
+        result = func()
+    finally:
+        sampler.stop()
+    return result, sampler
+
+def hot_functions(profiler: cProfile.Profile) -> List[HotFunction]:
+    """Functions of a cProfile run by time spent in their own code"""
+    stats = pstats.Stats(profiler).stats
+    entries = [(_label(*key), calls, own, cumulative)
+               for key, (_, calls, own, cumulative, _) in stats.items()]
+    return sorted(entries, key=lambda entry: entry[2], reverse=True)
+
+def output_path(command: str, extension: str) -> str:
+    """A new file under the data directory's profiles folder, named after the command"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = '-'.join(word for word in command.split()[:3] if word.isalnum()) or 'command'
+    return os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}{extension}")
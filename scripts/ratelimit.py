@@ -0,0 +1,224 @@
+import contextvars
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Optional, Tuple
+from scripts.logging import logger
+
+# --------------- [ Login Admission ] --------------- #
+#
+# The per-account lockout in the user table does nothing against password
+# spraying: one or two guesses for each of many usernames never lock an
+# account, yet every guess costs a bcrypt verification. This controller
+# decides before any database lookup or hashing whether an attempt may go
+# ahead at all:
+#
+#   * a global token bucket caps the bcrypt work of the whole process,
+#   * a bucket per source (client address in server and API mode, "local"
+#     at the console) stops one client from using up the global budget,
+#   * failures are remembered per source; a source that fails on many
+#     different usernames within the window is blocked for the window, and
+#     when many different usernames fail process-wide, every attempt also
+#     has to pass the much slower spray bucket until the window is quiet.
+#
+# Rejections are cheap and look the same for known and unknown usernames.
+
+LOCAL = 'local'
+MAX_SOURCES = 10_000  # per-source state kept for the most recently seen sources
+MAX_FAILURES = 10_000  # failures remembered process-wide within the window
+MAX_SOURCE_FAILURES = 1_000  # failures remembered per source within the window
+
+# Reasons returned by admit()
+SOURCE_BLOCKED = 'source_blocked'
+SOURCE_LIMITED = 'source_limited'
+SPRAY_LIMITED = 'spray_limited'
+BUSY = 'busy'
+
+_source = contextvars.ContextVar('phantom_login_source', default=LOCAL)
+
+@contextmanager
+def login_source(source: str):
+    """Attribute login attempts made in this context to source"""
+    token = _source.set(source or LOCAL)
+    try:
+        yield
+    finally:
+        _source.reset(token)
+
+def peer_source(peer) -> str:
+    """Source name for an asyncio peername: the host of an address, 'unix' for sockets"""
+    if isinstance(peer, (tuple, list)) and peer:
+        return str(peer[0])
+    return 'unix' if peer in ('', None) else str(peer)
+
+
+class TokenBucket:
+    """rate tokens per second up to burst; a rate of 0 means unlimited"""
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def resize(self, rate: float, burst: float):
+        """Change the limits, keeping the tokens already spent"""
+        spent = self.burst - self.tokens
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = max(self.burst - spent, 0.0)
+
+    def take(self, now: float) -> bool:
+        if self.rate <= 0:
+            return True
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class _FailureWindow:
+    """Recent failures with a running count per username, so distinct() costs no rescan"""
+    __slots__ = ('events', 'counts', 'limit')
+
+    def __init__(self, limit: int):
+        self.events: Deque[Tuple[float, str]] = deque()  # (time, username)
+        self.counts: Counter = Counter()
+        self.limit = limit
+
+    def _drop_oldest(self):
+        _, username = self.events.popleft()
+        self.counts[username] -= 1
+        if not self.counts[username]:
+            del self.counts[username]
+
+    def add(self, now: float, username: str):
+        self.events.append((now, username))
+        self.counts[username] += 1
+        if len(self.events) > self.limit:
+            self._drop_oldest()
+
+    def distinct(self, since: float) -> int:
+        """Distinct usernames that failed since then (older failures are forgotten)"""
+        while self.events and self.events[0][0] < since:
+            self._drop_oldest()
+        return len(self.counts)
+
+    def clear(self):
+        self.events.clear()
+        self.counts.clear()
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+
+class _SourceState:
+    __slots__ = ('bucket', 'failures', 'blocked_until')
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.failures = _FailureWindow(MAX_SOURCE_FAILURES)
+        self.blocked_until = 0.0
+
+
+class AdmissionController:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.limits: Optional[tuple] = None
+        self.global_bucket = TokenBucket(0, 1)
+        self.spray_bucket = TokenBucket(0, 1)
+        self.sources: OrderedDict[str, _SourceState] = OrderedDict()
+        self.failures = _FailureWindow(MAX_FAILURES)
+        self.spray_until = 0.0
+        self.configure()
+
+    def configure(self, login_rate: float = 10.0, login_burst: float = 20.0,
+                  source_rate: float = 1.0, source_burst: float = 5.0,
+                  spray_usernames: int = 10, spray_global_usernames: int = 100,
+                  spray_window: float = 300.0, spray_rate: float = 1.0):
+        """Set the limits; remembered failures, spent tokens and active blocks are kept"""
+        limits = (login_rate, login_burst, source_rate, source_burst,
+                  spray_usernames, spray_global_usernames, spray_window, spray_rate)
+        with self.lock:
+            if limits == self.limits:
+                return
+            self.limits = limits
+            self.source_rate = source_rate
+            self.source_burst = source_burst
+            self.spray_usernames = spray_usernames
+            self.spray_global_usernames = spray_global_usernames
+            self.spray_window = spray_window
+            self.global_bucket.resize(login_rate, login_burst)
+            self.spray_bucket.resize(spray_rate, 1.0)
+            for state in self.sources.values():
+                state.bucket.resize(source_rate, source_burst)
+
+    def _state(self, source: str) -> _SourceState:
+        state = self.sources.get(source)
+        if state is None:
+            state = self.sources[source] = _SourceState(TokenBucket(self.source_rate, self.source_burst))
+            if len(self.sources) > MAX_SOURCES:
+                self.sources.popitem(last=False)
+        else:
+            self.sources.move_to_end(source)
+        return state
+
+    def admit(self, source: Optional[str] = None) -> Optional[str]:
+        """None if a login attempt may be verified now, else the reason it may not"""
+        source = source or _source.get()
+        now = time.monotonic()
+        with self.lock:
+            state = self._state(source)
+            if now < state.blocked_until:
+                return SOURCE_BLOCKED
+            if not state.bucket.take(now):
+                return SOURCE_LIMITED
+            if now < self.spray_until and not self.spray_bucket.take(now):
+                return SPRAY_LIMITED
+            if not self.global_bucket.take(now):
+                return BUSY
+        return None
+
+    def failed(self, username: str, source: Optional[str] = None):
+        """Remember a failed attempt and block sources that are spraying"""
+        source = source or _source.get()
+        now = time.monotonic()
+        since = now - self.spray_window
+        with self.lock:
+            state = self._state(source)
+            state.failures.add(now, username)
+            self.failures.add(now, username)
+            # Both counts also trim failures older than the window, on every call
+            local = state.failures.distinct(since)
+            spread = self.failures.distinct(since)
+            if self.spray_usernames and local >= self.spray_usernames:
+                state.blocked_until = now + self.spray_window
+                state.failures.clear()
+                logger.warning(f"Password spraying from {source}: blocked for {self.spray_window:g}s")
+            if self.spray_global_usernames and now >= self.spray_until and spread >= self.spray_global_usernames:
+                self.spray_until = now + self.spray_window
+                logger.warning(f"Password spraying across sources: logins slowed down for {self.spray_window:g}s")
+
+    def spraying(self) -> bool:
+        return time.monotonic() < self.spray_until
+
+    def blocked_sources(self) -> Dict[str, float]:
+        """Blocked sources and their remaining block time in seconds"""
+        now = time.monotonic()
+        with self.lock:
+            return {source: state.blocked_until - now for source, state in self.sources.items()
+                    if state.blocked_until > now}
+
+
+admission = AdmissionController()
+
+def apply_config(config):
+    """Take the limits from [security]; runs again after every config reload, which keeps active blocks"""
+    security = config.security
+    admission.configure(security.login_rate, security.login_burst, security.source_rate,
+                        security.source_burst, security.spray_usernames, security.spray_global_usernames,
+                        security.spray_window, security.spray_rate)
@@ -0,0 +1,235 @@
+import importlib
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+from colorama import Fore, Style
+from scripts import permissions
+from scripts.metrics import metrics
+
+# --------------- [ Command Registry ] --------------- #
+#
+# Commands and subcommands register with their metadata (description,
+# required capabilities, argument spec and completion provider). Names are
+# kept in a prefix trie per level, which serves both exact dispatch and Tab
+# completion. Handlers and completers may be given as "module:function"
+# strings; the module is imported the first time the command is used.
+
+Handler = Union[Callable[[List[str]], bool], str]
+Completer = Union[Callable[[str, List[str]], Iterable[str]], str]
+
+COMMAND_SECONDS = metrics.histogram('command_duration_seconds', 'Time to run a console command', ('command',))
+
+def _resolve(target):
+    """Import a "module:function" reference, or return a callable as-is"""
+    if not isinstance(target, str):
+        return target
+    module_name, _, attr = target.partition(':')
+    return getattr(importlib.import_module(module_name), attr)
+
+
+class _TrieNode:
+    __slots__ = ('children', 'command')
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.command: Optional['CommandSpec'] = None
+
+
+class CommandTrie:
+    """Prefix trie mapping command names to their specs"""
+
+    def __init__(self):
+        self.root = _TrieNode()
+        self.names: List[str] = []
+
+    def insert(self, name: str, command: 'CommandSpec'):
+        node = self.root
+        for char in name:
+            node = node.children.setdefault(char, _TrieNode())
+        if node.command is None:
+            self.names.append(name)
+        node.command = command
+
+    def _node(self, prefix: str) -> Optional[_TrieNode]:
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def get(self, name: str) -> Optional['CommandSpec']:
+        node = self._node(name)
+        return node.command if node else None
+
+    def with_prefix(self, prefix: str) -> List[Tuple[str, 'CommandSpec']]:
+        """All (name, spec) pairs whose name starts with prefix, sorted by name"""
+        node = self._node(prefix)
+        if node is None:
+            return []
+        found = []
+        stack = [(prefix, node)]
+        while stack:
+            name, node = stack.pop()
+            if node.command is not None:
+                found.append((name, node.command))
+            for char, child in node.children.items():
+                stack.append((name + char, child))
+        found.sort()
+        return found
+
+
+class CommandSpec:
+    """A registered command or subcommand"""
+
+    def __init__(self, name: str, handler: Optional[Handler] = None, description: str = '',
+                 capabilities: Iterable[str] = (), args: Iterable[str] = (),
+                 completer: Optional[Completer] = None, aliases: Iterable[str] = (),
+                 parent: Optional['CommandSpec'] = None, interactive: bool = False):
+        self.name = name
+        self.handler = handler
+        self.description = description
+        self.capabilities = tuple(capabilities)
+        self.required = permissions.compile_mask(self.capabilities)
+        self.args = tuple(args)
+        self.completer = completer
+        self.aliases = tuple(aliases)
+        self.parent = parent
+        self.interactive = interactive  # prompts for input, so it cannot run as a background job
+        self.subcommands = CommandTrie()
+
+    @property
+    def path(self) -> str:
+        return f"{self.parent.path} {self.name}" if self.parent else self.name
+
+    @property
+    def usage(self) -> str:
+        return ' '.join((self.path,) + self.args)
+
+    def run(self, args: List[str]) -> bool:
+        self.handler = _resolve(self.handler)
+        return self.handler(args)
+
+    def complete(self, prefix: str, args: List[str]) -> List[str]:
+        if self.completer is None:
+            return []
+        self.completer = _resolve(self.completer)
+        return [c for c in self.completer(prefix, args) if c.startswith(prefix)]
+
+
+class CommandRegistry:
+    def __init__(self):
+        self.commands = CommandTrie()
+
+    def register(self, path: str, handler: Optional[Handler] = None, description: str = '',
+                 capabilities: Iterable[str] = (), args: Iterable[str] = (),
+                 completer: Optional[Completer] = None, aliases: Iterable[str] = (),
+                 interactive: bool = False) -> CommandSpec:
+        """Register a command ("name") or subcommand ("name sub")"""
+        names = path.split()
+        parent = None
+        level = self.commands
+        for name in names[:-1]:
+            parent = level.get(name)
+            if parent is None:
+                raise KeyError(f"Parent command '{name}' is not registered")
+            level = parent.subcommands
+
+        spec = CommandSpec(names[-1], handler, description, capabilities, args,
+                           completer, aliases, parent, interactive)
+        for name in (names[-1],) + spec.aliases:
+            level.insert(name, spec)
+
+        top = names[0]
+        sub = names[1] if len(names) > 1 else None
+        permissions.declare(top, sub, spec.capabilities)
+        for alias in spec.aliases if parent is None else ():
+            permissions.declare(alias, None, spec.capabilities)
+        return spec
+
+    def top_level(self) -> List[CommandSpec]:
+        """Registered top-level commands in registration order, without aliases"""
+        seen = []
+        for name in self.commands.names:
+            spec = self.commands.get(name)
+            if spec.name == name:
+                seen.append(spec)
+        return seen
+
+    def resolve(self, tokens: List[str]) -> Tuple[Optional[CommandSpec], List[str]]:
+        """Walk tokens down the trie; return the deepest matching spec and remaining args"""
+        if not tokens:
+            return None, []
+        spec = self.commands.get(tokens[0].lower())
+        rest = tokens[1:]
+        while spec is not None and rest:
+            sub = spec.subcommands.get(rest[0])
+            if sub is None:
+                break
+            spec, rest = sub, rest[1:]
+        return spec, rest
+
+    def execute(self, spec: CommandSpec, args: List[str], mask: int) -> bool:
+        """Authorize and run a resolved command; returns False when the console should exit"""
+        if args and spec.subcommands.names:
+            print(f"{Fore.RED}✖  Unknown subcommand: {args[0]}{Style.RESET_ALL}")
+            return True
+
+        if mask & spec.required != spec.required:
+            missing = [capability for capability in spec.capabilities
+                       if mask & permissions.compile_mask((capability,)) == 0]
+            print(f"{Fore.RED}✖  Permission denied for {spec.path}: "
+                  f"requires {', '.join(missing or spec.capabilities)}{Style.RESET_ALL}")
+            return True
+
+        if spec.args and len(args) != len(spec.args):
+            print(f"{Fore.RED}✖  Usage: {spec.usage}{Style.RESET_ALL}")
+            return True
+
+        with COMMAND_SECONDS.time(spec.path):
+            return spec.run(args)
+
+    def dispatch(self, command: str, mask: int) -> bool:
+        """Resolve and run a command line"""
+        tokens = command.split()
+        if not tokens:
+            return True
+        spec, args = self.resolve(tokens)
+        if spec is None:
+            print(f"{Fore.RED}✖  Unknown command: {tokens[0].lower()}{Style.RESET_ALL}")
+            return True
+        return self.execute(spec, args, mask)
+
+    def complete(self, line: str, mask: int) -> List[str]:
+        """Complete the last word of a command line for a permission mask"""
+        tokens = line.split()
+        if not line or line[-1].isspace():
+            tokens.append('')
+        prefix = tokens[-1]
+
+        level = self.commands
+        spec = None
+        for i, token in enumerate(tokens[:-1]):
+            nxt = level.get(token.lower() if i == 0 else token)
+            if nxt is None:
+                # Past the command words: hand over to the command's completer
+                if spec is None or mask & spec.required != spec.required:
+                    return []
+                return sorted(spec.complete(prefix, tokens[i:-1]))
+            spec, level = nxt, nxt.subcommands
+
+        if spec is not None and not spec.subcommands.names:
+            if mask & spec.required != spec.required:
+                return []
+            return sorted(spec.complete(prefix, []))
+
+        matches = []
+        for name, candidate in level.with_prefix(prefix.lower() if spec is None else prefix):
+            if spec is None:
+                if permissions.visible(mask, candidate.name):
+                    matches.append(name)
+            elif mask & candidate.required == candidate.required:
+                matches.append(name)
+        return matches
+
+
+# Global command registry
+registry = CommandRegistry()
@@ -0,0 +1,178 @@
+import shutil
+import sys
+import unicodedata
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, List, Optional, Sequence, TextIO
+from colorama import Fore, Style
+from scripts.metrics import lru_stats, metrics
+from scripts.output import ANSI_ESCAPE
+
+# --------------- [ Console Rendering ] --------------- #
+#
+# Panels and tables are built as one string and written with a single call,
+# so a screen of output costs one write instead of one print per line.
+# Widths are measured in terminal cells: ANSI color codes take no space,
+# East Asian wide characters and emoji take two and combining marks none.
+# Measurements are cached because the same names and roles are rendered
+# over and over.
+
+ELLIPSIS = '…'
+
+@lru_cache(maxsize=8192)
+def display_width(text: str) -> int:
+    """Number of terminal cells text occupies"""
+    if '\x1b' in text:
+        text = ANSI_ESCAPE.sub('', text)
+    if text.isascii():
+        return len(text)
+    width = 0
+    for char in text:
+        if unicodedata.combining(char) or char in '\u200b\u200d\ufe0f':
+            continue
+        width += 2 if unicodedata.east_asian_width(char) in 'WF' else 1
+    return width
+
+metrics.callback('cache_requests_total', 'Lookups of in-memory caches by result',
+                 lru_stats(display_width=display_width), kind='counter', labels=('cache', 'result'))
+
+def pad(text: str, width: int, align: str = '<') -> str:
+    """Pad text to width cells ('<' left, '>' right, '^' centered)"""
+    gap = width - display_width(text)
+    if gap <= 0:
+        return text
+    if align == '>':
+        return ' ' * gap + text
+    if align == '^':
+        return ' ' * (gap // 2) + text + ' ' * (gap - gap // 2)
+    return text + ' ' * gap
+
+def truncate(text: str, width: int) -> str:
+    """Cut text to at most width cells, ending in an ellipsis when shortened"""
+    if display_width(text) <= width:
+        return text
+    plain = ANSI_ESCAPE.sub('', text)
+    result, used = [], 0
+    for char in plain:
+        cell = display_width(char)
+        if used + cell > width - 1:
+            break
+        result.append(char)
+        used += cell
+    return ''.join(result) + ELLIPSIS + (Style.RESET_ALL if plain != text else '')
+
+def terminal_width(default: int = 80) -> int:
+    return shutil.get_terminal_size((default, 24)).columns
+
+def write(text: str, out: Optional[TextIO] = None):
+    """Emit a rendered block with one write"""
+    out = out or sys.stdout
+    out.write(text)
+    out.flush()
+
+
+# --------------- [ Panels ] --------------- #
+
+def panel(title: str, lines: Iterable[str], min_width: int = 0, color: str = Fore.CYAN) -> str:
+    """Render a titled box around lines"""
+    lines = list(lines)
+    inner = max([min_width, display_width(title) + 2] + [display_width(line) for line in lines])
+    top = f"┌─ {color}{title} {Fore.WHITE}{'─' * (inner - display_width(title) - 1)}┐{Style.RESET_ALL}"
+    body = [f"│ {pad(line, inner)} │" for line in lines]
+    bottom = f"└{'─' * (inner + 2)}┘{Style.RESET_ALL}"
+    return '\n' + '\n'.join([top, *body, bottom]) + '\n\n'
+
+def print_panel(title: str, lines: Iterable[str], min_width: int = 0, color: str = Fore.CYAN,
+                out: Optional[TextIO] = None):
+    write(panel(title, lines, min_width, color), out)
+
+
+# --------------- [ Tables ] --------------- #
+
+class Column:
+    __slots__ = ('header', 'align', 'min_width', 'max_width')
+
+    def __init__(self, header: str = '', align: str = '<', min_width: int = 0,
+                 max_width: Optional[int] = None):
+        self.header = header
+        self.align = align
+        self.min_width = min_width
+        self.max_width = max_width
+
+
+def _fit(widths: List[int], columns: Sequence[Column], available: int) -> List[int]:
+    """Shrink the widest columns until the table fits the terminal"""
+    widths = [min(w, c.max_width) if c.max_width else w for w, c in zip(widths, columns)]
+    overhead = 3 * len(widths) + 1
+    while sum(widths) + overhead > available:
+        widest = max(range(len(widths)), key=widths.__getitem__)
+        if widths[widest] <= 3:
+            break
+        widths[widest] -= 1
+    return widths
+
+class TableLayout:
+    """Column widths and borders of a table, fixed from a sample of its rows"""
+
+    def __init__(self, columns: Sequence[Column], sample: Sequence[Sequence[str]],
+                 title: Optional[str] = None, available: Optional[int] = None):
+        self.columns = columns
+        self.title = title
+        widths = [max([column.min_width, display_width(column.header)] +
+                      [display_width(str(row[i])) for row in sample])
+                  for i, column in enumerate(columns)]
+        if title:
+            # Leave room for the title in the top border
+            short = display_width(title) + 2 - (sum(widths) + 3 * len(widths) - 3)
+            if short > 0:
+                widths[-1] += short
+        self.widths = _fit(widths, columns, available or terminal_width())
+
+    def row(self, cells: Sequence) -> str:
+        return '│ ' + ' │ '.join(pad(truncate(str(cell), width), width, column.align)
+                                for cell, width, column in zip(cells, self.widths, self.columns)) + ' │'
+
+    def header(self) -> List[str]:
+        """Top border, plus the column headings if any column has one"""
+        if self.title:
+            total = sum(self.widths) + 3 * len(self.widths) - 1
+            dashes = '─' * (total - display_width(self.title) - 3)
+            lines = [f"┌─ {Fore.CYAN}{self.title} {Fore.WHITE}{dashes}┐{Style.RESET_ALL}"]
+        else:
+            lines = ['┌' + '┬'.join('─' * (w + 2) for w in self.widths) + '┐']
+        if any(column.header for column in self.columns):
+            lines.append(self.row([f"{Style.BRIGHT}{c.header}{Style.RESET_ALL}" for c in self.columns]))
+            lines.append('├' + '┼'.join('─' * (w + 2) for w in self.widths) + '┤')
+        return lines
+
+    def footer(self) -> str:
+        return '└' + '┴'.join('─' * (w + 2) for w in self.widths) + f"┘{Style.RESET_ALL}"
+
+
+def render_table(columns: Sequence[Column], rows: Iterable[Sequence], title: Optional[str] = None,
+                 out: Optional[TextIO] = None, chunk_size: Optional[int] = None) -> int:
+    """Stream rows as a boxed table, one write per screenful; returns the row count.
+
+    Column widths are measured on the headers and the first screenful of
+    rows, then fixed so later chunks stay aligned; cells that are wider
+    than their column are cut with an ellipsis.
+    """
+    size = shutil.get_terminal_size((80, 24))
+    chunk_size = chunk_size or max(size.lines - 4, 8)
+    rows = iter(rows)
+    chunk = list(islice(rows, chunk_size))
+    layout = TableLayout(columns, chunk, title, size.columns)
+
+    lines = ['', *layout.header()]
+    count = 0
+    while True:
+        following = list(islice(rows, chunk_size))
+        lines.extend(layout.row(row) for row in chunk)
+        count += len(chunk)
+        if not following:
+            lines.append(layout.footer() + '\n')
+            write('\n'.join(lines) + '\n', out)
+            return count
+        write('\n'.join(lines) + '\n', out)
+        lines = []
+        chunk = following
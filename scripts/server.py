@@ -0,0 +1,218 @@
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from colorama import Fore, Style
+import scripts.Database
+from scripts import output
+from scripts.config import config
+from scripts.jobs import job_queue
+from scripts.logging import logger
+from scripts.ratelimit import login_source, peer_source
+from scripts.session import Session, session_store, use_session
+from scripts.terminal import InputBackend, use_terminal
+
+# --------------- [ Remote Console Server ] --------------- #
+#
+# An asyncio server that gives every connection its own authenticated
+# console session. Socket I/O stays on the event loop; bcrypt verification
+# and command execution run in separate thread pools, so one slow login
+# never stalls other clients. Each command runs with the connection's
+# session, terminal and output bound through context variables, which lets
+# it reuse the normal dispatcher and Database layer unchanged.
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 7420
+PROMPT_SUFFIX = '@phantom> '
+LOGOUT_COMMANDS = ('logout', 'exit', 'quit')
+
+
+class ConnectionTerminal(InputBackend):
+    """Line-mode terminal bridging a worker thread to an asyncio connection"""
+
+    line_mode = True
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, writer: asyncio.StreamWriter):
+        self.loop = loop
+        self.writer = writer
+        self.lines: asyncio.Queue = asyncio.Queue()
+        self.closed = False
+
+    def feed(self, line: Optional[str]):
+        """Called on the event loop for every line the client sends (None on EOF)"""
+        self.lines.put_nowait(line)
+
+    async def next_line(self) -> Optional[str]:
+        """Wait for the next line on the event loop"""
+        line = await self.lines.get()
+        if line is None:
+            self.lines.put_nowait(None)  # keep later readers seeing EOF
+        return line
+
+    def read_line(self) -> str:
+        """Block a worker thread until the client sends a line (prompts inside commands)"""
+        line = asyncio.run_coroutine_threadsafe(self.next_line(), self.loop).result()
+        if line is None:
+            raise EOFError
+        return line
+
+    def read_key(self, timeout: Optional[float] = None) -> Optional[str]:
+        raise EOFError
+
+    def write(self, text: str):
+        if self.closed or not text:
+            return
+        data = text.replace('\r\n', '\n').replace('\n', '\r\n').encode('utf-8')
+        self.loop.call_soon_threadsafe(self._write, data)
+
+    def _write(self, data: bytes):
+        if not self.writer.is_closing():
+            self.writer.write(data)
+
+    def flush(self):
+        pass
+
+
+class ConsoleServer:
+    def __init__(self, execute: Callable[[str], bool], auth_workers: int = 4,
+                 command_workers: int = 16, max_connections: int = 1000):
+        self.execute = execute
+        self.auth_pool = ThreadPoolExecutor(auth_workers, thread_name_prefix='phantom-auth')
+        self.command_pool = ThreadPoolExecutor(command_workers, thread_name_prefix='phantom-cmd')
+        self.max_connections = max_connections
+        self.connections = 0
+
+    async def _in_context(self, pool, terminal, session, func, *args):
+        """Run func in a pool thread with the connection's terminal, session and output"""
+        def call():
+            with use_terminal(terminal), output.redirect(terminal):
+                if session is None:
+                    return func(*args)
+                with use_session(session):
+                    return func(*args)
+        ctx = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(pool, ctx.run, call)
+
+    async def _login(self, terminal: ConnectionTerminal, peer) -> Optional[Session]:
+        terminal.write("Username: ")
+        username = await terminal.next_line()
+        if username is None:
+            return None
+        terminal.write("Password: ")
+        password = await terminal.next_line()
+        if password is None:
+            return None
+
+        with login_source(peer_source(peer)):
+            role = await self._in_context(self.auth_pool, terminal, None,
+                                          scripts.Database.verify_credentials, username.strip(), password)
+        if not role:
+            terminal.write(f"{Fore.RED}✖  Invalid username or password{Style.RESET_ALL}\n")
+            return None
+
+        session = Session(session_store)
+        session.create(username.strip(), role)
+        terminal.write(f"{Fore.GREEN}Welcome back, {session.username}!{Style.RESET_ALL}\n")
+        return session
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        terminal = ConnectionTerminal(loop, writer)
+        peer = writer.get_extra_info('peername') or 'local'
+
+        async def pump():
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    terminal.feed(line.decode('utf-8', 'replace').rstrip('\r\n'))
+            except (ConnectionError, asyncio.IncompleteReadError):
+                pass
+            finally:
+                terminal.feed(None)
+
+        if self.connections >= self.max_connections:
+            writer.write(b"Server busy, try again later\r\n")
+            await writer.drain()
+            writer.close()
+            return
+
+        self.connections += 1
+        pump_task = asyncio.create_task(pump())
+        session = None
+        try:
+            logger.info(f"Remote connection from {peer}")
+            session = await self._login(terminal, peer)
+            while session is not None:
+                for notice in job_queue.pop_notices(session.token):
+                    terminal.write(notice + '\n')
+                terminal.write(f"{session.username}{PROMPT_SUFFIX}")
+                await writer.drain()
+                line = await terminal.next_line()
+                if line is None:
+                    break
+                command = line.strip()
+                if not command:
+                    continue
+                if command.lower() in LOGOUT_COMMANDS:
+                    terminal.write(f"{Fore.GREEN}Logged out successfully{Style.RESET_ALL}\n")
+                    break
+                if not session.validate(session.token):
+                    terminal.write(f"{Fore.YELLOW}Session expired. Please log in again.{Style.RESET_ALL}\n")
+                    break
+                session.update_activity()
+                try:
+                    await self._in_context(self.command_pool, terminal, session, self.execute, command)
+                except EOFError:
+                    break
+        finally:
+            if session is not None:
+                session.clear()
+            terminal.closed = True
+            pump_task.cancel()
+            self.connections -= 1
+            try:
+                await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+            logger.info(f"Remote connection closed: {peer}")
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                    unix_socket: Optional[str] = None):
+        output.install()
+        if unix_socket:
+            server = await asyncio.start_unix_server(self.handle_client, path=unix_socket)
+            where = unix_socket
+        else:
+            server = await asyncio.start_server(self.handle_client, host, port)
+            where = ', '.join(str(sock.getsockname()) for sock in server.sockets)
+        logger.info(f"Console server listening on {where}", print_to_console=True)
+        async with server:
+            await server.serve_forever()
+
+def run(execute: Callable[[str], bool], host: Optional[str] = None, port: Optional[int] = None,
+        unix_socket: Optional[str] = None):
+    """Start the console server using the [server] settings from config.toml"""
+    settings = config.server
+    server = ConsoleServer(
+        execute,
+        auth_workers=settings.auth_workers,
+        command_workers=settings.command_workers,
+        max_connections=settings.max_connections,
+    )
+    unix_socket = unix_socket or settings.unix_socket or None
+    try:
+        asyncio.run(server.serve(
+            host or settings.host,
+            port or settings.port,
+            unix_socket,
+        ))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if unix_socket and os.path.exists(unix_socket):
+            os.remove(unix_socket)
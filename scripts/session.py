@@ -3,32 +3,416 @@ import time
 import threading
 from datetime import datetime, timedelta
 import secrets
-from typing import Optional
+import hashlib
+import sqlite3
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set
 from . import logging
+from . import permissions
+from .metrics import metrics
 
 logger = logging.logger
 
-class Session:
+DEFAULT_TIMEOUT_SECONDS = 300
+DEFAULT_MAX_SESSIONS_PER_USER = 5
+DEFAULT_SHARD_COUNT = 64
+DEFAULT_MAX_PERSISTED_SESSIONS = 100
+PERSIST_TOUCH_INTERVAL = 5  # seconds between last_activity writes per session
+
+
+class SessionRecord:
+    """A single authenticated session held by a SessionStore"""
+    __slots__ = ('token', 'username', 'created', 'last_activity', 'role', 'permissions')
+
+    def __init__(self, token: str, username: str, now: float, role: Optional[str] = None):
+        self.token = token
+        self.username = username
+        self.created = now
+        self.last_activity = now
+        self.set_role(role)
+
+    def set_role(self, role: Optional[str]):
+        """Cache the role and its compiled permission mask"""
+        self.role = role
+        self.permissions = permissions.role_mask(role)
+
+
+class _Shard:
+    __slots__ = ('lock', 'sessions')
+
     def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions: Dict[str, SessionRecord] = {}
+
+
+def hash_token(token: str) -> str:
+    """Hash a session token for storage; raw tokens never touch the disk store"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class SessionPersistence:
+    """SQLite-backed session table that lets sessions survive a restart.
+
+    Entries are keyed by the SHA-256 of the token and carry their expiry, so
+    resuming is a single primary-key lookup with no password hashing. The
+    table is bounded to max_entries; expired rows are evicted first, then
+    the least recently active ones.
+    """
+
+    def __init__(self, path: str, timeout_seconds: int = DEFAULT_TIMEOUT_SECONDS,
+                 max_entries: int = DEFAULT_MAX_PERSISTED_SESSIONS):
+        self.path = path
+        self.timeout_seconds = timeout_seconds
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                token_hash TEXT PRIMARY KEY,
+                username TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_activity REAL NOT NULL,
+                expires REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)")
+        self.conn.commit()
+        self.evict()
+
+    def save(self, record: SessionRecord):
+        """Insert or refresh a session"""
+        try:
+            with self.lock:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO sessions (token_hash, username, created, last_activity, expires) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (hash_token(record.token), record.username, record.created,
+                     record.last_activity, record.last_activity + self.timeout_seconds)
+                )
+                self.conn.commit()
+            self.evict()
+        except sqlite3.Error as e:
+            logger.error(f"Error persisting session: {e}")
+
+    def touch(self, record: SessionRecord):
+        """Push a session's last activity and expiry forward"""
+        try:
+            with self.lock:
+                self.conn.execute(
+                    "UPDATE sessions SET last_activity = ?, expires = ? WHERE token_hash = ?",
+                    (record.last_activity, record.last_activity + self.timeout_seconds,
+                     hash_token(record.token))
+                )
+                self.conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error updating persisted session: {e}")
+
+    def load(self, token: str) -> Optional[SessionRecord]:
+        """Look up an unexpired session by token"""
+        try:
+            with self.lock:
+                row = self.conn.execute(
+                    "SELECT username, created, last_activity FROM sessions "
+                    "WHERE token_hash = ? AND expires > ?",
+                    (hash_token(token), time.time())
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Error loading persisted session: {e}")
+            return None
+        if not row:
+            return None
+        record = SessionRecord(token, row[0], row[1])
+        record.last_activity = row[2]
+        return record
+
+    def delete(self, token: str):
+        """Remove a persisted session"""
+        try:
+            with self.lock:
+                self.conn.execute("DELETE FROM sessions WHERE token_hash = ?", (hash_token(token),))
+                self.conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error deleting persisted session: {e}")
+
+    def evict(self):
+        """Drop expired sessions and keep the table within max_entries"""
+        try:
+            with self.lock:
+                self.conn.execute("DELETE FROM sessions WHERE expires <= ?", (time.time(),))
+                self.conn.execute(
+                    "DELETE FROM sessions WHERE token_hash NOT IN "
+                    "(SELECT token_hash FROM sessions ORDER BY last_activity DESC LIMIT ?)",
+                    (self.max_entries,)
+                )
+                self.conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error evicting persisted sessions: {e}")
+
+
+class SessionStore:
+    """Registry of concurrent sessions with O(1) token lookup.
+
+    Sessions are spread over lock-striped shards keyed by token, so
+    validating many sessions at once does not contend on one mutex. A
+    separate per-user index enforces the per-user session cap; when a user
+    exceeds it, their least recently active session is evicted.
+    """
+
+    def __init__(self, timeout_seconds: int = DEFAULT_TIMEOUT_SECONDS,
+                 max_sessions_per_user: int = DEFAULT_MAX_SESSIONS_PER_USER,
+                 shard_count: int = DEFAULT_SHARD_COUNT):
+        # Round up to a power of two so shard selection is a mask
+        shard_count = 1 << max(0, shard_count - 1).bit_length()
+        self.timeout_seconds = timeout_seconds
+        self.max_sessions_per_user = max_sessions_per_user
+        self._mask = shard_count - 1
+        self._shards = [_Shard() for _ in range(shard_count)]
+        self._user_lock = threading.Lock()
+        self._by_user: Dict[str, Set[str]] = {}
+        self.persistence: Optional[SessionPersistence] = None
+
+    def configure(self, timeout_seconds: float, max_sessions_per_user: int):
+        """Apply new limits; existing sessions are judged by the new timeout from now on"""
+        self.timeout_seconds = timeout_seconds
+        self.max_sessions_per_user = max_sessions_per_user
+        if self.persistence is not None:
+            self.persistence.timeout_seconds = timeout_seconds
+
+    def refresh_permissions(self):
+        """Recompute the cached permission masks after the role table changed"""
+        for shard in self._shards:
+            with shard.lock:
+                for record in shard.sessions.values():
+                    record.set_role(record.role)
+
+    def _shard(self, token: str) -> _Shard:
+        return self._shards[hash(token) & self._mask]
+
+    def _expired(self, record: SessionRecord, now: float) -> bool:
+        return now - record.last_activity > self.timeout_seconds
+
+    def _unindex(self, username: str, token: str):
+        with self._user_lock:
+            tokens = self._by_user.get(username)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._by_user[username]
+
+    def _insert(self, record: SessionRecord):
+        token = record.token
+        shard = self._shard(token)
+        with shard.lock:
+            shard.sessions[token] = record
+
+        with self._user_lock:
+            tokens = self._by_user.setdefault(record.username, set())
+            tokens.add(token)
+            overflow = len(tokens) - self.max_sessions_per_user if self.max_sessions_per_user > 0 else 0
+
+        if overflow > 0:
+            self._evict_oldest(record.username, overflow, keep=token)
+
+    def create(self, username: str, role: Optional[str] = None) -> str:
+        """Create a new session for a user and return its token"""
+        record = SessionRecord(secrets.token_hex(32), username, time.time(), role)
+        self._insert(record)
+        if self.persistence is not None:
+            self.persistence.save(record)
+        logger.info(f"New session created for user: {username}")
+        return record.token
+
+    def set_role(self, username: str, role: Optional[str]):
+        """Update the cached role of every session held by a user"""
+        for token in self.tokens_for(username):
+            record = self.get(token)
+            if record is not None:
+                record.set_role(role)
+
+    def resume(self, token: Optional[str]) -> Optional[str]:
+        """Restore a persisted session by token, returning its username"""
+        if not token:
+            return None
+        record = self.get(token)
+        if record is None and self.persistence is not None:
+            record = self.persistence.load(token)
+            if record is not None:
+                self._insert(record)
+        if record is None or not self.validate(token):
+            return None
+        self.touch(token)
+        logger.info(f"Session resumed for user: {record.username}")
+        return record.username
+
+    def _evict_oldest(self, username: str, count: int, keep: str):
+        candidates = []
+        for token in self.tokens_for(username):
+            if token == keep:
+                continue
+            record = self.get(token)
+            if record is not None:
+                candidates.append((record.last_activity, token))
+        candidates.sort()
+        for _, token in candidates[:count]:
+            logger.info(f"Session limit reached for user {username}, evicting oldest session")
+            self.revoke(token)
+
+    def get(self, token: Optional[str]) -> Optional[SessionRecord]:
+        """Return the session record for a token, or None"""
+        if not token:
+            return None
+        shard = self._shard(token)
+        with shard.lock:
+            return shard.sessions.get(token)
+
+    def validate(self, token: Optional[str]) -> bool:
+        """Validate a session token, dropping it if it has expired"""
+        if not token:
+            return False
+        shard = self._shard(token)
+        with shard.lock:
+            record = shard.sessions.get(token)
+            if record is None:
+                return False
+            if not self._expired(record, time.time()):
+                return True
+            del shard.sessions[token]
+        self._unindex(record.username, token)
+        if self.persistence is not None:
+            self.persistence.delete(token)
+        logger.info(f"Session expired for user: {record.username}")
+        return False
+
+    def touch(self, token: Optional[str]) -> bool:
+        """Update the last activity timestamp of a session"""
+        if not token:
+            return False
+        shard = self._shard(token)
+        with shard.lock:
+            record = shard.sessions.get(token)
+            if record is None:
+                return False
+            now = time.time()
+            persist = now - record.last_activity >= PERSIST_TOUCH_INTERVAL
+            record.last_activity = now
+        if persist and self.persistence is not None:
+            self.persistence.touch(record)
+        return True
+
+    def revoke(self, token: Optional[str]) -> bool:
+        """Remove a single session"""
+        if not token:
+            return False
+        shard = self._shard(token)
+        with shard.lock:
+            record = shard.sessions.pop(token, None)
+        if self.persistence is not None:
+            self.persistence.delete(token)
+        if record is None:
+            return False
+        self._unindex(record.username, token)
+        logger.info(f"Session cleared for user: {record.username}")
+        return True
+
+    def revoke_user(self, username: str) -> int:
+        """Remove every session belonging to a user"""
+        count = 0
+        for token in self.tokens_for(username):
+            if self.revoke(token):
+                count += 1
+        return count
+
+    def tokens_for(self, username: str) -> List[str]:
+        """Return the tokens of all sessions held by a user"""
+        with self._user_lock:
+            return list(self._by_user.get(username, ()))
+
+    def remaining(self, token: Optional[str]) -> int:
+        """Get remaining session time in seconds"""
+        record = self.get(token)
+        if record is None:
+            return 0
+        remaining = self.timeout_seconds - (time.time() - record.last_activity)
+        return max(0, int(remaining))
+
+    def purge_expired(self) -> int:
+        """Drop all expired sessions, returning how many were removed"""
+        now = time.time()
+        removed = []
+        for shard in self._shards:
+            with shard.lock:
+                expired = [t for t, r in shard.sessions.items() if self._expired(r, now)]
+                for token in expired:
+                    removed.append(shard.sessions.pop(token))
+        for record in removed:
+            self._unindex(record.username, record.token)
+        if removed and self.persistence is not None:
+            self.persistence.evict()
+        return len(removed)
+
+    def __len__(self) -> int:
+        return sum(len(shard.sessions) for shard in self._shards)
+
+
+class Session:
+    """The local console's session, backed by a SessionStore"""
+
+    def __init__(self, store: Optional[SessionStore] = None):
+        self.store = store if store is not None else SessionStore()
         self.token: Optional[str] = None
         self.username: Optional[str] = None
-        self.last_activity: Optional[float] = None
         self.lock = threading.Lock()
-        self.timeout_minutes = 5
-        
+
+    @property
+    def timeout_minutes(self) -> float:
+        return self.store.timeout_seconds / 60
+
+    @property
+    def last_activity(self) -> Optional[float]:
+        record = self.store.get(self.token)
+        return record.last_activity if record else None
+
+    @property
+    def role(self) -> Optional[str]:
+        record = self.store.get(self.token)
+        return record.role if record else None
+
+    @property
+    def permissions(self) -> int:
+        """The cached permission mask of the session's role"""
+        record = self.store.get(self.token)
+        return record.permissions if record else 0
+
+    def set_role(self, role: Optional[str]):
+        """Update the cached role of this session"""
+        record = self.store.get(self.token)
+        if record is not None:
+            record.set_role(role)
+
     def generate_token(self) -> str:
         """Generate a cryptographically secure session token"""
         return secrets.token_hex(32)
-        
-    def create(self, username: str) -> str:
+
+    def create(self, username: str, role: Optional[str] = None) -> str:
         """Create a new session for a user"""
         with self.lock:
-            self.token = self.generate_token()
+            if self.token:
+                self.store.revoke(self.token)
+            self.token = self.store.create(username, role)
             self.username = username
-            self.last_activity = time.time()
-            logger.info(f"New session created for user: {username}")
             return self.token
-            
+
+    def resume(self, token: Optional[str]) -> Optional[str]:
+        """Resume a persisted session, returning the username on success"""
+        with self.lock:
+            username = self.store.resume(token)
+            if username:
+                self.token = token
+                self.username = username
+            return username
+
     def validate(self, token: str) -> bool:
         """Validate a session token"""
         with self.lock:
@@ -36,39 +420,96 @@ class Session:
                 return False
             if token != self.token:
                 return False
-            if self.is_expired():
-                self.clear()
+            if not self.store.validate(token):
+                self.token = None
+                self.username = None
                 return False
             return True
-            
+
     def update_activity(self):
         """Update the last activity timestamp"""
-        with self.lock:
-            self.last_activity = time.time()
-            
+        self.store.touch(self.token)
+
     def is_expired(self) -> bool:
         """Check if the session has expired"""
-        if not self.last_activity:
-            return True
-        elapsed = time.time() - self.last_activity
-        return elapsed > (self.timeout_minutes * 60)
-        
+        return not self.store.validate(self.token)
+
     def clear(self):
         """Clear the session data"""
         with self.lock:
-            if self.username:
-                logger.info(f"Session cleared for user: {self.username}")
+            self.store.revoke(self.token)
             self.token = None
             self.username = None
-            self.last_activity = None
-            
+
     def get_remaining_time(self) -> int:
         """Get remaining session time in seconds"""
-        if not self.last_activity:
-            return 0
-        elapsed = time.time() - self.last_activity
-        remaining = (self.timeout_minutes * 60) - elapsed
-        return max(0, int(remaining))
+        return self.store.remaining(self.token)
+
+def enable_persistence(store: SessionStore, path: str,
+                       max_entries: int = DEFAULT_MAX_PERSISTED_SESSIONS) -> SessionPersistence:
+    """Attach an on-disk session table to a store"""
+    store.persistence = SessionPersistence(path, store.timeout_seconds, max_entries)
+    return store.persistence
+
+def read_resume_token(path: str) -> Optional[str]:
+    """Read the local console's saved session token, if any"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def write_resume_token(path: str, token: Optional[str]):
+    """Save (or with None, remove) the local console's session token"""
+    try:
+        if token is None:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(token)
+    except OSError as e:
+        logger.error(f"Error saving resume token: {e}")
+
+_active_session = contextvars.ContextVar('phantom_session', default=None)
+
+
+class SessionProxy:
+    """Resolves to the session active in the current context.
+
+    Remote connections each run their commands with their own Session set
+    via use_session(); everywhere else this is the local console's session.
+    """
+
+    def __init__(self, default: Session):
+        object.__setattr__(self, '_default', default)
+
+    def _target(self) -> Session:
+        session = _active_session.get()
+        return session if session is not None else self._default
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._target(), name, value)
+
+@contextmanager
+def use_session(session: Session):
+    """Make session the current session for code running in this context"""
+    token = _active_session.set(session)
+    try:
+        yield session
+    finally:
+        _active_session.reset(token)
+
+# Global session registry and the local console's session
+session_store = SessionStore()
+metrics.callback('sessions', 'Sessions currently held by the session store', lambda: len(session_store))
+local_session = Session(session_store)
+current_session = SessionProxy(local_session)
 
-# Global session instance
-current_session = Session()
+def active_session() -> Session:
+    """The concrete session current_session resolves to in this context"""
+    return _active_session.get() or local_session
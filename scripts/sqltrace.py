@@ -0,0 +1,249 @@
+import datetime
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from scripts.logging import logger
+from scripts.paths import DATA_DIR
+
+# --------------- [ SQL Tracing ] --------------- #
+#
+# Opt-in: while tracing is off, connections are plain sqlite3 connections
+# and nothing here runs. While it is on, connections are created with
+# TracedConnection, whose cursors time every statement (execute plus the
+# fetches that step it), count its rows and attribute it to the Database
+# function that issued it. Statements over the threshold go to the slow
+# query log. SQLite's trace callback adds the statements the sqlite3
+# module issues on its own (the implicit BEGIN before a write); only their
+# keyword is kept, because the callback sees parameters expanded into the
+# SQL (usernames, password hashes). Logged statements keep their
+# placeholders.
+
+SLOW_LOG = os.path.join(DATA_DIR, 'logs', 'slow_queries.log')
+DEFAULT_SLOW_MS = 50.0
+_IMPLICIT = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE')
+
+_settings = {'enabled': False, 'slow_ms': DEFAULT_SLOW_MS, 'log': SLOW_LOG}
+_configured = {'enabled': False}  # last [sqltrace] enabled value, so reloads keep a runtime toggle
+_lock = threading.Lock()
+
+
+class QueryStats:
+    __slots__ = ('count', 'total', 'max', 'rows')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+
+
+# (caller, statement) -> totals since tracing was enabled or reset
+_stats: Dict[Tuple[str, str], QueryStats] = {}
+
+
+class _Query:
+    __slots__ = ('sql', 'caller', 'duration', 'rows', 'implicit')
+
+    def __init__(self, sql: str, caller: str):
+        self.sql = ' '.join(sql.split())
+        self.caller = caller
+        self.duration = 0.0
+        self.rows = 0
+        self.implicit: List[str] = []
+
+
+# Database helpers that run statements on behalf of their caller
+_HELPERS = {'run_write', 'transaction', 'get_db_connection'}
+
+def _is_helper(frame) -> bool:
+    module = frame.f_globals.get('__name__')
+    if module in (__name__, 'contextlib'):
+        return True
+    if module != 'scripts.Database':
+        return False
+    code = frame.f_code
+    # Lambdas and nested functions handed to run_write belong to the function around them
+    return code.co_name in _HELPERS or '<locals>' in getattr(code, 'co_qualname', '') or code.co_name == '<lambda>'
+
+def _caller() -> str:
+    """Name of the function that issued the statement, skipping tracing and transaction helpers"""
+    frame = sys._getframe(2)
+    while frame is not None and _is_helper(frame):
+        frame = frame.f_back
+    return frame.f_code.co_name if frame is not None else '?'
+
+def _record(query: _Query):
+    with _lock:
+        stats = _stats.get((query.caller, query.sql))
+        if stats is None:
+            stats = _stats[(query.caller, query.sql)] = QueryStats()
+        stats.count += 1
+        stats.total += query.duration
+        stats.max = max(stats.max, query.duration)
+        stats.rows += query.rows
+    if query.duration * 1000 >= _settings['slow_ms']:
+        _log_slow(query)
+
+def _log_slow(query: _Query):
+    implicit = f"[{' '.join(query.implicit)}] " if query.implicit else ''
+    line = (f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S}  {query.duration * 1000:9.2f} ms  "
+            f"{query.caller}  rows={query.rows}  {implicit}{query.sql}\n")
+    try:
+        os.makedirs(os.path.dirname(_settings['log']), exist_ok=True)
+        with _lock, open(_settings['log'], 'a', encoding='utf-8') as f:
+            f.write(line)
+    except OSError as e:
+        logger.error(f"Could not write the slow query log: {e}", print_to_console=False)
+
+
+class TracedCursor(sqlite3.Cursor):
+    _query: Optional[_Query] = None
+
+    def _run(self, method, sql: str, parameters):
+        self._finish()
+        query = self._query = _Query(sql, _caller())
+        self.connection._current = query
+        started = time.perf_counter()
+        try:
+            return method(sql, parameters)
+        finally:
+            query.duration += time.perf_counter() - started
+            self.connection._current = None
+            if self.rowcount > 0:
+                query.rows = self.rowcount  # rows changed by INSERT/UPDATE/DELETE
+
+    def execute(self, sql: str, parameters=()):
+        return self._run(super().execute, sql, parameters)
+
+    def executemany(self, sql: str, parameters):
+        return self._run(super().executemany, sql, parameters)
+
+    def _fetch(self, method, *args):
+        started = time.perf_counter()
+        result = method(*args)
+        if self._query is not None:
+            self._query.duration += time.perf_counter() - started
+            self._query.rows += len(result) if isinstance(result, list) else result is not None
+        return result
+
+    def fetchone(self):
+        return self._fetch(super().fetchone)
+
+    def fetchmany(self, size: int = 1):
+        return self._fetch(super().fetchmany, size)
+
+    def fetchall(self):
+        rows = self._fetch(super().fetchall)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        try:
+            return self._fetch(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+
+    def _finish(self):
+        query, self._query = self._query, None
+        if query is not None:
+            _record(query)
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+
+class TracedConnection(sqlite3.Connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._current: Optional[_Query] = None
+        self.set_trace_callback(self._on_statement)
+
+    def _on_statement(self, statement: str):
+        # Keep the keyword only: the statement arrives with its parameters expanded
+        query = self._current
+        keyword = statement.split(None, 1)[0].upper() if statement.strip() else ''
+        if query is not None and keyword in _IMPLICIT and not query.sql.upper().startswith(keyword):
+            query.implicit.append(keyword)
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql: str, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, parameters):
+        return self.cursor().executemany(sql, parameters)
+
+    def commit(self):
+        query = _Query('COMMIT', _caller())
+        started = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            query.duration = time.perf_counter() - started
+            _record(query)
+
+
+def connect(database: str, **kwargs) -> sqlite3.Connection:
+    """sqlite3.connect, with a traced connection while tracing is enabled"""
+    if _settings['enabled']:
+        kwargs['factory'] = TracedConnection
+    return sqlite3.connect(database, **kwargs)
+
+def enabled() -> bool:
+    return _settings['enabled']
+
+def enable(slow_ms: Optional[float] = None, log: Optional[str] = None):
+    if slow_ms is not None:
+        _settings['slow_ms'] = slow_ms
+    if log:
+        _settings['log'] = log
+    _settings['enabled'] = True
+    logger.info(f"SQL tracing enabled (slow queries >= {_settings['slow_ms']} ms go to {_settings['log']})")
+
+def disable():
+    _settings['enabled'] = False
+    logger.info("SQL tracing disabled")
+
+def settings() -> dict:
+    return dict(_settings)
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+def top(count: int = 10) -> List[Tuple[str, str, QueryStats]]:
+    """The statements with the most total time"""
+    with _lock:
+        ordered = sorted(_stats.items(), key=lambda item: item[1].total, reverse=True)
+    return [(caller, sql, stats) for (caller, sql), stats in ordered[:count]]
+
+def explain(database: str, sql: str) -> List[str]:
+    """EXPLAIN QUERY PLAN of a traced statement, with NULL for every parameter"""
+    if sql.split(None, 1)[0].upper() not in ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'REPLACE'):
+        return []
+    conn = sqlite3.connect(database)
+    try:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", (None,) * sql.count('?')).fetchall()
+    except sqlite3.Error as e:
+        return [f"(no plan: {e})"]
+    finally:
+        conn.close()
+    return [detail for _, _, _, detail in rows]
+
+def apply_config(config):
+    """Follow the [sqltrace] settings; runs again after every config reload"""
+    settings = config.sqltrace
+    _settings['slow_ms'] = settings.slow_ms
+    _settings['log'] = settings.log or SLOW_LOG
+    if settings.enabled != _configured['enabled']:
+        _configured['enabled'] = settings.enabled
+        enable() if settings.enabled else disable()
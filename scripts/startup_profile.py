@@ -0,0 +1,74 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+# --------------- [ Startup Profile ] --------------- #
+#
+# Startup is split into phases: "mark" closes the phase that ran since the
+# previous mark, "phase" times a block on its own (its time is taken out of
+# the surrounding mark, so nothing is counted twice). The profile ends at
+# the first prompt. This module is imported before anything else and only
+# uses the standard library, so it adds nothing measurable itself.
+
+class StartupProfile:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.nested = 0.0
+        self.phases: List[Tuple[str, float]] = []
+        self.enabled = False
+        self.output: Optional[str] = None  # also write the result as JSON
+        self.finished = False
+
+    def mark(self, name: str):
+        """End the phase that has been running since the last mark"""
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last - self.nested))
+        self.last = now
+        self.nested = 0.0
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.phases.append((name, elapsed))
+            self.nested += elapsed
+
+    @property
+    def total(self) -> float:
+        return self.last - self.start
+
+    def first_prompt(self):
+        """Close the profile when the first prompt is shown; cheap no-op afterwards"""
+        if self.finished:
+            return
+        self.finished = True
+        self.mark('first prompt')
+        from scripts.logging import logger
+        logger.info("Startup: " + ', '.join(f"{name} {seconds * 1000:.1f}ms" for name, seconds in self.phases)
+                    + f", total {self.total * 1000:.1f}ms")
+        if self.output:
+            # Written atomically: a benchmark may stop the process as soon as the file appears
+            temp = self.output + '.tmp'
+            with open(temp, 'w', encoding='utf-8') as f:
+                json.dump({'phases': {name: seconds for name, seconds in self.phases},
+                           'total': self.total}, f, indent=2)
+            os.replace(temp, self.output)
+        if self.enabled:
+            self.report()
+
+    def report(self):
+        from scripts.render import Column, render_table
+        rows = [(name, f"{seconds * 1000:.1f} ms", f"{seconds / self.total * 100:.0f}%" if self.total else '')
+                for name, seconds in self.phases]
+        rows.append(('time to first prompt', f"{self.total * 1000:.1f} ms", ''))
+        render_table([Column('Phase'), Column('Time', '>'), Column('Share', '>')], rows,
+                     title="Startup Profile")
+
+
+startup_profile = StartupProfile()
@@ -0,0 +1,332 @@
+import os
+import re
+import sys
+import codecs
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Iterable, List, Optional
+
+# --------------- [ Terminal Input Backends ] --------------- #
+#
+# Backends turn raw keyboard input into key names so the console does not
+# care which platform it runs on. read_key() blocks until a key arrives
+# (or the timeout passes), so an idle prompt uses no CPU.
+
+class Key:
+    ENTER = 'ENTER'
+    BACKSPACE = 'BACKSPACE'
+    DELETE = 'DELETE'
+    TAB = 'TAB'
+    ESCAPE = 'ESCAPE'
+    UP = 'UP'
+    DOWN = 'DOWN'
+    LEFT = 'LEFT'
+    RIGHT = 'RIGHT'
+    HOME = 'HOME'
+    END = 'END'
+    PAGE_UP = 'PAGE_UP'
+    PAGE_DOWN = 'PAGE_DOWN'
+    CTRL_C = 'CTRL_C'
+    CTRL_R = 'CTRL_R'
+
+# Control characters shared by every backend
+CONTROL_KEYS = {
+    '\r': Key.ENTER,
+    '\n': Key.ENTER,
+    '\x08': Key.BACKSPACE,
+    '\x7f': Key.BACKSPACE,
+    '\t': Key.TAB,
+    '\x03': Key.CTRL_C,
+    '\x12': Key.CTRL_R,
+    '\x1b': Key.ESCAPE,
+}
+
+
+class InputBackend:
+    """Base class for terminal backends.
+
+    Line-mode backends (remote connections) deliver whole lines that the
+    client has already edited and echoed, so read_line() is used instead of
+    the key-by-key line editor.
+    """
+
+    line_mode = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def read_key(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Block until a key is pressed; return a Key name or a printable character"""
+        raise NotImplementedError
+
+    def read_line(self) -> str:
+        """Read a complete line (line-mode backends only)"""
+        raise NotImplementedError
+
+    def write(self, text: str):
+        sys.stdout.write(text)
+
+    def flush(self):
+        sys.stdout.flush()
+
+    def clear(self):
+        self.write('\033[2J\033[H')
+        self.flush()
+
+
+class WindowsBackend(InputBackend):
+    """Blocking msvcrt backend for the Windows console"""
+
+    SPECIAL_KEYS = {
+        'H': Key.UP,
+        'P': Key.DOWN,
+        'K': Key.LEFT,
+        'M': Key.RIGHT,
+        'G': Key.HOME,
+        'O': Key.END,
+        'S': Key.DELETE,
+        'I': Key.PAGE_UP,
+        'Q': Key.PAGE_DOWN,
+    }
+
+    def __init__(self):
+        import msvcrt
+        self.msvcrt = msvcrt
+
+    def read_key(self, timeout: Optional[float] = None) -> Optional[str]:
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+            while not self.msvcrt.kbhit():
+                if time.monotonic() >= deadline:
+                    return None
+                time.sleep(0.01)
+        char = self.msvcrt.getwch()
+        if char in ('\x00', '\xe0'):
+            return self.SPECIAL_KEYS.get(self.msvcrt.getwch())
+        return CONTROL_KEYS.get(char, char)
+
+    def clear(self):
+        os.system('cls')
+
+
+class PosixBackend(InputBackend):
+    """termios/select backend for POSIX terminals"""
+
+    ESCAPE_SEQUENCES = {
+        '[A': Key.UP,
+        '[B': Key.DOWN,
+        '[C': Key.RIGHT,
+        '[D': Key.LEFT,
+        '[H': Key.HOME,
+        '[F': Key.END,
+        'OH': Key.HOME,
+        'OF': Key.END,
+        '[1~': Key.HOME,
+        '[4~': Key.END,
+        '[3~': Key.DELETE,
+        '[5~': Key.PAGE_UP,
+        '[6~': Key.PAGE_DOWN,
+    }
+
+    def __init__(self, fd: Optional[int] = None):
+        self.fd = sys.stdin.fileno() if fd is None else fd
+        self.decoder = codecs.getincrementaldecoder('utf-8')('ignore')
+        self.saved_attrs = None
+        self.depth = 0
+
+    def __enter__(self):
+        # Raw-ish mode: no line buffering, echo or signals, output left cooked
+        self.depth += 1
+        if self.depth == 1 and os.isatty(self.fd):
+            import termios
+            self.saved_attrs = termios.tcgetattr(self.fd)
+            attrs = termios.tcgetattr(self.fd)
+            attrs[3] &= ~(termios.ICANON | termios.ECHO | termios.ISIG | termios.IEXTEN)
+            attrs[6][termios.VMIN] = 1
+            attrs[6][termios.VTIME] = 0
+            termios.tcsetattr(self.fd, termios.TCSANOW, attrs)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.depth -= 1
+        if self.depth == 0 and self.saved_attrs is not None:
+            import termios
+            termios.tcsetattr(self.fd, termios.TCSADRAIN, self.saved_attrs)
+            self.saved_attrs = None
+        return False
+
+    def _read_char(self, timeout: Optional[float]) -> Optional[str]:
+        import select
+        while True:
+            ready, _, _ = select.select([self.fd], [], [], timeout)
+            if not ready:
+                return None
+            data = os.read(self.fd, 1)
+            if not data:
+                raise EOFError
+            char = self.decoder.decode(data)
+            if char:
+                return char
+
+    def read_key(self, timeout: Optional[float] = None) -> Optional[str]:
+        char = self._read_char(timeout)
+        if char is None:
+            return None
+        if char != '\x1b':
+            return CONTROL_KEYS.get(char, char)
+
+        # Escape sequences arrive together; a lone ESC times out quickly
+        sequence = ''
+        while True:
+            nxt = self._read_char(0.05)
+            if nxt is None:
+                return Key.ESCAPE if not sequence else None
+            sequence += nxt
+            if sequence in self.ESCAPE_SEQUENCES:
+                return self.ESCAPE_SEQUENCES[sequence]
+            if len(sequence) > 1 and (nxt.isalpha() or nxt == '~'):
+                return None  # Unsupported sequence, ignore it
+
+
+class FakeBackend(InputBackend):
+    """Replayable in-memory terminal for headless tests and benchmarks.
+
+    Keys are replayed in order and all output is captured. Once the script
+    is exhausted, a blocking read raises EOFError and a timed read returns
+    None.
+    """
+
+    def __init__(self, keys: Iterable[str] = ()):
+        self.keys: List[str] = list(keys)
+        self.position = 0
+        self.output: List[str] = []
+
+    @classmethod
+    def from_text(cls, text: str) -> 'FakeBackend':
+        """Build a key script from plain text; control characters map to keys"""
+        return cls(CONTROL_KEYS.get(char, char) for char in text)
+
+    def feed(self, keys: Iterable[str]):
+        self.keys.extend(keys)
+
+    def feed_text(self, text: str):
+        self.keys.extend(CONTROL_KEYS.get(char, char) for char in text)
+
+    def rewind(self):
+        self.position = 0
+        self.output.clear()
+
+    def read_key(self, timeout: Optional[float] = None) -> Optional[str]:
+        if self.position >= len(self.keys):
+            if timeout is not None:
+                return None
+            raise EOFError
+        key = self.keys[self.position]
+        self.position += 1
+        return key
+
+    def write(self, text: str):
+        self.output.append(text)
+
+    def flush(self):
+        pass
+
+    def clear(self):
+        self.output.append('\033[2J\033[H')
+
+    def getvalue(self) -> str:
+        return ''.join(self.output)
+
+
+class ReplayBackend(FakeBackend):
+    """FakeBackend that times every submitted line.
+
+    An interaction starts when Enter is read and ends when the console
+    blocks for the next key, i.e. when its next prompt is ready. Lines whose
+    text was never echoed (password prompts) are labelled '***'.
+    """
+
+    def __init__(self, keys: Iterable[str] = ()):
+        super().__init__(keys)
+        self.interactions: List[tuple] = []  # (label, seconds)
+        self._line: List[str] = []
+        self._line_output = 0
+        self._pending: Optional[tuple] = None
+
+    @classmethod
+    def from_script(cls, text: str) -> 'ReplayBackend':
+        return cls(parse_key_script(text))
+
+    def read_key(self, timeout: Optional[float] = None) -> Optional[str]:
+        if timeout is None and self._pending is not None:
+            # The echo may be written after Enter was read, so look at it only now
+            text, submitted = self._pending
+            echoed = ''.join(self.output[self._line_output:])
+            self.interactions.append((text if text in echoed else '***', time.perf_counter() - submitted))
+            self._pending = None
+            self._line_output = len(self.output)
+        key = super().read_key(timeout)
+        if key == Key.ENTER:
+            self._pending = (''.join(self._line), time.perf_counter())
+            self._line = []
+        elif key is not None and len(key) == 1:
+            self._line.append(key)
+        return key
+
+    def rewind(self):
+        super().rewind()
+        self.interactions.clear()
+        self._line = []
+        self._line_output = 0
+        self._pending = None
+
+
+KEY_TOKEN = re.compile(r'<([A-Z_]+)>')
+
+def parse_key_script(text: str) -> List[str]:
+    """Turn a key script into keys.
+
+    Every line is typed and submitted with Enter; <NAME> stands for a Key
+    (<TAB>, <UP>, <CTRL_C>, ...) and lines starting with '#' are comments.
+    """
+    keys = []
+    for line in text.splitlines():
+        if line.startswith('#'):
+            continue
+        position = 0
+        for match in KEY_TOKEN.finditer(line):
+            name = match.group(1)
+            if not hasattr(Key, name):
+                continue  # not a key name, typed literally
+            keys.extend(line[position:match.start()])
+            keys.append(getattr(Key, name))
+            position = match.end()
+        keys.extend(line[position:])
+        keys.append(Key.ENTER)
+    return keys
+
+
+_active_terminal = contextvars.ContextVar('phantom_terminal', default=None)
+
+def active_terminal() -> Optional[InputBackend]:
+    """The terminal set for the current context, if any"""
+    return _active_terminal.get()
+
+@contextmanager
+def use_terminal(terminal: InputBackend):
+    """Route console input for code running in this context to terminal"""
+    token = _active_terminal.set(terminal)
+    try:
+        yield terminal
+    finally:
+        _active_terminal.reset(token)
+
+def get_backend() -> InputBackend:
+    """Pick the input backend for the current platform"""
+    if os.name == 'nt':
+        return WindowsBackend()
+    return PosixBackend()